@@ -18,6 +18,7 @@ from .models import (
     Storyline,
     StoryOutcome,
     ChatMessage,
+    Job,
 )
 
 admin.site.register(Campaign)
@@ -38,3 +39,4 @@ admin.site.register(CampaignNote)
 admin.site.register(Storyline)
 admin.site.register(StoryOutcome)
 admin.site.register(ChatMessage)
+admin.site.register(Job)
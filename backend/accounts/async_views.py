@@ -0,0 +1,284 @@
+"""
+Async versions of the hottest read endpoints: the chat list, the desk
+bootstrap and the public campaign list.
+
+They are routed instead of the DRF actions when ``ASYNC_VIEWS`` is on
+(the default with ``SERVER_MODE=asgi``), answer with the same JSON and
+reuse the same querysets and serializers. Queries go through Django's async
+ORM, so a request waiting on a slow client or a chat long poll holds a
+coroutine instead of one of a few worker threads.
+
+The chat list also supports long polling: with ``after=<message id>`` and
+``wait=<seconds>`` it answers as soon as a newer message exists, or empty
+after ``wait`` seconds (at most ``CHAT_LONG_POLL_TIMEOUT``).
+
+The ETags are the synchronous views' (``accounts.conditional``), computed by
+their viewsets in one thread hop, so ``If-None-Match`` gets a 304 before
+anything is serialized whichever of the two serves the URL.
+
+Login and registration run ``LoginView`` and ``RegisterView`` (throttles,
+validation, responses) with the password hashing awaited from the hashing
+pool (``accounts.passwords``) instead of blocking a worker thread.
+"""
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import (
+    APIException,
+    AuthenticationFailed,
+    MethodNotAllowed,
+    NotAcceptable,
+    NotAuthenticated,
+    NotFound,
+    ValidationError,
+)
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from . import passwords
+from .authentication import ClaimsJWTAuthentication
+from .conditional import add_validators, not_modified
+from .desk import abuild_desk
+from .fast_serializers import CampaignFastSerializer, ChatMessageFastSerializer
+from .renderers import MessagePackRenderer, ORJSONRenderer
+from .serializers import CampaignSerializer, ChatMessageSerializer
+from .views import (
+    CampaignViewSet,
+    ChatMessageViewSet,
+    LoginView,
+    RegisterView,
+    chat_messages,
+    member_campaigns,
+    public_campaigns,
+)
+
+
+_RENDERERS = (ORJSONRenderer(), MessagePackRenderer())
+
+
+def _render(request, data, status=200, headers=None) -> HttpResponse:
+    """Negotiate like DRF: JSON unless the client asks for MessagePack."""
+    try:
+        renderer, media_type = DefaultContentNegotiation().select_renderer(Request(request), _RENDERERS)
+    except NotAcceptable:
+        renderer, media_type = _RENDERERS[0], _RENDERERS[0].media_type
+    return HttpResponse(
+        renderer.render(data, media_type),
+        status=status,
+        headers=headers,
+        content_type=renderer.media_type,
+    )
+
+
+def async_api_view(allow_anonymous=False, fallback=None):
+    """
+    Authenticate like DRF (JWT only), turn ``APIException`` into DRF-style
+    error responses and serialize the returned data as JSON. Methods other
+    than GET are handed to the synchronous DRF ``fallback`` view.
+    """
+
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != "GET" and fallback is not None:
+                return await sync_to_async(fallback)(request, *args, **kwargs)
+            authenticator = ClaimsJWTAuthentication()
+            try:
+                if request.method != "GET":
+                    raise MethodNotAllowed(request.method)
+                result = await authenticator.aauthenticate(request)
+                request.user = result[0] if result else AnonymousUser()
+                if not allow_anonymous and not request.user.is_authenticated:
+                    raise NotAuthenticated()
+                result = await view(request, *args, **kwargs)
+                if isinstance(result, HttpResponse):
+                    return result
+                return _render(request, result)
+            except APIException as exc:
+                headers = None
+                if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+                    exc.status_code = 401
+                    headers = {"WWW-Authenticate": authenticator.authenticate_header(request)}
+                data = exc.detail if isinstance(exc.detail, (dict, list)) else {"detail": exc.detail}
+                return _render(request, data, status=exc.status_code, headers=headers)
+
+        return wrapper
+
+    return decorator
+
+
+def async_drf_view(view_class):
+    """
+    Serve ``view_class`` with an async handler: ``view(view, request)``
+    runs after the DRF checks (authentication, permissions, throttles) and
+    its errors become DRF error responses. Other methods go to the
+    synchronous view.
+    """
+
+    def decorator(view):
+        fallback = view_class.as_view()
+
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != "POST":
+                return await sync_to_async(fallback)(request, *args, **kwargs)
+            drf_view = view_class()
+            drf_view.args, drf_view.kwargs = args, kwargs
+            drf_request = drf_view.request = drf_view.initialize_request(request, *args, **kwargs)
+            drf_view.headers = drf_view.default_response_headers
+            try:
+                await sync_to_async(drf_view.initial)(drf_request, *args, **kwargs)
+                response = await view(drf_view, drf_request)
+            except Exception as exc:
+                response = drf_view.handle_exception(exc)
+            return drf_view.finalize_response(drf_request, response, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+async def _paginate(request, queryset) -> tuple[dict, list]:
+    """``PageNumberPagination`` over the async ORM: the envelope and the page rows."""
+    page_size = api_settings.PAGE_SIZE
+    try:
+        page_number = int(request.GET.get("page", 1))
+    except ValueError:
+        page_number = 0
+    if page_number < 1:
+        raise NotFound(PageNumberPagination.invalid_page_message)
+    count = await queryset.acount()
+    offset = (page_number - 1) * page_size
+    if page_number > 1 and offset >= count:
+        raise NotFound(PageNumberPagination.invalid_page_message)
+    rows = [row async for row in queryset[offset:offset + page_size]]
+
+    url = request.build_absolute_uri()
+    next_url = previous_url = None
+    if offset + page_size < count:
+        next_url = replace_query_param(url, "page", page_number + 1)
+    if page_number > 1:
+        previous_url = (
+            remove_query_param(url, "page")
+            if page_number == 2
+            else replace_query_param(url, "page", page_number - 1)
+        )
+    return {"count": count, "next": next_url, "previous": previous_url}, rows
+
+
+def _context(request) -> dict:
+    return {"request": request, "view": None, "format": None}
+
+
+def _viewset(viewset_class, request, action=None, **kwargs):
+    """A viewset for ``request``, to reuse its validators."""
+    drf_request = Request(request)
+    drf_request.user = request.user
+    return viewset_class(request=drf_request, action=action, format_kwarg=None, args=(), kwargs=kwargs)
+
+
+async def _conditional(request, etag: str, build) -> HttpResponse:
+    """The rendered ``await build()`` with ``etag``, or 304 when ``If-None-Match`` matches."""
+    response = not_modified(request, etag)
+    if response is None:
+        response = _render(request, await build())
+    return add_validators(response, etag)
+
+
+async def _list_etag(viewset_class, request, queryset, action="list") -> str:
+    view = _viewset(viewset_class, request, action)
+    return await sync_to_async(view.list_etag)(view.request, queryset)
+
+
+@async_api_view(fallback=ChatMessageViewSet.as_view({"get": "list", "post": "create"}))
+async def chat_message_list(request):
+    queryset = chat_messages(request.user, request.GET)
+    if request.GET.get("after"):
+        try:
+            wait = float(request.GET.get("wait", 0))
+        except ValueError:
+            raise ValidationError({"wait": "Ожидается число секунд"})
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + min(max(wait, 0), getattr(settings, "CHAT_LONG_POLL_TIMEOUT", 25))
+        interval = getattr(settings, "CHAT_LONG_POLL_INTERVAL", 1.0)
+        while not await queryset.aexists():
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(interval, remaining))
+
+    async def build():
+        if settings.FAST_SERIALIZERS:
+            fast = ChatMessageFastSerializer(_context(request))
+            envelope, rows = await _paginate(request, fast.values(queryset))
+            return {**envelope, "results": await fast.aserialize(rows)}
+        envelope, rows = await _paginate(request, queryset)
+        return {**envelope, "results": ChatMessageSerializer(rows, many=True, context=_context(request)).data}
+
+    return await _conditional(request, await _list_etag(ChatMessageViewSet, request, queryset), build)
+
+
+@async_api_view()
+async def campaign_desk(request, pk):
+    campaigns = member_campaigns(request.user).filter(pk=pk)
+    since = request.GET.get("since")
+    revision = await campaigns.values_list("revision", flat=True).afirst()
+    if revision is None:
+        raise NotFound() if since is not None else NotFound("No Campaign matches the given query.")
+
+    async def build():
+        if since == str(revision):
+            return {"version": revision, "changed": False}
+        campaign = await campaigns.afirst()
+        if campaign is None:
+            raise NotFound("No Campaign matches the given query.")
+        return await abuild_desk(campaign, _context(request))
+
+    view = _viewset(CampaignViewSet, request, "desk", pk=str(pk))
+    etag = await sync_to_async(view.desk_etag)(view.request, revision)
+    return await _conditional(request, etag, build)
+
+
+@async_api_view(allow_anonymous=True)
+async def public_campaign_list(request):
+    queryset = public_campaigns(request.GET.get("q"))
+
+    async def build():
+        if settings.FAST_SERIALIZERS:
+            fast = CampaignFastSerializer(_context(request))
+            envelope, rows = await _paginate(request, fast.values(queryset))
+            return {**envelope, "results": await fast.aserialize(rows)}
+        envelope, rows = await _paginate(request, queryset)
+        return {**envelope, "results": CampaignSerializer(rows, many=True, context=_context(request)).data}
+
+    etag = await _list_etag(CampaignViewSet, request, queryset, "public")
+    return await _conditional(request, etag, build)
+
+
+@async_drf_view(LoginView)
+async def login(view, request):
+    username = request.data.get("username")
+    password = request.data.get("password")
+    if not username or not password:
+        return view.credentials_required()
+    user = await passwords.aauthenticate(request, username, password)
+    return await sync_to_async(view.logged_in)(user)
+
+
+@async_drf_view(RegisterView)
+async def register(view, request):
+    serializer = view.get_serializer(data=request.data)
+    await sync_to_async(serializer.is_valid)(raise_exception=True)
+    password_hash = await passwords.amake_password(serializer.validated_data["password"])
+    user = await sync_to_async(serializer.save)(password_hash=password_hash)
+    return await sync_to_async(view.registered)(user)
@@ -0,0 +1,164 @@
+"""
+JWT authentication that does not load the user on every request.
+
+Access tokens carry ``username``, ``is_staff``, ``is_superuser`` and a token
+version ``ver``. ``ClaimsJWTAuthentication`` turns them into a
+``ClaimsUser`` without touching the database; other fields load lazily.
+
+Revocation is by version: ``revoke_tokens(user)`` bumps ``TokenVersion``,
+as does any change of ``is_active``, ``is_staff`` or ``is_superuser`` (see
+``accounts.signals``), so the claims never outlive the account state they
+describe. Refresh always checks the stored version, so revoked sessions
+cannot renew. Access tokens are checked against the version in the cache,
+read from the database and kept for ``TOKEN_VERSION_CACHE_TIMEOUT`` seconds
+when missing; a revocation takes effect at once wherever the cache is
+shared.
+Single refresh tokens (logout, rotation) are revoked by JTI through
+``accounts.revocation``.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import revocation
+from .models import ClaimsUser, TokenVersion
+
+
+VERSION_CLAIM = "ver"
+CLAIM_FIELDS = ("username", "is_staff", "is_superuser")
+
+
+def _cache_key(user_id) -> str:
+    return f"token-version:{user_id}"
+
+
+def token_version(user_id) -> int:
+    version = (
+        TokenVersion.objects.filter(user_id=user_id).values_list("version", flat=True).first()
+    )
+    return version or 1
+
+
+def current_version(user_id) -> int:
+    """The version access tokens of ``user_id`` must carry, cached."""
+    version = cache.get(_cache_key(user_id))
+    if version is None:
+        version = token_version(user_id)
+        cache.set(_cache_key(user_id), version, timeout=settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+async def acurrent_version(user_id) -> int:
+    version = await cache.aget(_cache_key(user_id))
+    if version is None:
+        version = await (
+            TokenVersion.objects.filter(user_id=user_id).values_list("version", flat=True).afirst()
+        ) or 1
+        await cache.aset(_cache_key(user_id), version, timeout=settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def revoke_tokens(user) -> int:
+    """Invalidate every token issued to ``user`` so far; returns the new version."""
+    updated = TokenVersion.objects.filter(user_id=user.pk).update(version=F("version") + 1)
+    if not updated:
+        TokenVersion.objects.create(user_id=user.pk, version=2)
+    version = token_version(user.pk)
+    cache.set(_cache_key(user.pk), version, timeout=settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+class ClaimsRefreshToken(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for name in CLAIM_FIELDS:
+            token[name] = getattr(user, name)
+        token[VERSION_CLAIM] = token_version(user.pk)
+        return token
+
+
+def issue_tokens(user) -> dict:
+    refresh = ClaimsRefreshToken.for_user(user)
+    return {"refresh": str(refresh), "access": str(refresh.access_token)}
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    Authenticates from token claims alone. Tokens issued before the claims
+    were added fall back to the regular database lookup.
+    """
+
+    def get_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        user_id = self._user_id(validated_token)
+        return self._claims_user(validated_token, user_id, current_version(user_id))
+
+    def _user_id(self, validated_token) -> int:
+        try:
+            return int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError) as exc:
+            raise InvalidToken("Token contained no recognizable user identification") from exc
+
+    def _claims_user(self, validated_token, user_id: int, current):
+        if current != validated_token[VERSION_CLAIM]:
+            raise AuthenticationFailed("Token has been revoked", code="token_revoked")
+
+        claims = {
+            "id": user_id,
+            "is_active": True,
+            **{name: validated_token.get(name) for name in CLAIM_FIELDS},
+        }
+        # from_db() expects values in the model's field order.
+        names = [field.attname for field in ClaimsUser._meta.concrete_fields if field.attname in claims]
+        return ClaimsUser.from_db(None, names, [claims[name] for name in names])
+
+    async def aauthenticate(self, request):
+        """``authenticate()`` for async views; only old tokens need a thread."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        if VERSION_CLAIM not in validated_token:
+            return await sync_to_async(self.get_user)(validated_token), validated_token
+        user_id = self._user_id(validated_token)
+        current = await acurrent_version(user_id)
+        return self._claims_user(validated_token, user_id, current), validated_token
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh that re-reads the user, rejects revoked tokens and renews the claims."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        if revocation.is_revoked(refresh):
+            raise AuthenticationFailed("Token has been revoked", code="token_revoked")
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        user = ClaimsUser.objects.filter(pk=user_id).first() if user_id else None
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(
+                self.error_messages["no_active_account"],
+                "no_active_account",
+            )
+        if refresh.payload.get(VERSION_CLAIM, 1) != token_version(user.pk):
+            raise AuthenticationFailed("Token has been revoked", code="token_revoked")
+
+        if not api_settings.ROTATE_REFRESH_TOKENS:
+            access = refresh.access_token
+            for name in CLAIM_FIELDS:
+                access[name] = getattr(user, name)
+            return {"access": str(access)}
+        if api_settings.BLACKLIST_AFTER_ROTATION:
+            revocation.revoke(refresh)
+        return issue_tokens(user)
@@ -0,0 +1,387 @@
+"""
+Portable campaign archives.
+
+An archive is a zip with ``campaign.json`` and one NDJSON file per model,
+plus the character images under ``media/``. Export streams rows straight
+from ``.iterator()`` into the zip, and the zip straight into the response,
+so memory stays flat however long the chat history is. Import reads the
+members line by line and inserts them with ``bulk_create``, remapping ids.
+
+Rows refer to users by username, for reading only: an archive is whatever
+the uploader made of it, so import never trusts those names. Character
+sheets and chat messages all belong to the importing user, join requests
+are left out (players join the copy anew), and no accounts are created.
+Images are saved under new names, which are removed again if the import
+fails.
+"""
+import io
+import json
+import posixpath
+import uuid
+import zipfile
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DataError, IntegrityError, transaction
+from django.db.models import F, Q
+
+from . import response_cache, search
+from .cloning import value_fields
+from .models import (
+    Campaign,
+    CampaignNote,
+    CharacterSheet,
+    ChatMessage,
+    Class,
+    DMNote,
+    Session,
+    Storyline,
+    StoryOutcome,
+)
+from .spell_matcher import get_matcher, link_spells
+
+
+FORMAT_VERSION = 1
+CHUNK_SIZE = 64 * 1024
+BATCH_SIZE = 1000
+ROWS_PER_WRITE = 2000
+
+CAMPAIGN_FIELDS = ("name", "description", "world_story", "is_public", "max_players", "is_archived")
+
+
+class ArchiveError(ValueError):
+    pass
+
+
+class _StreamBuffer:
+    """
+    Write-only sink for ``zipfile``. It has no ``tell``/``seek``, so the zip
+    is written in streaming mode (sizes go into data descriptors).
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self.size = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+
+def _sections(campaign: Campaign):
+    """``(member name, rows)`` pairs in import order."""
+    sheets = (
+        CharacterSheet.objects.filter(
+            Q(campaign_join_requests__campaign=campaign) | Q(campaigns=campaign)
+        )
+        .distinct()
+        .order_by("id")
+    )
+    yield "character_sheets.ndjson", sheets.values(
+        *value_fields(CharacterSheet, exclude=("owner_id", "character_class_id")),
+        owner_username=F("owner__username"),
+        class_name=F("character_class__name"),
+    )
+    yield "join_requests.ndjson", campaign.join_requests.order_by("id").values(
+        "id", "character_id", "status", "created_at", "decided_at",
+        username=F("user__username"),
+    )
+    yield "sessions.ndjson", campaign.sessions.order_by("id").values(
+        *value_fields(Session, exclude=("campaign_id",))
+    )
+    yield "dm_notes.ndjson", DMNote.objects.filter(session__campaign=campaign).order_by("id").values(
+        *value_fields(DMNote)
+    )
+    yield "campaign_notes.ndjson", campaign.notes.order_by("id").values(
+        *value_fields(CampaignNote, exclude=("campaign_id",))
+    )
+    yield "storylines.ndjson", campaign.storylines.order_by("id").values(
+        *value_fields(Storyline, exclude=("campaign_id",))
+    )
+    yield "story_outcomes.ndjson", StoryOutcome.objects.filter(
+        storyline__campaign=campaign
+    ).order_by("id").values(*value_fields(StoryOutcome))
+    yield "chat_messages.ndjson", campaign.chat_messages.order_by("id").values(
+        "id", "text", "created_at", username=F("user__username"),
+    )
+
+
+def export_archive(campaign: Campaign):
+    """Yield the zip archive of ``campaign`` in chunks of roughly ``CHUNK_SIZE``."""
+    stream = _StreamBuffer()
+    media = set()
+    with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        header = {
+            "format": FORMAT_VERSION,
+            "campaign": {name: getattr(campaign, name) for name in CAMPAIGN_FIELDS},
+            "characters": list(campaign.characters.values_list("id", flat=True)),
+        }
+        archive.writestr(
+            "campaign.json",
+            json.dumps(header, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(",", ":")),
+        )
+        encode = DjangoJSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+        for name, rows in _sections(campaign):
+            with archive.open(name, "w", force_zip64=True) as member:
+                lines = []
+                for row in rows.iterator(chunk_size=ROWS_PER_WRITE):
+                    if name == "character_sheets.ndjson":
+                        media.update(
+                            path for path in (row["appearance_image"], row["symbol_image"]) if path
+                        )
+                    lines.append(encode(row))
+                    if len(lines) >= ROWS_PER_WRITE:
+                        member.write("\n".join(lines).encode() + b"\n")
+                        lines = []
+                        if stream.size >= CHUNK_SIZE:
+                            yield stream.drain()
+                if lines:
+                    member.write("\n".join(lines).encode() + b"\n")
+            yield stream.drain()
+
+        for path in sorted(media):
+            if not default_storage.exists(path):
+                continue
+            with default_storage.open(path, "rb") as source, archive.open(
+                f"media/{path}", "w", force_zip64=True
+            ) as member:
+                while chunk := source.read(CHUNK_SIZE):
+                    member.write(chunk)
+                    yield stream.drain()
+    yield stream.drain()
+
+
+def _rows(archive: zipfile.ZipFile, name: str):
+    try:
+        member = archive.open(name)
+    except KeyError:
+        return
+    with io.TextIOWrapper(member, encoding="utf-8") as lines:
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                raise ArchiveError(f"Повреждённая строка в {name}") from exc
+            if not isinstance(row, dict):
+                raise ArchiveError(f"Повреждённая строка в {name}")
+            yield row
+
+
+def _instance(model, row: dict, **overrides):
+    values = {}
+    for field in model._meta.concrete_fields:
+        if field.primary_key:
+            continue
+        if field.attname in overrides:
+            values[field.attname] = overrides[field.attname]
+        elif field.attname in row:
+            values[field.attname] = field.to_python(row[field.attname])
+    return model(**values)
+
+
+def _remap(id_map: dict, old_id, what: str) -> int:
+    try:
+        return id_map[old_id]
+    except (KeyError, TypeError):
+        raise ArchiveError(f"Архив ссылается на несуществующую {what}: {old_id}") from None
+
+
+def _load(archive, name, model, build, keep_ids=False):
+    """
+    Insert the rows of member ``name`` in batches. ``build(row)`` returns an
+    unsaved instance or ``None`` to skip the row. Returns ``{old id: new id}``
+    when ``keep_ids`` is set.
+    """
+    id_map = {}
+    batch, old_ids = [], []
+
+    def flush():
+        try:
+            model.objects.bulk_create(batch)
+        except (IntegrityError, DataError) as exc:
+            raise ArchiveError(f"Недопустимые данные в {name}") from exc
+        if keep_ids:
+            id_map.update(zip(old_ids, (instance.pk for instance in batch)))
+        batch.clear()
+        old_ids.clear()
+
+    for row in _rows(archive, name):
+        try:
+            instance = build(row)
+        except ArchiveError:
+            raise
+        except (KeyError, TypeError, ValueError, ValidationError) as exc:
+            raise ArchiveError(f"Повреждённая запись в {name}") from exc
+        if instance is None:
+            continue
+        batch.append(instance)
+        old_ids.append(row.get("id"))
+        if len(batch) >= BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+    return id_map
+
+
+def _restore_media(archive: zipfile.ZipFile, path: str, field, saved: list) -> str:
+    if not path:
+        return ""
+    try:
+        member = archive.open(f"media/{path}")
+    except KeyError:
+        return ""
+    # A fresh name under the field's own directory: the archive's path is
+    # not trusted, and nothing existing can be overwritten.
+    extension = posixpath.splitext(path)[1].lower()
+    if not extension[1:].isalnum():
+        extension = ""
+    name = posixpath.join(field.upload_to, f"{uuid.uuid4().hex}{extension}")
+    with member:
+        name = default_storage.save(name, File(member, name=name))
+    saved.append(name)
+    return name
+
+
+def _open(fileobj) -> tuple[zipfile.ZipFile, dict]:
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile as exc:
+        raise ArchiveError("Файл не является архивом кампании") from exc
+    try:
+        header = json.loads(archive.read("campaign.json"))
+    except (KeyError, ValueError) as exc:
+        archive.close()
+        raise ArchiveError("В архиве нет описания кампании") from exc
+    if not isinstance(header, dict) or header.get("format") != FORMAT_VERSION:
+        archive.close()
+        raise ArchiveError("Неподдерживаемая версия архива")
+    if not isinstance(header.get("campaign"), dict):
+        archive.close()
+        raise ArchiveError("В архиве нет описания кампании")
+    return archive, header
+
+
+def check_archive(fileobj) -> None:
+    """Raise ``ArchiveError`` unless ``fileobj`` looks like an importable archive."""
+    archive, _ = _open(fileobj)
+    archive.close()
+    fileobj.seek(0)
+
+
+def import_archive(fileobj, owner) -> Campaign:
+    """
+    Create a new campaign owned by ``owner`` from an exported archive.
+    Call it outside a transaction: the images it saved are only cleaned up
+    when its own transaction rolls back.
+    """
+    saved = []
+    try:
+        with transaction.atomic():
+            campaign, sheet_ids = _import(fileobj, owner, saved)
+    except BaseException:
+        for name in saved:
+            default_storage.delete(name)
+        raise
+
+    # bulk_create bypasses the signals that maintain these.
+    matcher = get_matcher()
+    for character in CharacterSheet.objects.filter(id__in=sheet_ids.values()):
+        link_spells(character, matcher)
+    search.rebuild(campaign_id=campaign.id)
+    Campaign.bump_revision(pk=campaign.pk)
+    response_cache.invalidate_campaign(campaign.pk)
+    return campaign
+
+
+def _import(fileobj, owner, saved: list) -> tuple[Campaign, dict]:
+    archive, header = _open(fileobj)
+    with archive:
+        campaign = _instance(
+            Campaign,
+            {key: value for key, value in header["campaign"].items() if key in CAMPAIGN_FIELDS},
+            owner_id=owner.id,
+        )
+        campaign.save()
+
+        class_ids = dict(Class.objects.values_list("name", "id"))
+        appearance = CharacterSheet._meta.get_field("appearance_image")
+        symbol = CharacterSheet._meta.get_field("symbol_image")
+
+        def sheet(row):
+            if row["class_name"] not in class_ids:
+                raise ArchiveError(f"Неизвестный класс персонажа: {row['class_name']}")
+            return _instance(
+                CharacterSheet,
+                row,
+                owner_id=owner.id,
+                character_class_id=class_ids[row["class_name"]],
+                appearance_image=_restore_media(archive, row["appearance_image"], appearance, saved),
+                symbol_image=_restore_media(archive, row["symbol_image"], symbol, saved),
+            )
+
+        sheet_ids = _load(archive, "character_sheets.ndjson", CharacterSheet, sheet, keep_ids=True)
+        campaign.characters.set(
+            sheet_ids[old_id] for old_id in header.get("characters", []) if old_id in sheet_ids
+        )
+
+        session_ids = _load(
+            archive,
+            "sessions.ndjson",
+            Session,
+            lambda row: _instance(Session, row, campaign_id=campaign.id),
+            keep_ids=True,
+        )
+        _load(
+            archive,
+            "dm_notes.ndjson",
+            DMNote,
+            lambda row: _instance(
+                DMNote, row, session_id=_remap(session_ids, row.get("session_id"), "сессию")
+            ),
+        )
+        _load(
+            archive,
+            "campaign_notes.ndjson",
+            CampaignNote,
+            lambda row: _instance(CampaignNote, row, campaign_id=campaign.id),
+        )
+        storyline_ids = _load(
+            archive,
+            "storylines.ndjson",
+            Storyline,
+            lambda row: _instance(Storyline, row, campaign_id=campaign.id),
+            keep_ids=True,
+        )
+        _load(
+            archive,
+            "story_outcomes.ndjson",
+            StoryOutcome,
+            lambda row: _instance(
+                StoryOutcome,
+                row,
+                storyline_id=_remap(storyline_ids, row.get("storyline_id"), "линию сюжета"),
+            ),
+        )
+        _load(
+            archive,
+            "chat_messages.ndjson",
+            ChatMessage,
+            lambda row: _instance(
+                ChatMessage, row, campaign_id=campaign.id, user_id=owner.id
+            ),
+        )
+    return campaign, sheet_ids
@@ -0,0 +1,95 @@
+"""
+Deep copy of a campaign's prepared content for running it with another group.
+
+Every table is read with one ``values()`` query and written with one
+``bulk_create``, so the number of queries does not grow with the module.
+"""
+from django.db import transaction
+
+from . import response_cache
+from .jobs import enqueue
+from .models import Campaign, CampaignNote, DMNote, Session, Storyline, StoryOutcome
+
+
+def _copy(model, rows, remap=None, **values) -> dict[int, int]:
+    """
+    ``bulk_create`` copies of ``rows`` with ``values`` set and foreign keys
+    translated through ``remap`` (``{attname: {old id: new id}}``).
+    Returns ``{old id: new id}``.
+    """
+    remap = remap or {}
+    old_ids, objects = [], []
+    for row in rows:
+        old_ids.append(row.pop("id"))
+        for attname, id_map in remap.items():
+            row[attname] = id_map[row[attname]]
+        objects.append(model(**row, **values))
+    model.objects.bulk_create(objects)
+    return dict(zip(old_ids, (instance.pk for instance in objects)))
+
+
+def value_fields(model, exclude=()) -> list[str]:
+    """Column attnames of ``model`` for ``values()``, also used by ``accounts.campaign_archive``."""
+    return [
+        field.attname
+        for field in model._meta.concrete_fields
+        if field.attname not in exclude
+    ]
+
+
+@transaction.atomic
+def clone_campaign(
+    campaign: Campaign,
+    owner,
+    name: str | None = None,
+    include_dm_notes: bool = False,
+) -> Campaign:
+    """
+    Copy sessions, storylines with their outcomes, campaign notes and,
+    optionally, DM notes into a new campaign owned by ``owner``. Players,
+    join requests and chat stay with the original; the copy gets a fresh
+    join code.
+    """
+    copy = Campaign.objects.create(
+        name=name or f"{campaign.name} (копия)",
+        description=campaign.description,
+        world_story=campaign.world_story,
+        owner=owner,
+        is_public=campaign.is_public,
+        max_players=campaign.max_players,
+    )
+
+    session_ids = _copy(
+        Session,
+        campaign.sessions.order_by("id").values(*value_fields(Session, exclude=("campaign_id",))),
+        campaign_id=copy.pk,
+    )
+    if include_dm_notes:
+        _copy(
+            DMNote,
+            DMNote.objects.filter(session__campaign=campaign).order_by("id").values(*value_fields(DMNote)),
+            remap={"session_id": session_ids},
+        )
+    _copy(
+        CampaignNote,
+        campaign.notes.order_by("id").values(*value_fields(CampaignNote, exclude=("campaign_id",))),
+        campaign_id=copy.pk,
+    )
+    storyline_ids = _copy(
+        Storyline,
+        campaign.storylines.order_by("id").values(*value_fields(Storyline, exclude=("campaign_id",))),
+        campaign_id=copy.pk,
+    )
+    _copy(
+        StoryOutcome,
+        StoryOutcome.objects.filter(storyline__campaign=campaign)
+        .order_by("id")
+        .values(*value_fields(StoryOutcome)),
+        remap={"storyline_id": storyline_ids},
+    )
+
+    # bulk_create skips the signals that keep the search index current;
+    # the copy is indexed in the background.
+    enqueue("reindex_campaign", {"campaign": copy.pk}, owner=owner)
+    response_cache.invalidate_campaign(copy.pk)
+    return copy
@@ -0,0 +1,30 @@
+"""
+Side effects batched until the current transaction commits.
+
+Signal handlers run once per row, so a cascade delete or a bulk save would
+otherwise bump a campaign revision or drop a cache version once per row.
+``add()`` collects the keys instead; ``flush(keys)`` runs once on commit
+with all of them, and right away outside a transaction.
+
+Keys added in a transaction that is rolled back are flushed with the next
+commit. That is harmless for what is batched here: an extra revision bump
+or cache invalidation only costs a refetch.
+"""
+import threading
+
+from django.db import transaction
+
+_local = threading.local()
+
+
+def add(flush, *keys) -> None:
+    """Have ``flush`` called once with ``keys`` and every other key added before the commit."""
+    batches = _local.__dict__.setdefault("batches", {})
+    batches.setdefault(flush, set()).update(keys)
+    transaction.on_commit(lambda: _flush(flush))
+
+
+def _flush(flush) -> None:
+    keys = _local.batches.pop(flush, None)
+    if keys:
+        flush(keys)
@@ -0,0 +1,188 @@
+"""
+Response compression for the API: brotli or gzip, whichever the client
+prefers in ``Accept-Encoding`` (brotli on a tie; it needs the ``brotli``
+package).
+
+Only bodies of ``COMPRESSION_TYPES`` of at least ``COMPRESSION_MIN_SIZE``
+bytes are compressed; smaller ones cost more CPU than they save. Streaming
+responses are compressed chunk by chunk and flushed after every chunk, so
+the client still gets each one as soon as it is produced. Campaign exports
+are zip files and already compressed, so they pass through.
+
+BREACH: compressing a secret together with text someone else controls
+(chat messages, character names) lets an attacker who can watch the
+response size guess the secret byte by byte. Responses whose data has a
+non-empty ``COMPRESSION_SECRET_FIELDS`` key (the owner's join code, JWTs)
+are sent uncompressed.
+"""
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - gzip only
+    brotli = None
+
+
+class _Gzip:
+    def __init__(self):
+        # wbits 16 + 15: gzip container, no file name or timestamp.
+        self._stream = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._stream.compress(data)
+
+    def flush(self) -> bytes:
+        return self._stream.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._stream.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self._stream = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._stream.process(data)
+
+    def flush(self) -> bytes:
+        return self._stream.flush()
+
+    def finish(self) -> bytes:
+        return self._stream.finish()
+
+
+# In order of preference.
+ENCODINGS = {"br": _Brotli, "gzip": _Gzip} if brotli else {"gzip": _Gzip}
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """The encoding to use for ``Accept-Encoding``, or None for identity."""
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, *params = item.split(";")
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for coding in ENCODINGS:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def _compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    for allowed in settings.COMPRESSION_TYPES:
+        if allowed.endswith("/*"):
+            if media_type.startswith(allowed[:-1]):
+                return True
+        elif media_type == allowed:
+            return True
+    return False
+
+
+def _has_secret(data, fields) -> bool:
+    if isinstance(data, dict):
+        return any(
+            (key in fields and value) or _has_secret(value, fields) for key, value in data.items()
+        )
+    if isinstance(data, (list, tuple)):
+        return any(_has_secret(item, fields) for item in data)
+    return False
+
+
+def reflects_secret(response) -> bool:
+    fields = settings.COMPRESSION_SECRET_FIELDS
+    content = response.content
+    if not any(field.encode() in content for field in fields):
+        return False
+    if not hasattr(response, "data"):
+        # Not a DRF response; nothing to look into, so assume the worst.
+        return True
+    return _has_secret(response.data, fields)
+
+
+def _stream(chunks, compressor):
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _astream(chunks, compressor):
+    async for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.COMPRESSION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    def compress(self, request, response):
+        if response.has_header("Content-Encoding") or not _compressible(
+            response.get("Content-Type", "")
+        ):
+            return response
+        if not response.streaming and (
+            len(response.content) < settings.COMPRESSION_MIN_SIZE or reflects_secret(response)
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+        compressor = ENCODINGS[encoding]()
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _astream(response.streaming_content, compressor)
+            else:
+                response.streaming_content = _stream(response.streaming_content, compressor)
+            del response.headers["Content-Length"]
+        else:
+            body = compressor.compress(response.content) + compressor.finish()
+            if len(body) >= len(response.content):
+                return response
+            response.content = body
+            response.headers["Content-Length"] = str(len(body))
+
+        # The bytes differ from the identity encoding, so a strong ETag no
+        # longer holds.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,115 @@
+"""
+Conditional GET for the campaign viewsets.
+
+``ConditionalGetMixin`` gives ``list`` and ``retrieve`` a weak ``ETag``
+built from one aggregate over the filtered queryset (newest ``updated_at``
+and row count by default) and answers ``304 Not Modified`` when it matches
+``If-None-Match``, before anything is serialized or read from the response
+cache. ``retrieve`` also sends ``Last-Modified``; lists do not, because
+deleting a row leaves the newest timestamp where it was.
+
+What the rows show from other tables (author names, character classes,
+spells) does not move the aggregates. Views name the response cache scopes
+covering it in ``get_validator_scopes``, and the current versions of those
+scopes go into the ETag too; the signals that invalidate cached responses
+then change the ETag as well. Like the response cache, this needs a shared
+cache to reach every worker.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .response_cache import scope_versions
+
+
+def make_etag(request, values: dict) -> str:
+    """Weak ETag of ``values`` for this user, URL and ``Accept``."""
+    raw = ":".join(
+        [
+            str(request.user.pk or 0),
+            request.get_full_path(),
+            request.META.get("HTTP_ACCEPT", ""),
+        ]
+        + [f"{name}={values[name]}" for name in sorted(values)]
+    )
+    return f'W/"{hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()}"'
+
+
+def not_modified(request, etag: str, last_modified=None):
+    """``304 Not Modified`` if the client's copy is current, otherwise None."""
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+
+
+def add_validators(response, etag: str, last_modified=None):
+    response.headers["ETag"] = etag
+    if last_modified:
+        response.headers["Last-Modified"] = http_date(last_modified.timestamp())
+    # Browsers store the response but check with us before reusing it.
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ("Accept", "Authorization"))
+    return response
+
+
+def conditional_response(request, etag: str, build, last_modified=None):
+    """``build()`` with validators, or 304 when ``If-None-Match`` matches."""
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        response = build()
+        if response.status_code != 200:
+            return response
+    return add_validators(response, etag, last_modified)
+
+
+class ConditionalGetMixin:
+    def get_validator_aggregates(self) -> dict:
+        """Aggregates that change whenever the serialized rows would."""
+        return {"updated_at": Max("updated_at"), "count": Count("pk")}
+
+    def get_validator_scopes(self, request) -> list[str]:
+        """Response cache scopes of the related data the rows show."""
+        return []
+
+    def _validate(self, request, queryset) -> tuple[str, dict, list]:
+        values = queryset.order_by().aggregate(**self.get_validator_aggregates())
+        scopes = self.get_validator_scopes(request)
+        return make_etag(request, {**values, **scope_versions(scopes)}), values, scopes
+
+    def list_etag(self, request, queryset) -> str:
+        """The ETag ``list`` sends for ``queryset`` (used by the async views)."""
+        return self._validate(request, queryset)[0]
+
+    def _conditional(self, request, queryset, build, with_last_modified=False):
+        etag, values, scopes = self._validate(request, queryset)
+        if with_last_modified and not values["count"]:
+            # Let retrieve answer 404 as usual.
+            return build()
+        # The timestamp misses changes to the related data.
+        last_modified = values["updated_at"] if with_last_modified and not scopes else None
+        return conditional_response(request, etag, build, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(
+            request,
+            self.filter_queryset(self.get_queryset()),
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+
+        def build():
+            return super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (TypeError, ValueError):
+            return build()
+        return self._conditional(request, queryset, build, with_last_modified=True)
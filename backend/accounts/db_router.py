@@ -0,0 +1,110 @@
+"""
+Primary/replica routing (``DATABASE_REPLICA_URLS`` in settings).
+
+``ReplicaRoutingMiddleware`` lets reads of GET, HEAD and OPTIONS requests
+go to a replica; everything else, and every write, uses ``default``. After
+a user's successful write their reads stay on the primary for
+``REPLICA_STICKY_SECONDS``, so they see their own changes despite replica
+lag. Reads inside a transaction on the primary also stay there.
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.exceptions import APIException
+from rest_framework_simplejwt.settings import api_settings
+
+from .authentication import ClaimsJWTAuthentication
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_replicas_allowed = ContextVar("replicas_allowed", default=False)
+
+
+def replica_aliases() -> list[str]:
+    return [alias for alias in settings.DATABASES if alias.startswith("replica_")]
+
+
+class PrimaryReplicaRouter:
+    def __init__(self):
+        self.replicas = replica_aliases()
+
+    def db_for_read(self, model, **hints):
+        if not _replicas_allowed.get() or not self.replicas:
+            return "default"
+        if connections["default"].in_atomic_block:
+            return "default"
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+def _pin_key(user_id) -> str:
+    return f"primary-pin:{user_id}"
+
+
+def _user_id(request):
+    """User id from a valid bearer token, without a query; ``None`` otherwise."""
+    authenticator = ClaimsJWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        return authenticator.get_validated_token(raw_token).get(api_settings.USER_ID_CLAIM)
+    except APIException:
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        user_id = _user_id(request)
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            if user_id is not None and response.status_code < 400:
+                cache.set(_pin_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+            return response
+        pinned = user_id is not None and cache.get(_pin_key(user_id))
+        token = _replicas_allowed.set(not pinned)
+        try:
+            return self.get_response(request)
+        finally:
+            _replicas_allowed.reset(token)
+
+    async def __acall__(self, request):
+        user_id = _user_id(request)
+        if request.method not in SAFE_METHODS:
+            response = await self.get_response(request)
+            if user_id is not None and response.status_code < 400:
+                await cache.aset(_pin_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+            return response
+        pinned = user_id is not None and await cache.aget(_pin_key(user_id))
+        token = _replicas_allowed.set(not pinned)
+        try:
+            return await self.get_response(request)
+        finally:
+            _replicas_allowed.reset(token)
@@ -0,0 +1,40 @@
+"""
+Gauges for the PostgreSQL connection pool (``DB_POOL`` in settings).
+
+Every worker process has its own pool, so the numbers describe the process
+that answered the request.
+"""
+from django.db import connections
+
+
+def pool_stats(alias: str = "default") -> dict:
+    connection = connections[alias]
+    pool = getattr(connection, "pool", None)
+    if pool is None:
+        return {"pooled": False, "vendor": connection.vendor}
+
+    stats = pool.get_stats()
+    # The pool opens on first use; until then it holds no connections.
+    size = 0 if pool.closed else stats.get("pool_size", 0)
+    idle = 0 if pool.closed else stats.get("pool_available", 0)
+    requests = stats.get("requests_num", 0)
+    wait_ms = stats.get("requests_wait_ms", 0)
+    return {
+        "pooled": True,
+        "vendor": connection.vendor,
+        "open": not pool.closed,
+        "min_size": stats.get("pool_min", pool.min_size),
+        "max_size": stats.get("pool_max", pool.max_size),
+        "size": size,
+        "in_use": size - idle,
+        "idle": idle,
+        "waiting": stats.get("requests_waiting", 0),
+        "requests": requests,
+        "requests_queued": stats.get("requests_queued", 0),
+        "requests_errors": stats.get("requests_errors", 0) + stats.get("requests_timeouts", 0),
+        "wait_ms_total": wait_ms,
+        "wait_ms_avg": round(wait_ms / requests, 3) if requests else 0.0,
+        "connections_opened": stats.get("connections_num", 0),
+        "connection_errors": stats.get("connections_errors", 0),
+        "connections_lost": stats.get("connections_lost", 0),
+    }
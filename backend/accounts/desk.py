@@ -0,0 +1,126 @@
+"""
+Campaign desk bootstrap: everything the desk pages need for one campaign,
+assembled with a fixed number of queries.
+"""
+from django.conf import settings
+
+from .fast_serializers import CharacterSheetFastSerializer, ChatMessageFastSerializer
+from .models import (
+    CampaignNote,
+    CharacterSheet,
+    ChatMessage,
+    DMNote,
+    Session,
+    StoryOutcome,
+    Storyline,
+)
+from .serializers import (
+    CampaignNoteSerializer,
+    CampaignSerializer,
+    CharacterSheetSerializer,
+    ChatMessageSerializer,
+    DMNoteSerializer,
+    SessionSerializer,
+    StoryOutcomeSerializer,
+    StorylineSerializer,
+)
+
+
+def _sections(campaign, user, is_owner: bool) -> dict:
+    """Querysets for each section, keyed by response field."""
+    chat_limit = getattr(settings, "DESK_CHAT_LIMIT", 100)
+    sections = {
+        "sessions": Session.objects.filter(campaign=campaign).order_by("id"),
+        # Newest messages; put back in chronological order by _render().
+        "chat_messages": ChatMessage.objects.select_related("user")
+        .filter(campaign=campaign)
+        .order_by("-created_at", "-id")[:chat_limit],
+        "characters": CharacterSheet.objects.select_related("character_class")
+        .prefetch_related("resolved_spells")
+        .filter(owner=user)
+        .order_by("id"),
+    }
+    if is_owner:
+        sections.update(
+            dm_notes=DMNote.objects.filter(session__campaign=campaign).order_by("id"),
+            campaign_notes=CampaignNote.objects.filter(campaign=campaign).order_by("-created_at"),
+            storylines=Storyline.objects.filter(campaign=campaign).order_by("order", "id"),
+            story_outcomes=StoryOutcome.objects.filter(storyline__campaign=campaign).order_by(
+                "storyline_id", "order", "id"
+            ),
+        )
+    return sections
+
+
+_SERIALIZERS = {
+    "sessions": SessionSerializer,
+    "chat_messages": ChatMessageSerializer,
+    "characters": CharacterSheetSerializer,
+    "dm_notes": DMNoteSerializer,
+    "campaign_notes": CampaignNoteSerializer,
+    "storylines": StorylineSerializer,
+    "story_outcomes": StoryOutcomeSerializer,
+}
+
+# Sections serialized from values() rows when FAST_SERIALIZERS is on.
+_FAST_SERIALIZERS = {
+    "chat_messages": ChatMessageFastSerializer,
+    "characters": CharacterSheetFastSerializer,
+}
+
+
+def _fast(context: dict) -> dict:
+    if not settings.FAST_SERIALIZERS:
+        return {}
+    return {name: serializer_class(context) for name, serializer_class in _FAST_SERIALIZERS.items()}
+
+
+def _render(campaign, context: dict, is_owner: bool, rows: dict, serialized=()) -> dict:
+    """``rows`` of the sections in ``serialized`` are already serialized."""
+    rows["chat_messages"].reverse()
+    campaign_data = CampaignSerializer(campaign, context=context).data
+    # The desk never shows the join code; without it the response sits next
+    # to the chat without a secret and can be compressed (accounts.compression).
+    campaign_data.pop("join_code", None)
+    data = {
+        "version": campaign.revision,
+        "changed": True,
+        "role": "owner" if is_owner else "player",
+        "campaign": campaign_data,
+    }
+    for name, serializer_class in _SERIALIZERS.items():
+        if name not in rows:
+            data[name] = []
+        elif name in serialized:
+            data[name] = rows[name]
+        else:
+            data[name] = serializer_class(rows[name], many=True, context=context).data
+    return data
+
+
+def build_desk(campaign, context: dict) -> dict:
+    """
+    ``campaign`` must come from ``CampaignViewSet.get_queryset()`` so its join
+    requests are prefetched. Owner-only sections are empty lists for players.
+    """
+    user = context["request"].user
+    is_owner = campaign.owner_id == user.id
+    fast = _fast(context)
+    rows = {}
+    for name, qs in _sections(campaign, user, is_owner).items():
+        rows[name] = fast[name].serialize(fast[name].values(qs)) if name in fast else list(qs)
+    return _render(campaign, context, is_owner, rows, fast)
+
+
+async def abuild_desk(campaign, context: dict) -> dict:
+    """``build_desk()`` with the queries run through the async ORM."""
+    user = context["request"].user
+    is_owner = campaign.owner_id == user.id
+    fast = _fast(context)
+    rows = {}
+    for name, qs in _sections(campaign, user, is_owner).items():
+        if name in fast:
+            rows[name] = await fast[name].aserialize([row async for row in fast[name].values(qs)])
+        else:
+            rows[name] = [row async for row in qs]
+    return _render(campaign, context, is_owner, rows, fast)
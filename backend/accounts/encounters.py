@@ -0,0 +1,311 @@
+"""
+Monte Carlo encounter simulation.
+
+All dice are sampled as numpy arrays across the whole batch of simulated
+encounters at once; the only Python-level loop is over combat rounds, which
+are inherently sequential.
+"""
+import re
+
+import numpy as np
+
+
+ABILITIES = ("strength", "dexterity", "constitution", "intelligence", "wisdom", "charisma")
+
+DICE_RE = re.compile(r"^\s*(?:(\d*)\s*[dDкК]\s*(\d+))?\s*(?:([+-])?\s*(\d+))?\s*$")
+
+# Upper bound for trials processed in one set of arrays, keeps memory flat
+# regardless of the requested iteration count.
+BATCH_SIZE = 25_000
+
+
+def parse_dice(expression: str) -> tuple[int, int, int]:
+    """
+    Parse a dice expression like ``2d6+3``, ``d8``, ``1d10 - 1`` or ``5``.
+
+    Returns ``(count, sides, bonus)``.
+    """
+    match = DICE_RE.match(str(expression or ""))
+    if not match or not any(match.groups()):
+        raise ValueError(f"Некорректная формула урона: {expression!r}")
+    count, sides, sign, bonus = match.groups()
+    if sides is None:
+        if sign is None and bonus is None:
+            raise ValueError(f"Некорректная формула урона: {expression!r}")
+        count, sides = 0, 1
+    else:
+        count = int(count) if count else 1
+        sides = int(sides)
+        if sides < 1 or count > 100:
+            raise ValueError(f"Некорректная формула урона: {expression!r}")
+    value = int(bonus) if bonus else 0
+    if sign == "-":
+        value = -value
+    return count, sides, value
+
+
+def _ability_mod(sheet, ability: str) -> int:
+    mod = getattr(sheet, f"{ability}_mod", 0)
+    if mod:
+        return mod
+    return (getattr(sheet, ability, 10) - 10) // 2
+
+
+def _save_bonus(sheet, ability: str) -> int:
+    bonus = getattr(sheet, f"saving_throw_{ability}", 0)
+    if bonus:
+        return bonus
+    bonus = _ability_mod(sheet, ability)
+    if getattr(sheet, f"saving_throw_{ability}_prof", False):
+        bonus += sheet.proficiency_bonus
+    return bonus
+
+
+def party_profile(sheet) -> dict:
+    """
+    Derive combat numbers from a character sheet.
+
+    A character attacks with whichever is better: a weapon (1d8 + best of
+    STR/DEX, proficient) or a damage cantrip using the sheet's spell attack
+    bonus, scaled with character level like 5e cantrips.
+    """
+    weapon_mod = max(_ability_mod(sheet, "strength"), _ability_mod(sheet, "dexterity"))
+    weapon_attack = weapon_mod + sheet.proficiency_bonus
+    attack = (weapon_attack, 1, 8, weapon_mod)
+
+    has_spells = any(
+        getattr(sheet, name, "")
+        for name in ("spells", "spells_cantrips", "attacks_and_spells")
+    )
+    if has_spells and sheet.spell_attack_bonus > weapon_attack:
+        dice = 1 + (sheet.level >= 5) + (sheet.level >= 11) + (sheet.level >= 17)
+        attack = (sheet.spell_attack_bonus, dice, 10, 0)
+
+    hit_points = sheet.current_hit_points if sheet.current_hit_points > 0 else sheet.max_hit_points
+    hit_points = max(hit_points, 1) + max(sheet.temporary_hit_points, 0)
+    return {
+        "character_id": sheet.id,
+        "name": sheet.name,
+        "armor_class": sheet.armor_class,
+        "hit_points": hit_points,
+        "initiative": sheet.initiative or _ability_mod(sheet, "dexterity"),
+        "attack_bonus": attack[0],
+        "damage": attack[1:],
+        "saves": [_save_bonus(sheet, ability) for ability in ABILITIES],
+    }
+
+
+def _roll(rng, shape, count, sides, bonus):
+    """
+    Roll heterogeneous dice for a batch.
+
+    ``count``, ``sides`` and ``bonus`` are arrays broadcastable to ``shape``
+    along its last axis; every element gets its own ``count`` d ``sides`` + ``bonus``.
+    """
+    max_count = int(count.max()) if count.size else 0
+    if max_count == 0:
+        return np.broadcast_to(bonus, shape).astype(np.int32)
+    faces = rng.random(shape + (max_count,), dtype=np.float32)
+    rolls = (faces * sides[..., None]).astype(np.int32) + 1
+    rolls *= np.arange(max_count) < count[..., None]
+    return rolls.sum(axis=-1, dtype=np.int32) + bonus
+
+
+def _attack_table(rows: list[tuple[int, int, tuple[int, int, int]]]):
+    owner = np.array([row[0] for row in rows], dtype=np.intp)
+    attack = np.array([row[1] for row in rows], dtype=np.int32)
+    count = np.array([row[2][0] for row in rows], dtype=np.int32)
+    sides = np.array([row[2][1] for row in rows], dtype=np.int32)
+    bonus = np.array([row[2][2] for row in rows], dtype=np.int32)
+    return owner, attack, count, sides, bonus
+
+
+def _resolve_attacks(rng, batch, table, target_ac):
+    """Roll to-hit and damage for every attack row at once (nat 1 misses, nat 20 crits)."""
+    _, attack, count, sides, bonus = table
+    shape = (batch, attack.size)
+    d20 = rng.integers(1, 21, size=shape, dtype=np.int32)
+    crit = d20 == 20
+    hit = ((d20 + attack) >= target_ac) & (d20 != 1) | crit
+    damage = _roll(rng, shape, count, sides, bonus)
+    # Critical hits roll the damage dice again; only ~5% of rows need it.
+    crit_rows, crit_cols = np.nonzero(crit)
+    damage[crit_rows, crit_cols] += _roll(
+        rng, crit_cols.shape, count[crit_cols], sides[crit_cols], 0
+    )
+    return np.maximum(damage, 0) * hit
+
+
+def _random_alive(rng, alive, draws):
+    """Pick ``draws`` uniformly random alive indices per row of ``alive``."""
+    alive_count = alive.sum(axis=1, keepdims=True)
+    rank = (rng.random((alive.shape[0], draws)) * alive_count).astype(np.int32)
+    cumulative = alive.cumsum(axis=1, dtype=np.int32)
+    return (cumulative[:, None, :] > rank[:, :, None]).argmax(axis=2)
+
+
+class _Totals:
+    """Accumulates per-trial outcomes as finished trials drop out of the batch."""
+
+    def __init__(self, party_hp_start):
+        self.party_hp_start = party_hp_start
+        self.won = 0
+        self.wiped = 0
+        self.rounds = 0
+        self.survived = np.zeros(party_hp_start.size, dtype=np.int64)
+        self.hp_lost = np.zeros(party_hp_start.size, dtype=np.int64)
+
+    def add(self, party_hp, enemy_hp, rounds):
+        party_up = (party_hp > 0).any(axis=1)
+        self.won += int((~(enemy_hp > 0).any(axis=1) & party_up).sum())
+        self.wiped += int((~party_up).sum())
+        self.rounds += int(rounds.sum())
+        self.survived += (party_hp > 0).sum(axis=0)
+        self.hp_lost += (self.party_hp_start - np.clip(party_hp, 0, None)).sum(
+            axis=0, dtype=np.int64
+        )
+
+
+def _simulate_batch(rng, batch, party, enemies, max_rounds, totals):
+    party_count = len(party)
+    party_ac = np.array([p["armor_class"] for p in party], dtype=np.int32)
+    party_saves = np.array([p["saves"] for p in party], dtype=np.int32)
+    party_table = _attack_table(
+        [(i, p["attack_bonus"], p["damage"]) for i, p in enumerate(party)]
+    )
+    enemy_hp_start = np.array([e["hit_points"] for e in enemies], dtype=np.int32)
+    enemy_ac = np.array([e["armor_class"] for e in enemies], dtype=np.int32)
+    enemy_rows = [
+        (i, e["attack_bonus"], e["damage"])
+        for i, e in enumerate(enemies)
+        for _ in range(e["attacks"])
+    ]
+    enemy_table = _attack_table(enemy_rows) if enemy_rows else None
+    savers = [(i, e) for i, e in enumerate(enemies) if e.get("save_dc")]
+
+    party_hp = np.broadcast_to(totals.party_hp_start, (batch, party_count)).copy()
+    enemy_hp = np.broadcast_to(enemy_hp_start, (batch, len(enemies))).copy()
+
+    party_init = rng.integers(1, 21, size=(batch, party_count)) + [p["initiative"] for p in party]
+    enemy_init = rng.integers(1, 21, size=(batch, len(enemies))) + [e["initiative"] for e in enemies]
+    party_first = party_init.max(axis=1) >= enemy_init.max(axis=1)
+    rounds = np.zeros(batch, dtype=np.int32)
+
+    for round_number in range(max_rounds):
+        batch = party_hp.shape[0]
+        trial = np.arange(batch)
+        rounds += 1
+
+        # Party phase: everyone focuses the first enemy still standing.
+        acting = party_first | (round_number > 0)
+        target = (enemy_hp > 0).argmax(axis=1)
+        damage = _resolve_attacks(rng, batch, party_table, enemy_ac[target][:, None])
+        damage *= party_hp[:, party_table[0]] > 0
+        enemy_hp[trial, target] -= damage.sum(axis=1) * acting
+        fighting = (enemy_hp > 0).any(axis=1)
+
+        # Enemy phase: each attack picks a random conscious party member.
+        party_alive = party_hp > 0
+        loss = np.zeros((batch, party_count), dtype=np.int32)
+        if enemy_table is not None:
+            targets = _random_alive(rng, party_alive, enemy_table[0].size)
+            damage = _resolve_attacks(rng, batch, enemy_table, party_ac[targets])
+            damage *= (enemy_hp[:, enemy_table[0]] > 0) & fighting[:, None]
+            flat = (trial[:, None] * party_count + targets).ravel()
+            loss += np.bincount(
+                flat, weights=damage.ravel(), minlength=batch * party_count
+            ).reshape(batch, party_count).astype(np.int32)
+
+        for index, enemy in savers:
+            count, sides, bonus = enemy["save_damage"]
+            triggered = fighting & (enemy_hp[:, index] > 0) & (rng.random(batch) < enemy["save_chance"])
+            damage = _roll(rng, (batch,), np.array([count]), np.array([sides]), np.array([bonus]))
+            saved = (
+                rng.integers(1, 21, size=(batch, party_count), dtype=np.int32)
+                + party_saves[:, ABILITIES.index(enemy["save_ability"])]
+            ) >= enemy["save_dc"]
+            factor = np.where(saved, 0.5 if enemy["save_success"] == "half" else 0.0, 1.0)
+            loss += (damage[:, None] * factor).astype(np.int32) * (triggered[:, None] & party_alive)
+
+        party_hp -= loss
+        active = fighting & (party_hp > 0).any(axis=1)
+
+        # Retire finished fights so later rounds only roll for live ones.
+        if not active.all():
+            done = ~active
+            totals.add(party_hp[done], enemy_hp[done], rounds[done])
+            party_hp, enemy_hp = party_hp[active], enemy_hp[active]
+            party_first, rounds = party_first[active], rounds[active]
+            if not party_hp.shape[0]:
+                return
+
+    totals.add(party_hp, enemy_hp, rounds)
+
+
+def expand_opponents(opponents: list[dict]) -> list[dict]:
+    """Turn validated opponent groups into one entry per creature."""
+    enemies = []
+    for group in opponents:
+        entry = {
+            "name": group["name"],
+            "armor_class": group["armor_class"],
+            "hit_points": group["hit_points"],
+            "attack_bonus": group["attack_bonus"],
+            "damage": parse_dice(group["damage"]),
+            "attacks": group["attacks"],
+            "initiative": group["initiative"],
+        }
+        if group.get("save_dc"):
+            entry.update(
+                save_dc=group["save_dc"],
+                save_ability=group["save_ability"],
+                save_damage=parse_dice(group["save_damage"]),
+                save_chance=group["save_chance"],
+                save_success=group["save_success"],
+            )
+        enemies.extend(dict(entry) for _ in range(group["count"]))
+    return enemies
+
+
+def simulate_encounter(
+    characters,
+    opponents: list[dict],
+    iterations: int = 20_000,
+    max_rounds: int = 20,
+    seed: int | None = None,
+) -> dict:
+    """
+    Run ``iterations`` simulated fights between the party and the opponents.
+
+    ``characters`` are ``CharacterSheet`` instances, ``opponents`` are groups
+    as validated by ``EncounterSimulationSerializer``.
+    """
+    party = [party_profile(sheet) for sheet in characters]
+    enemies = expand_opponents(opponents)
+    rng = np.random.default_rng(seed)
+
+    totals = _Totals(np.array([p["hit_points"] for p in party], dtype=np.int32))
+    remaining = iterations
+    while remaining > 0:
+        batch = min(remaining, BATCH_SIZE)
+        _simulate_batch(rng, batch, party, enemies, max_rounds, totals)
+        remaining -= batch
+
+    return {
+        "iterations": iterations,
+        "rounds_simulated": totals.rounds,
+        "mean_rounds": round(totals.rounds / iterations, 3),
+        "win_probability": round(totals.won / iterations, 4),
+        "tpk_probability": round(totals.wiped / iterations, 4),
+        "timeout_probability": round(1 - (totals.won + totals.wiped) / iterations, 4),
+        "party": [
+            {
+                "character_id": member["character_id"],
+                "name": member["name"],
+                "starting_hit_points": member["hit_points"],
+                "survival_probability": round(float(totals.survived[i]) / iterations, 4),
+                "expected_hp_lost": round(float(totals.hp_lost[i]) / iterations, 2),
+            }
+            for i, member in enumerate(party)
+        ],
+    }
@@ -0,0 +1,292 @@
+"""
+Read-only fast paths for the serializers of the hottest lists: campaigns,
+chat messages and character sheets.
+
+A ``FastSerializer`` is compiled once from its DRF serializer class. Every
+field backed by a column, or by a ``source="a.b"`` lookup, becomes a
+``values_list()`` column, so rows come out of the database as tuples
+instead of model instances and are turned into dicts in one step. Only the
+fields whose value DRF changes (dates, images) are passed through the
+field's ``to_representation``. What the database cannot hand over directly
+(method fields, many-to-many ids) is filled in by ``extend()`` from the
+querysets of ``related()``, one query each per page.
+
+The output is the same as the DRF serializer's; ``manage.py
+verify_fast_serializers`` compares the two on the database and times them.
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .models import CampaignJoinRequest, CharacterSheet
+from .serializers import CampaignSerializer, CharacterSheetSerializer, ChatMessageSerializer
+
+# Prefix of the columns a row carries only for extend(); they are dropped
+# before the rows are returned.
+HIDDEN = "__"
+
+
+def _passes_through(field) -> bool:
+    """Whether ``field.to_representation`` returns a database value unchanged."""
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        return field.pk_field is None
+    if isinstance(field, serializers.BigIntegerField):
+        return not getattr(field, "coerce_to_string", api_settings.COERCE_BIGINT_TO_STRING)
+    if isinstance(field, serializers.JSONField):
+        return not field.binary
+    return isinstance(
+        field,
+        (
+            serializers.BooleanField,
+            serializers.CharField,
+            serializers.ChoiceField,
+            serializers.IntegerField,
+        ),
+    )
+
+
+class _Compiled:
+    def __init__(self, serializer_class, computed_fields, hidden_lookups):
+        serializer = serializer_class()
+        model = serializer_class.Meta.model
+        template = {}
+        names, lookups = [], []
+        converters, files, dotted = [], [], []
+
+        def column(lookup, name=None):
+            if lookup in lookups:
+                return names[lookups.index(lookup)]
+            lookups.append(lookup)
+            names.append(name or HIDDEN + lookup)
+            return names[-1]
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            template[name] = None
+            if name in computed_fields:
+                continue
+            if (
+                field.source == "*"
+                or isinstance(field, (serializers.ManyRelatedField, serializers.BaseSerializer))
+            ):
+                raise ImproperlyConfigured(
+                    f"{serializer_class.__name__}.{name} needs to be in computed_fields."
+                )
+            column("__".join(field.source_attrs), name)
+            if len(field.source_attrs) > 1:
+                # DRF leaves the field out when the relation is missing.
+                if not field.allow_null and field.default is empty:
+                    dotted.append((name, "__".join(field.source_attrs[:-1])))
+            elif isinstance(field, serializers.FileField):
+                use_url = getattr(field, "use_url", api_settings.UPLOADED_FILES_USE_URL)
+                files.append((name, model._meta.get_field(field.source).storage, use_url))
+            elif not _passes_through(field):
+                converters.append((name, field.to_representation))
+        dotted = [(name, column(parent)) for name, parent in dotted]
+        for lookup in hidden_lookups:
+            column(lookup)
+
+        self.template = template
+        self.names = tuple(names)
+        self.lookups = tuple(lookups)
+        self.converters = tuple(converters)
+        self.files = tuple(files)
+        self.dotted = tuple(dotted)
+        self.hidden = tuple(name for name in names if name.startswith(HIDDEN))
+
+
+class FastSerializer:
+    serializer_class = None
+    # Fields extend() fills in.
+    computed_fields = ()
+    # Extra columns extend() reads as row[HIDDEN + lookup].
+    hidden_lookups = ()
+
+    def __init__(self, context: dict):
+        self.context = context
+        self.request = context.get("request")
+
+    @classmethod
+    def compiled(cls) -> _Compiled:
+        if "_compiled" not in cls.__dict__:
+            cls._compiled = _Compiled(cls.serializer_class, cls.computed_fields, cls.hidden_lookups)
+        return cls._compiled
+
+    @classmethod
+    def values(cls, queryset):
+        """``queryset`` as the rows ``serialize()`` takes."""
+        return queryset.prefetch_related(None).values_list(*cls.compiled().lookups)
+
+    def related(self, data: list[dict]) -> dict:
+        """Querysets extend() needs for ``data``, by name."""
+        return {}
+
+    def extend(self, data: list[dict], related: dict) -> None:
+        """Fill in ``computed_fields`` from the evaluated ``related()``."""
+
+    def serialize(self, rows) -> list[dict]:
+        data = self._rows(rows)
+        self.extend(data, {name: list(qs) for name, qs in self.related(data).items()})
+        return self._strip(data)
+
+    async def aserialize(self, rows) -> list[dict]:
+        """``serialize()`` with the related queries run through the async ORM."""
+        data = self._rows(rows)
+        related = {}
+        for name, qs in self.related(data).items():
+            related[name] = [row async for row in qs]
+        self.extend(data, related)
+        return self._strip(data)
+
+    def _rows(self, rows) -> list[dict]:
+        compiled = self.compiled()
+        template, names = compiled.template, compiled.names
+        data = []
+        for row in rows:
+            item = template.copy()
+            item.update(zip(names, row))
+            for name, convert in compiled.converters:
+                if item[name] is not None:
+                    item[name] = convert(item[name])
+            for name, parent in compiled.dotted:
+                if item[parent] is None:
+                    del item[name]
+            for name, storage, use_url in compiled.files:
+                item[name] = self._file(item[name], storage, use_url)
+            data.append(item)
+        return data
+
+    def _file(self, value, storage, use_url):
+        # FileField.to_representation on the stored name.
+        if not value:
+            return None
+        if not use_url:
+            return value
+        url = storage.url(value)
+        return self.request.build_absolute_uri(url) if self.request is not None else url
+
+    def _strip(self, data: list[dict]) -> list[dict]:
+        hidden = self.compiled().hidden
+        if hidden:
+            for item in data:
+                for name in hidden:
+                    del item[name]
+        return data
+
+
+class ChatMessageFastSerializer(FastSerializer):
+    serializer_class = ChatMessageSerializer
+
+
+class CharacterSheetFastSerializer(FastSerializer):
+    serializer_class = CharacterSheetSerializer
+    computed_fields = ("resolved_spells", "resolved_spell_details")
+
+    def related(self, data):
+        return {
+            "spells": CharacterSheet.resolved_spells.through.objects.filter(
+                charactersheet_id__in=[item["id"] for item in data]
+            )
+            # Spell.Meta.ordering, as the prefetch used by the viewset.
+            .order_by("spell__name", "spell__level")
+            .values_list("charactersheet_id", "spell_id", "spell__name", "spell__index", "spell__level")
+        }
+
+    def extend(self, data, related):
+        spells = {}
+        for sheet_id, spell_id, name, index, level in related["spells"]:
+            spells.setdefault(sheet_id, []).append(
+                {"id": spell_id, "name": name, "index": index, "level": level}
+            )
+        for item in data:
+            details = spells.get(item["id"], [])
+            item["resolved_spells"] = [spell["id"] for spell in details]
+            item["resolved_spell_details"] = details
+
+
+class CampaignFastSerializer(FastSerializer):
+    serializer_class = CampaignSerializer
+    computed_fields = (
+        "join_code",
+        "is_owner",
+        "players",
+        "players_count",
+        "pending_requests_count",
+        "my_request_status",
+    )
+    hidden_lookups = ("join_code",)
+
+    def related(self, data):
+        return {
+            "requests": CampaignJoinRequest.objects.filter(
+                campaign_id__in=[item["id"] for item in data]
+            ).values_list(
+                "campaign_id",
+                "user_id",
+                "user__username",
+                "status",
+                "character_id",
+                "character__name",
+                "character__character_class__name",
+                "character__level",
+            )
+        }
+
+    def extend(self, data, related):
+        requests = {}
+        for row in related["requests"]:
+            requests.setdefault(row[0], []).append(row)
+        user = self.request.user if self.request is not None else None
+        user_id = user.id if user is not None and user.is_authenticated else None
+        accepted = CampaignJoinRequest.Status.ACCEPTED
+        pending = CampaignJoinRequest.Status.PENDING
+        for item in data:
+            rows = requests.get(item["id"], [])
+            is_owner = user_id is not None and item["owner"] == user_id
+            item["join_code"] = item[HIDDEN + "join_code"] if is_owner else None
+            item["is_owner"] = is_owner
+            item["players"] = [
+                {
+                    "id": row[1],
+                    "username": row[2],
+                    "character_id": row[4],
+                    "character_name": row[5] if row[4] is not None else "",
+                    "character_class_name": row[6] if row[6] is not None else "",
+                    "level": row[7],
+                }
+                for row in rows
+                if row[3] == accepted
+            ]
+            item["players_count"] = len(item["players"])
+            item["pending_requests_count"] = (
+                sum(1 for row in rows if row[3] == pending) if is_owner else 0
+            )
+            item["my_request_status"] = None
+            if user_id is not None and not is_owner:
+                item["my_request_status"] = next(
+                    (row[3] for row in rows if row[1] == user_id), None
+                )
+
+
+class FastListMixin:
+    """Serve ``list`` through ``fast_serializer_class`` when FAST_SERIALIZERS is on."""
+
+    fast_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if self.fast_serializer_class is None or not settings.FAST_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+        return self.fast_list(self.filter_queryset(self.get_queryset()))
+
+    def fast_list(self, queryset):
+        """The (paginated) list response for ``queryset``."""
+        fast = self.fast_serializer_class(self.get_serializer_context())
+        queryset = fast.values(queryset)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(fast.serialize(page))
+        return Response(fast.serialize(queryset))
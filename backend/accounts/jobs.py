@@ -0,0 +1,205 @@
+"""
+Database-backed job queue.
+
+Jobs are rows in ``Job``; a worker (``manage.py run_worker``) claims due
+jobs, runs the registered task and records the outcome. No broker is
+needed.
+
+Claiming is a conditional ``UPDATE ... WHERE status = 'queued'`` stamped
+with a per-claim token, so two workers can never take the same job. On
+PostgreSQL candidates are first selected with ``FOR UPDATE SKIP LOCKED``,
+so concurrent workers skip each other's rows instead of queueing on them;
+SQLite serialises writers anyway.
+
+Failed jobs are retried with exponential backoff until ``max_attempts``.
+While a job runs, its worker refreshes ``locked_at`` every
+``JOB_HEARTBEAT_INTERVAL`` seconds. A job not refreshed for
+``JOB_LOCK_TIMEOUT`` seconds is taken to have lost its worker. It is put
+back in the queue, or marked failed once its attempts are used up.
+"""
+import logging
+import random
+import threading
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F, Subquery
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class JobFailed(Exception):
+    """Raised by a task for errors that a retry cannot fix."""
+
+
+def task(name: str):
+    """Register a function ``fn(payload: dict) -> JSON-serializable`` as a job handler."""
+
+    def decorator(func):
+        _registry[name] = func
+        return func
+
+    return decorator
+
+
+def enqueue(name: str, payload: dict | None = None, owner=None, delay: float = 0, **options) -> Job:
+    """
+    Add a job. It is visible to workers once the current transaction
+    commits, so jobs created together with the data they act on are safe.
+    """
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        owner=owner,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        **options,
+    )
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter: base, 2 x base, 4 x base, ... capped."""
+    base = _setting("JOB_RETRY_BASE_DELAY", 10)
+    cap = _setting("JOB_RETRY_MAX_DELAY", 3600)
+    delay = min(cap, base * 2 ** max(attempts - 1, 0))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def requeue_stale() -> tuple[int, int]:
+    """
+    Handle ``running`` jobs without a heartbeat for ``JOB_LOCK_TIMEOUT``:
+    queue them again, or fail those out of attempts. Returns the number of
+    requeued and failed jobs.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.Status.RUNNING,
+        locked_at__lt=now - timedelta(seconds=_setting("JOB_LOCK_TIMEOUT", 600)),
+    )
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.Status.FAILED,
+        last_error="The worker running the job stopped responding.",
+        locked_by="",
+        locked_at=None,
+        finished_at=now,
+    )
+    requeued = stale.filter(attempts__lt=F("max_attempts")).update(
+        status=Job.Status.QUEUED,
+        locked_by="",
+        locked_at=None,
+        run_at=now,
+    )
+    return requeued, failed
+
+
+def claim(limit: int) -> list[Job]:
+    """Atomically take up to ``limit`` due jobs for this worker."""
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    due = Job.objects.filter(
+        status=Job.Status.QUEUED,
+        run_at__lte=now,
+        attempts__lt=F("max_attempts"),
+    ).order_by("run_at", "id")
+    updates = {
+        "status": Job.Status.RUNNING,
+        "locked_by": token,
+        "locked_at": now,
+        "attempts": F("attempts") + 1,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list("id", flat=True)[:limit])
+            if not ids:
+                return []
+            Job.objects.filter(id__in=ids).update(**updates)
+    else:
+        # One statement, so SQLite takes the write lock up front instead of
+        # failing to upgrade a read transaction.
+        claimed = Job.objects.filter(
+            id__in=Subquery(due.values("id")[:limit]),
+            status=Job.Status.QUEUED,
+        ).update(**updates)
+        if not claimed:
+            return []
+    return list(Job.objects.filter(locked_by=token).order_by("run_at", "id"))
+
+
+class _Heartbeat(threading.Thread):
+    """Refreshes ``locked_at`` of a running job so ``requeue_stale()`` leaves it alone."""
+
+    def __init__(self, job: Job):
+        super().__init__(name=f"job-{job.pk}-heartbeat", daemon=True)
+        self.job = job
+        self._stopped = threading.Event()
+
+    def run(self):
+        interval = _setting("JOB_HEARTBEAT_INTERVAL", 60)
+        try:
+            while not self._stopped.wait(interval):
+                try:
+                    alive = Job.objects.filter(pk=self.job.pk, locked_by=self.job.locked_by).update(
+                        locked_at=timezone.now()
+                    )
+                except DatabaseError:
+                    # Busy database (SQLite writer lock); try again next beat.
+                    logger.warning("Heartbeat of job %s failed", self.job.pk, exc_info=True)
+                    continue
+                if not alive:
+                    logger.warning("Job %s (%s) lost its lock while running", self.job.pk, self.job.name)
+                    return
+        finally:
+            connection.close()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def _finish(job: Job, **updates) -> None:
+    if not Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        locked_by="", locked_at=None, **updates
+    ):
+        logger.warning("Outcome of job %s (%s) dropped: it lost its lock", job.pk, job.name)
+
+
+def run(job: Job) -> None:
+    """Execute a claimed job and store its outcome."""
+    func = _registry.get(job.name)
+    heartbeat = _Heartbeat(job)
+    heartbeat.start()
+    try:
+        if func is None:
+            raise LookupError(f"Unknown job {job.name!r}")
+        result = func(job.payload)
+    except Exception as exc:
+        heartbeat.stop()
+        logger.exception("Job %s (%s) failed", job.pk, job.name)
+        error = traceback.format_exc()
+        retryable = func is not None and not isinstance(exc, JobFailed)
+        if retryable and job.attempts < job.max_attempts:
+            updates = {
+                "status": Job.Status.QUEUED,
+                "run_at": timezone.now() + timedelta(seconds=retry_delay(job.attempts)),
+            }
+        else:
+            updates = {"status": Job.Status.FAILED, "finished_at": timezone.now()}
+        _finish(job, last_error=error, **updates)
+        return
+    except BaseException:
+        heartbeat.stop()
+        raise
+    heartbeat.stop()
+    _finish(job, status=Job.Status.DONE, result=result, finished_at=timezone.now())
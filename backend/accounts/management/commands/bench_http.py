@@ -0,0 +1,139 @@
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class _Connection:
+    """Minimal keep-alive HTTP/1.1 client; enough for Django's responses."""
+
+    def __init__(self, host: str, port: int, headers: dict):
+        self.host, self.port = host, port
+        self.headers = "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        self.reader = self.writer = None
+
+    async def get(self, path: str) -> int:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\n{self.headers}\r\n".encode()
+        )
+        await self.writer.drain()
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split()[1])
+        headers = {
+            name.strip().lower(): value.strip()
+            for name, _, value in (line.partition(":") for line in lines[1:] if line)
+        }
+        if "content-length" in headers:
+            await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            await self.reader.read()
+            headers["connection"] = "close"
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+
+class Command(BaseCommand):
+    help = (
+        "Load a running server with many concurrent keep-alive connections and "
+        "report throughput and latency. Run it against SERVER_MODE=wsgi and "
+        "SERVER_MODE=asgi deployments to compare them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", help="Full URL to request, e.g. http://localhost:8000/api/accounts/campaigns/public/")
+        parser.add_argument("--connections", type=int, default=500)
+        parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run.")
+        parser.add_argument("--username", help="Log in first and send the access token.")
+        parser.add_argument("--password")
+        parser.add_argument(
+            "--background-url",
+            help="Also keep --background-connections busy on this URL (e.g. a chat long poll); not measured.",
+        )
+        parser.add_argument("--background-connections", type=int, default=0)
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        if url.scheme != "http" or not url.hostname:
+            raise CommandError("Only plain http:// URLs are supported.")
+        headers = {"Accept": "application/json"}
+        if options["username"]:
+            headers["Authorization"] = f"Bearer {self._login(url, options['username'], options['password'])}"
+
+        latencies, errors = asyncio.run(self._run(url, headers, options))
+        if not latencies:
+            raise CommandError(f"No successful requests ({errors} errors).")
+        latencies.sort()
+
+        def percentile(share):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * share))] * 1000
+
+        self.stdout.write(
+            f"{len(latencies)} requests in {options['duration']:.0f} s: "
+            f"{len(latencies) / options['duration']:.1f}/s, {errors} errors\n"
+            f"latency p50 {statistics.median(latencies) * 1000:.1f} ms, "
+            f"p95 {percentile(0.95):.1f} ms, p99 {percentile(0.99):.1f} ms, "
+            f"max {latencies[-1] * 1000:.1f} ms"
+        )
+
+    def _login(self, url, username, password):
+        if not password:
+            raise CommandError("--password is required with --username")
+        request = Request(
+            f"{url.scheme}://{url.netloc}/api/accounts/login/",
+            data=json.dumps({"username": username, "password": password}).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urlopen(request) as response:
+            return json.loads(response.read())["tokens"]["access"]
+
+    async def _run(self, url, headers, options):
+        deadline = time.monotonic() + options["duration"]
+        latencies, errors = [], 0
+
+        def path_of(split):
+            return split.path + (f"?{split.query}" if split.query else "")
+
+        async def client(path, measured):
+            nonlocal errors
+            connection = _Connection(url.hostname, url.port or 80, headers)
+            try:
+                while time.monotonic() < deadline:
+                    started = time.perf_counter()
+                    try:
+                        status = await connection.get(path)
+                    except (OSError, asyncio.IncompleteReadError, ValueError):
+                        await connection.close()
+                        status = None
+                        await asyncio.sleep(0.05)
+                    if not measured:
+                        continue
+                    if status is not None and status < 400:
+                        latencies.append(time.perf_counter() - started)
+                    else:
+                        errors += 1
+            finally:
+                await connection.close()
+
+        clients = [client(path_of(url), True) for _ in range(options["connections"])]
+        if options["background_url"]:
+            background = path_of(urlsplit(options["background_url"]))
+            clients += [client(background, False) for _ in range(options["background_connections"])]
+        await asyncio.gather(*clients)
+        return latencies, errors
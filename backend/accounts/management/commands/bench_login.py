@@ -0,0 +1,89 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import hashers
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+
+from accounts import passwords
+from accounts.views import LoginView
+
+
+def _report(stdout, label, latencies, elapsed):
+    latencies = sorted(latencies)
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    stdout.write(
+        f"{label:<28} {len(latencies) / elapsed:8.1f}/s"
+        f"  p50 {statistics.median(latencies) * 1000:7.1f} ms"
+        f"  p95 {p95 * 1000:7.1f} ms"
+    )
+
+
+def _timed(func):
+    def wrapper(*args):
+        started = time.perf_counter()
+        func(*args)
+        return time.perf_counter() - started
+
+    return wrapper
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure password verification throughput and latency for the configured "
+        "hashers, and optionally end-to-end logins, to tune hashing cost settings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=64)
+        parser.add_argument(
+            "--concurrency",
+            default="1,2,4,8",
+            help="Comma-separated numbers of simultaneous clients.",
+        )
+        parser.add_argument("--username", help="Also benchmark LoginView with this account.")
+        parser.add_argument("--password")
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options["concurrency"].split(",")]
+        except ValueError as exc:
+            raise CommandError("--concurrency must be a list of integers") from exc
+        total = options["requests"]
+
+        for hasher in hashers.get_hashers():
+            try:
+                encoded = hasher.encode("bench-password", hasher.salt())
+            except ValueError as exc:
+                self.stdout.write(f"{hasher.algorithm}: skipped ({exc})")
+                continue
+            verify = _timed(lambda: passwords.run(hasher.verify, "bench-password", encoded))
+            for level in levels:
+                self._run(f"{hasher.algorithm} x{level}", verify, level, total)
+
+        if options["username"]:
+            if not options["password"]:
+                raise CommandError("--password is required with --username")
+            factory = RequestFactory()
+            view = LoginView.as_view()
+            body = {"username": options["username"], "password": options["password"]}
+
+            def login():
+                try:
+                    response = view(factory.post("/login/", body, content_type="application/json"))
+                    if response.status_code != 200:
+                        raise CommandError(f"Login failed with status {response.status_code}")
+                finally:
+                    connection.close()
+
+            for level in levels:
+                self._run(f"login x{level}", _timed(login), level, total)
+
+    def _run(self, label, call, level, total):
+        with ThreadPoolExecutor(max_workers=level) as clients:
+            started = time.perf_counter()
+            latencies = list(clients.map(lambda _: call(), range(total)))
+            elapsed = time.perf_counter() - started
+        _report(self.stdout, label, latencies, elapsed)
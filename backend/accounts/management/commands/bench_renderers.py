@@ -0,0 +1,89 @@
+import json
+import time
+from itertools import cycle, islice
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from accounts.models import Campaign, CharacterSheet
+from accounts.renderers import MessagePackRenderer, ORJSONRenderer
+from accounts.serializers import CampaignSerializer, CharacterSheetSerializer
+from accounts.views import campaign_join_requests_prefetch
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare render time of DRF's JSONRenderer and ORJSONRenderer on full "
+        "pages of character sheets and campaigns built from the database, and "
+        "the size of the MessagePack and columnar variants."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=500)
+        parser.add_argument("--page-size", type=int, default=api_settings.PAGE_SIZE)
+
+    def handle(self, *args, **options):
+        request = Request(RequestFactory().get("/"))
+        request.user = AnonymousUser()
+        context = {"request": request, "view": None, "format": None}
+        size = options["page_size"]
+
+        sheets = list(
+            CharacterSheet.objects.select_related("character_class")
+            .prefetch_related("resolved_spells")
+            .order_by("id")[:size]
+        )
+        campaigns = list(
+            Campaign.objects.select_related("owner")
+            .prefetch_related(campaign_join_requests_prefetch())
+            .order_by("id")[:size]
+        )
+        if not sheets or not campaigns:
+            raise CommandError("Needs at least one character sheet and one campaign (see seed_demo).")
+
+        pages = {
+            "character sheets": CharacterSheetSerializer(sheets, many=True, context=context).data,
+            "campaigns": CampaignSerializer(campaigns, many=True, context=context).data,
+        }
+        for label, rows in pages.items():
+            # Repeat the rows up to a full page of the usual envelope.
+            data = {"count": size, "next": None, "previous": None, "results": list(islice(cycle(rows), size))}
+            self._compare(label, data, options["iterations"])
+
+    def _compare(self, label, data, iterations):
+        timings = {}
+        outputs = {}
+        for renderer in (JSONRenderer(), ORJSONRenderer()):
+            renderer.render(data)
+            started = time.perf_counter()
+            for _ in range(iterations):
+                outputs[type(renderer).__name__] = renderer.render(data)
+            timings[type(renderer).__name__] = (time.perf_counter() - started) / iterations
+
+        stock, fast = outputs["JSONRenderer"], outputs["ORJSONRenderer"]
+        if json.loads(stock) != json.loads(fast):
+            raise CommandError(f"{label}: renderers disagree")
+        self.stdout.write(
+            f"{label:<17} {len(stock) / 1024:7.1f} KiB  "
+            f"JSONRenderer {timings['JSONRenderer'] * 1000:7.3f} ms  "
+            f"ORJSONRenderer {timings['ORJSONRenderer'] * 1000:7.3f} ms  "
+            f"x{timings['JSONRenderer'] / timings['ORJSONRenderer']:.1f}"
+            f"{'' if stock == fast else '  (bytes differ)'}"
+        )
+
+        for renderer, media_type in (
+            (MessagePackRenderer(), "application/msgpack"),
+            (ORJSONRenderer(), "application/json; layout=columnar"),
+            (MessagePackRenderer(), "application/msgpack; layout=columnar"),
+        ):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                body = renderer.render(data, media_type)
+            elapsed = (time.perf_counter() - started) / iterations
+            self.stdout.write(
+                f"{'':<17} {len(body) / 1024:7.1f} KiB  {media_type:<37} {elapsed * 1000:7.3f} ms"
+            )
@@ -0,0 +1,97 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection, transaction
+
+PROFILES = {
+    "default": {},
+    "tuned": settings.SQLITE_OPTIONS,
+}
+
+
+def _worker(path, options, duration, start_at, results):
+    connection.close()
+    connection.settings_dict.update(NAME=path, OPTIONS=options)
+    while time.time() < start_at:
+        time.sleep(0.001)
+    written = locked = 0
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        try:
+            # Read, then write in the same transaction, like a view that
+            # validates before saving a chat message.
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT COUNT(*) FROM bench_message WHERE campaign = 1")
+                    cursor.execute(
+                        "INSERT INTO bench_message (campaign, text) VALUES (1, %s)",
+                        ["x" * 200],
+                    )
+            written += 1
+        except OperationalError as exc:
+            if "locked" not in str(exc):
+                raise
+            locked += 1
+            close_old_connections()
+    connection.close()
+    results.put((written, locked))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare write throughput and 'database is locked' errors of several "
+        "processes writing one SQLite file with default and tuned settings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=3)
+        parser.add_argument("--duration", type=float, default=5.0)
+        parser.add_argument("--profile", choices=sorted(PROFILES), action="append")
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context("fork")
+        for name in options["profile"] or sorted(PROFILES):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "bench.sqlite3")
+                self._create(path, PROFILES[name])
+                results = context.Queue()
+                start_at = time.time() + 0.5
+                processes = [
+                    context.Process(
+                        target=_worker,
+                        args=(path, PROFILES[name], options["duration"], start_at, results),
+                    )
+                    for _ in range(options["workers"])
+                ]
+                for process in processes:
+                    process.start()
+                totals = [results.get() for _ in processes]
+                for process in processes:
+                    process.join()
+
+            written = sum(result[0] for result in totals)
+            locked = sum(result[1] for result in totals)
+            attempts = written + locked
+            self.stdout.write(
+                f"{name:<8} {written / options['duration']:8.1f} writes/s, "
+                f"{locked} locked errors ({locked / attempts * 100 if attempts else 0:.1f}% of attempts)"
+            )
+
+    def _create(self, path, profile_options):
+        connection.close()
+        original = dict(connection.settings_dict)
+        connection.settings_dict.update(NAME=path, OPTIONS=profile_options)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "CREATE TABLE bench_message "
+                    "(id INTEGER PRIMARY KEY, campaign INTEGER NOT NULL, text TEXT NOT NULL)"
+                )
+        finally:
+            connection.close()
+            connection.settings_dict.clear()
+            connection.settings_dict.update(original)
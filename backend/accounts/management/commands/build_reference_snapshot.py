@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.reference_snapshot import build_snapshot, snapshot_path
+
+
+class Command(BaseCommand):
+    help = "Compile reference tables (classes, spells, ...) into the shared mmap snapshot."
+
+    def handle(self, *args, **options):
+        path = snapshot_path()
+        if path is None:
+            raise CommandError("REFERENCE_SNAPSHOT_PATH is not set.")
+        generation = build_snapshot(path)
+        self.stdout.write(
+            self.style.SUCCESS(f"Reference snapshot generation {generation} written to {path}.")
+        )
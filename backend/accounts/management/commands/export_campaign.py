@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.campaign_archive import export_archive
+from accounts.models import Campaign
+
+
+class Command(BaseCommand):
+    help = "Write a campaign archive (zip of NDJSON files) to a file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("campaign", type=int)
+        parser.add_argument("path")
+
+    def handle(self, *args, **options):
+        campaign = Campaign.objects.filter(pk=options["campaign"]).first()
+        if campaign is None:
+            raise CommandError(f"Campaign {options['campaign']} does not exist.")
+        with open(options["path"], "wb") as handle:
+            for chunk in export_archive(campaign):
+                handle.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Campaign {campaign.pk} exported to {options['path']}."))
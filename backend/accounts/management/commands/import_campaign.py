@@ -0,0 +1,23 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.campaign_archive import ArchiveError, import_archive
+
+
+class Command(BaseCommand):
+    help = "Create a campaign from an archive written by export_campaign."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--owner", required=True, help="Username of the new owner.")
+
+    def handle(self, *args, **options):
+        owner = User.objects.filter(username=options["owner"]).first()
+        if owner is None:
+            raise CommandError(f"User {options['owner']} does not exist.")
+        try:
+            with open(options["path"], "rb") as handle:
+                campaign = import_archive(handle, owner)
+        except ArchiveError as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(self.style.SUCCESS(f"Imported as campaign {campaign.pk}."))
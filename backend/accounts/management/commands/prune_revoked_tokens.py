@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounts import revocation
+
+
+class Command(BaseCommand):
+    help = "Delete revoked refresh tokens that have expired."
+
+    def handle(self, *args, **options):
+        deleted = revocation.prune()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired entries."))
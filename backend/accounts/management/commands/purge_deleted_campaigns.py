@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.purge import BATCH_SIZE, purge_deleted
+
+
+class Command(BaseCommand):
+    help = "Purge campaigns marked as deleted in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between batches to leave room for other writers.",
+        )
+        parser.add_argument("--loop", action="store_true", help="Keep running and poll for work.")
+        parser.add_argument("--interval", type=float, default=30.0, help="Polling interval with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            total = purge_deleted(batch_size=options["batch_size"], pause=options["pause"])
+            if total:
+                self.stdout.write(f"Purged {total} rows.")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.core.management.base import BaseCommand
+
+from accounts import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the campaign full-text search documents."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--campaign", type=int, help="Only rebuild one campaign.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = search.rebuild(campaign_id=options["campaign"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} documents."))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import CharacterSheet
+from accounts.spell_matcher import (
+    SPELL_TEXT_FIELDS,
+    AhoCorasick,
+    get_matcher,
+    invalidate,
+    resolve_spell_ids,
+)
+
+
+class Command(BaseCommand):
+    help = "Re-resolve free-text spell lists of all character sheets to Spell records."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        invalidate()
+        matcher = get_matcher()
+        self.stdout.write(f"Automaton built: {len(matcher)} states.")
+
+        Link = CharacterSheet.resolved_spells.through
+        sheets = CharacterSheet.objects.only("id", *SPELL_TEXT_FIELDS).order_by("id")
+        batch = []
+        total = links = 0
+        for sheet in sheets.iterator(chunk_size=batch_size):
+            batch.append(sheet)
+            if len(batch) >= batch_size:
+                links += self._relink(Link, batch, matcher)
+                total += len(batch)
+                batch = []
+        if batch:
+            links += self._relink(Link, batch, matcher)
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Relinked {total} sheets, {links} spell links."))
+
+    def _relink(self, Link, sheets, matcher: AhoCorasick) -> int:
+        rows = [
+            Link(charactersheet_id=sheet.id, spell_id=spell_id)
+            for sheet in sheets
+            for spell_id in resolve_spell_ids(sheet, matcher)
+        ]
+        with transaction.atomic():
+            Link.objects.filter(charactersheet_id__in=[sheet.id for sheet in sheets]).delete()
+            Link.objects.bulk_create(rows)
+        return len(rows)
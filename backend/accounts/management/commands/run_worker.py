@@ -0,0 +1,81 @@
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from accounts import jobs, revocation, tasks, throttling  # noqa: F401  (registers the handlers)
+
+
+def _run_in_thread(job):
+    try:
+        jobs.run(job)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs with a pool of worker threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=2)
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument(
+            "--stale-check-interval",
+            type=float,
+            default=60.0,
+            help="How often to requeue or fail jobs whose worker died and prune expired revoked tokens and throttle counters.",
+        )
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty.")
+
+    def handle(self, *args, **options):
+        threads = max(1, options["threads"])
+        # SQLite allows a single writer: run jobs one by one in this thread.
+        inline = connection.vendor == "sqlite"
+        if inline:
+            threads = 1
+        poll_interval = options["poll_interval"]
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(
+            "Worker started, running jobs inline (SQLite)."
+            if inline
+            else f"Worker started with {threads} threads."
+        )
+        running = set()
+        next_stale_check = 0.0
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="job") as pool:
+            while not stopping:
+                close_old_connections()
+                if time.monotonic() >= next_stale_check:
+                    requeued, failed = jobs.requeue_stale()
+                    if requeued or failed:
+                        self.stdout.write(f"Stale jobs: {requeued} requeued, {failed} failed.")
+                    revocation.prune()
+                    throttling.prune()
+                    next_stale_check = time.monotonic() + options["stale_check_interval"]
+
+                claimed = jobs.claim(threads - len(running)) if len(running) < threads else []
+                for job in claimed:
+                    if inline:
+                        jobs.run(job)
+                    else:
+                        running.add(pool.submit(_run_in_thread, job))
+
+                if not claimed and not running and options["once"]:
+                    break
+                if running:
+                    _, running = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                elif not claimed:
+                    time.sleep(poll_interval)
+            if running:
+                self.stdout.write(f"Waiting for {len(running)} running jobs.")
+        self.stdout.write("Worker stopped.")
@@ -0,0 +1,91 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from accounts.fast_serializers import (
+    CampaignFastSerializer,
+    CharacterSheetFastSerializer,
+    ChatMessageFastSerializer,
+)
+from accounts.models import CharacterSheet
+from accounts.renderers import dumps
+from accounts.views import chat_messages, member_campaigns, public_campaigns
+
+
+def _sheets(user):
+    # CharacterSheetViewSet.get_queryset()
+    return (
+        CharacterSheet.objects.select_related("character_class")
+        .prefetch_related("resolved_spells")
+        .filter(owner=user)
+        .order_by("id")
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that the fast serializers render the same JSON as the DRF "
+        "serializers for every user's campaigns, chat and character sheets, "
+        "and time a page of each (query and serialization)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=api_settings.PAGE_SIZE)
+        parser.add_argument("--iterations", type=int, default=50)
+
+    def handle(self, *args, **options):
+        size = options["page_size"]
+        timings = {}
+        checked = 0
+        for user in [AnonymousUser(), *User.objects.order_by("id")]:
+            request = Request(RequestFactory().get("/"))
+            request.user = user
+            context = {"request": request, "view": None, "format": None}
+            lists = [
+                ("public campaigns", CampaignFastSerializer, public_campaigns()),
+                ("campaigns", CampaignFastSerializer, member_campaigns(user)),
+            ]
+            if user.is_authenticated:
+                lists += [
+                    ("chat messages", ChatMessageFastSerializer, chat_messages(user, {})),
+                    ("character sheets", CharacterSheetFastSerializer, _sheets(user)),
+                ]
+            for label, fast_class, queryset in lists:
+                fast = fast_class(context)
+                slow = fast_class.serializer_class(queryset, many=True, context=context).data
+                if dumps(slow) != dumps(fast.serialize(fast.values(queryset))):
+                    raise CommandError(f"{label} of {user}: fast serializer output differs")
+                checked += len(slow)
+                if not slow:
+                    continue
+                # Fresh querysets so every run queries the database.
+                page = queryset.all()[:size]
+                timings.setdefault(label, []).append(
+                    (
+                        self._time(
+                            lambda: fast_class.serializer_class(page.all(), many=True, context=context).data,
+                            options["iterations"],
+                        ),
+                        self._time(lambda: fast.serialize(fast.values(page)), options["iterations"]),
+                        min(len(slow), size),
+                    )
+                )
+
+        self.stdout.write(f"{checked} rows identical")
+        for label, runs in timings.items():
+            slow, fast, rows = max(runs, key=lambda run: run[2])
+            self.stdout.write(
+                f"{label:<17} {rows:4d} rows  DRF {slow * 1000:8.3f} ms  "
+                f"fast {fast * 1000:8.3f} ms  x{slow / fast:.1f}"
+            )
+
+    def _time(self, func, iterations):
+        func()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        return (time.perf_counter() - started) / iterations
@@ -0,0 +1,23 @@
+# Generated by Django 6.1.2 on 2026-10-18 23:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_rename_accounts_ca_status_47a10a_idx_accounts_ca_status_3d881d_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='charactersheet',
+            name='resolved_spells',
+            field=models.ManyToManyField(blank=True, related_name='character_sheets', to='accounts.spell', verbose_name='Распознанные заклинания'),
+        ),
+        migrations.AddField(
+            model_name='spell',
+            name='aliases',
+            field=models.JSONField(blank=True, default=list, help_text='Другие названия заклинания (переводы, сокращения), по которым оно распознаётся в листах персонажей', verbose_name='Синонимы'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-18 23:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_spell_aliases_and_resolved_spells'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='revision',
+            field=models.PositiveBigIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,182 @@
+# Generated by Django 6.1.2 on 2026-10-18 23:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+FTS_TABLE = "accounts_searchdocument_fts"
+
+SQLITE_FORWARD = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, body,
+        content='accounts_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER accounts_searchdocument_ai AFTER INSERT ON accounts_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER accounts_searchdocument_ad AFTER DELETE ON accounts_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER accounts_searchdocument_au AFTER UPDATE ON accounts_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS accounts_searchdocument_au",
+    "DROP TRIGGER IF EXISTS accounts_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS accounts_searchdocument_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE accounts_searchdocument ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('simple', coalesce(body, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX accounts_searchdocument_vector_idx ON accounts_searchdocument USING GIN (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS accounts_searchdocument_vector_idx",
+    "ALTER TABLE accounts_searchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _run(schema_editor, SQLITE_FORWARD)
+    elif vendor == "postgresql":
+        _run(schema_editor, POSTGRES_FORWARD)
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _run(schema_editor, SQLITE_REVERSE)
+    elif vendor == "postgresql":
+        _run(schema_editor, POSTGRES_REVERSE)
+
+
+# The document layout as of this migration, copied from accounts.search so
+# later changes to that module cannot break the backfill.
+
+def _session(row):
+    return row["campaign_id"], f"Сессия {row['number']}", row["description"], row["date"]
+
+
+def _dm_note(row):
+    return row["session__campaign_id"], "", row["text"], None
+
+
+def _campaign_note(row):
+    return row["campaign_id"], "", row["text"], row["created_at"]
+
+
+def _storyline(row):
+    return row["campaign_id"], row["title"], row["summary"], None
+
+
+def _story_outcome(row):
+    body = "\n".join(part for part in (row["condition"], row["description"]) if part)
+    return row["storyline__campaign_id"], row["title"], body, None
+
+
+def _chat_message(row):
+    return row["campaign_id"], row["user__username"], row["text"], row["created_at"]
+
+
+SOURCES = {
+    "session": ("Session", ("id", "campaign_id", "number", "description", "date"), _session, False),
+    "dm_note": ("DMNote", ("id", "session__campaign_id", "text"), _dm_note, True),
+    "campaign_note": ("CampaignNote", ("id", "campaign_id", "text", "created_at"), _campaign_note, True),
+    "storyline": ("Storyline", ("id", "campaign_id", "title", "summary"), _storyline, True),
+    "story_outcome": (
+        "StoryOutcome",
+        ("id", "storyline__campaign_id", "title", "condition", "description"),
+        _story_outcome,
+        True,
+    ),
+    "chat_message": (
+        "ChatMessage",
+        ("id", "campaign_id", "user__username", "text", "created_at"),
+        _chat_message,
+        False,
+    ),
+}
+
+
+def backfill(apps, schema_editor, batch_size=1000):
+    SearchDocument = apps.get_model("accounts", "SearchDocument")
+    for kind, (model_name, fields, extract, owner_only) in SOURCES.items():
+        rows = apps.get_model("accounts", model_name).objects.order_by("id").values(*fields)
+        batch = []
+        for row in rows.iterator(chunk_size=2000):
+            campaign_id, title, body, created_at = extract(row)
+            batch.append(
+                SearchDocument(
+                    kind=kind,
+                    object_id=row["id"],
+                    campaign_id=campaign_id,
+                    owner_only=owner_only,
+                    title=(title or "")[:255],
+                    body=body or "",
+                    created_at=created_at,
+                )
+            )
+            if len(batch) >= batch_size:
+                SearchDocument.objects.bulk_create(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_campaign_revision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('session', 'Сессия'), ('dm_note', 'Заметка мастера'), ('campaign_note', 'Заметка кампании'), ('storyline', 'Линия сюжета'), ('story_outcome', 'Исход события'), ('chat_message', 'Сообщение чата')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('owner_only', models.BooleanField(default=False)),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(blank=True, null=True)),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='accounts.campaign')),
+            ],
+            options={
+                'verbose_name': 'Поисковый документ',
+                'verbose_name_plural': 'Поисковые документы',
+                'indexes': [models.Index(fields=['campaign', 'owner_only'], name='accounts_se_campaig_2edcf3_idx')],
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.RunPython(create_index, drop_index),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
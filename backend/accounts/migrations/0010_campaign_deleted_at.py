@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-18 23:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_preserve_imported_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 6.1.2 on 2026-10-19 00:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_throttlecounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaignnote',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='charactersheet',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='dmnote',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='storyline',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='storyoutcome',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='campaignnote',
+            index=models.Index(fields=['campaign', 'updated_at'], name='accounts_ca_campaig_5dc616_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='charactersheet',
+            index=models.Index(fields=['owner', 'updated_at'], name='accounts_ch_owner_i_4b2da9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['campaign', 'updated_at'], name='accounts_ch_campaig_4551b0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dmnote',
+            index=models.Index(fields=['session', 'updated_at'], name='accounts_dm_session_ee8159_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['campaign', 'updated_at'], name='accounts_se_campaig_c75b6e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storyline',
+            index=models.Index(fields=['campaign', 'updated_at'], name='accounts_st_campaig_b2bd51_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storyoutcome',
+            index=models.Index(fields=['storyline', 'updated_at'], name='accounts_st_storyli_e4b0e1_idx'),
+        ),
+    ]
@@ -2,7 +2,9 @@ import secrets
 import string
 
 from django.conf import settings
+from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
 
 
 # 
@@ -180,6 +182,13 @@ class Spell(models.Model):
         help_text="Уникальный идентификатор заклинания",
     )
 
+    aliases = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name="Синонимы",
+        help_text="Другие названия заклинания (переводы, сокращения), по которым оно распознаётся в листах персонажей",
+    )
+
     level = models.PositiveSmallIntegerField(
         verbose_name="Уровень",
         help_text="Уровень заклинания (0 для заклинаний нулевого круга/заговоров)",
@@ -493,6 +502,18 @@ class CharacterSheet(models.Model):
     spell_slots_9_total = models.PositiveSmallIntegerField(default=0)
     spell_slots_9_used = models.PositiveSmallIntegerField(default=0)
     spells_level_9 = models.TextField(blank=True)
+    resolved_spells = models.ManyToManyField(
+        Spell,
+        related_name="character_sheets",
+        blank=True,
+        verbose_name="Распознанные заклинания",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "updated_at"]),
+        ]
 
     def __str__(self) -> str:
         return f"{self.name} - {self.character_class} lvl {self.level}"
@@ -518,6 +539,21 @@ class Player(models.Model):
         return f"{self.user} - {self.character}"
 
 
+class CampaignQuerySet(models.QuerySet):
+    def alive(self):
+        return self.filter(deleted_at__isnull=True)
+
+    def deleted(self):
+        return self.filter(deleted_at__isnull=False)
+
+
+class CampaignManager(models.Manager.from_queryset(CampaignQuerySet)):
+    """Hides campaigns that are waiting to be purged."""
+
+    def get_queryset(self):
+        return super().get_queryset().alive()
+
+
 class Campaign(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
@@ -545,6 +581,13 @@ class Campaign(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped whenever anything shown on the campaign desk changes.
+    revision = models.PositiveBigIntegerField(default=1)
+    # Set on delete; the rows are purged later by purge_deleted_campaigns.
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    objects = CampaignManager()
+    all_objects = CampaignQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Кампания"
@@ -560,8 +603,25 @@ class Campaign(models.Model):
             while type(self).objects.filter(join_code=join_code).exists():
                 join_code = "".join(secrets.choice(alphabet) for _ in range(8))
             self.join_code = join_code
+        if self.pk and not self._state.adding and kwargs.get("update_fields") is None:
+            # Never write back a stale revision or deletion mark; they only
+            # move via bump_revision() and mark_deleted().
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in {"revision", "deleted_at"}
+            ]
         super().save(*args, **kwargs)
 
+    def mark_deleted(self) -> None:
+        """Hide the campaign at once; its data is purged in the background."""
+        self.deleted_at = timezone.now()
+        type(self).objects.filter(pk=self.pk).update(deleted_at=self.deleted_at)
+
+    @classmethod
+    def bump_revision(cls, *args, **lookup) -> int:
+        return cls.objects.filter(*args, **lookup).update(revision=models.F("revision") + 1)
+
 
 class CampaignJoinRequest(models.Model):
     class Status(models.TextChoices):
@@ -589,7 +649,7 @@ class CampaignJoinRequest(models.Model):
         choices=Status.choices,
         default=Status.PENDING,
     )
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     decided_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
@@ -615,10 +675,14 @@ class Session(models.Model):
         on_delete=models.CASCADE,
         related_name="sessions",
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Сессия"
         verbose_name_plural = "Сессии"
+        indexes = [
+            models.Index(fields=["campaign", "updated_at"]),
+        ]
 
     def __str__(self) -> str:
         return f"Сессия {self.number}"
@@ -631,10 +695,14 @@ class DMNote(models.Model):
         on_delete=models.CASCADE,
         related_name="dm_notes",
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Записка мастера"
         verbose_name_plural = "Записи мастера"
+        indexes = [
+            models.Index(fields=["session", "updated_at"]),
+        ]
 
     def __str__(self) -> str:
         return self.text
@@ -647,11 +715,15 @@ class CampaignNote(models.Model):
         related_name="notes",
     )
     text = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Заметка кампании"
         verbose_name_plural = "Заметки кампании"
+        indexes = [
+            models.Index(fields=["campaign", "updated_at"]),
+        ]
 
     def __str__(self) -> str:
         return self.text
@@ -666,11 +738,15 @@ class Storyline(models.Model):
     title = models.CharField(max_length=255)
     summary = models.TextField(blank=True)
     order = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Линия сюжета"
         verbose_name_plural = "Линии сюжета"
         ordering = ["order", "id"]
+        indexes = [
+            models.Index(fields=["campaign", "updated_at"]),
+        ]
 
     def __str__(self) -> str:
         return self.title
@@ -686,11 +762,15 @@ class StoryOutcome(models.Model):
     condition = models.TextField(blank=True)
     description = models.TextField(blank=True)
     order = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Исход события"
         verbose_name_plural = "Исходы событий"
         ordering = ["order", "id"]
+        indexes = [
+            models.Index(fields=["storyline", "updated_at"]),
+        ]
 
     def __str__(self) -> str:
         return self.title
@@ -708,12 +788,165 @@ class ChatMessage(models.Model):
         related_name="chat_messages",
     )
     text = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Сообщение чата"
         verbose_name_plural = "Сообщения чата"
         ordering = ["created_at", "id"]
+        indexes = [
+            models.Index(fields=["campaign", "updated_at"]),
+        ]
 
     def __str__(self) -> str:
         return f"{self.user}: {self.text[:30]}"
+
+
+class SearchDocument(models.Model):
+    """
+    Searchable copy of campaign content. The full-text index over ``title``
+    and ``body`` lives next to this table (see ``accounts.search``).
+    """
+
+    class Kind(models.TextChoices):
+        SESSION = "session", "Сессия"
+        DM_NOTE = "dm_note", "Заметка мастера"
+        CAMPAIGN_NOTE = "campaign_note", "Заметка кампании"
+        STORYLINE = "storyline", "Линия сюжета"
+        STORY_OUTCOME = "story_outcome", "Исход события"
+        CHAT_MESSAGE = "chat_message", "Сообщение чата"
+
+    campaign = models.ForeignKey(
+        Campaign,
+        on_delete=models.CASCADE,
+        related_name="search_documents",
+    )
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    object_id = models.PositiveBigIntegerField()
+    owner_only = models.BooleanField(default=False)
+    title = models.CharField(max_length=255, blank=True)
+    body = models.TextField(blank=True)
+    created_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Поисковый документ"
+        verbose_name_plural = "Поисковые документы"
+        unique_together = ("kind", "object_id")
+        indexes = [
+            models.Index(fields=["campaign", "owner_only"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind}:{self.object_id}"
+
+
+class Job(models.Model):
+    """A unit of background work picked up by ``run_worker`` (see ``accounts.jobs``)."""
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "В очереди"
+        RUNNING = "running", "Выполняется"
+        DONE = "done", "Готово"
+        FAILED = "failed", "Ошибка"
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="jobs",
+        null=True,
+        blank=True,
+    )
+    status = models.CharField(max_length=12, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        indexes = [
+            models.Index(fields=["status", "run_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class TokenVersion(models.Model):
+    """
+    Per-user counter embedded in issued JWTs. Bumping it revokes every
+    token issued before (see ``accounts.authentication``).
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="token_version",
+    )
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        verbose_name = "Версия токенов"
+        verbose_name_plural = "Версии токенов"
+
+    def __str__(self) -> str:
+        return f"{self.user_id}: {self.version}"
+
+
+class RevokedToken(models.Model):
+    """Refresh token JTI rejected until the token expires (see ``accounts.revocation``)."""
+
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Отозванный токен"
+        verbose_name_plural = "Отозванные токены"
+
+    def __str__(self) -> str:
+        return self.jti
+
+
+class ClaimsUser(User):
+    """
+    User built from access token claims without a query. Fields that are not
+    in the token are deferred; touching any of them loads the whole row once.
+    """
+
+    class Meta:
+        proxy = True
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        if fields is not None:
+            deferred = self.get_deferred_fields()
+            if deferred and set(fields) <= deferred:
+                fields = deferred
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+
+
+class ThrottleCounter(models.Model):
+    """Request count of one throttle key in one window (see ``accounts.throttling``)."""
+
+    key = models.CharField(max_length=255)
+    window = models.BigIntegerField()
+    count = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "Счётчик ограничения запросов"
+        verbose_name_plural = "Счётчики ограничения запросов"
+        unique_together = ("key", "window")
+
+    def __str__(self) -> str:
+        return f"{self.key} @ {self.window}: {self.count}"
@@ -0,0 +1,151 @@
+"""
+Password hashing off the request thread.
+
+Hashing is CPU-bound but ``hashlib`` (PBKDF2, scrypt) and ``argon2-cffi``
+release the GIL, so a threaded worker can hash several passwords at once.
+``run()`` hands the work to a pool of ``PASSWORD_HASHING_THREADS`` threads:
+requests that do not hash keep being served while a login burst is capped
+at the cores it may use. Database access stays on the request thread.
+The async login and register views (``accounts.async_views``) await the
+same pool through the ``a*`` functions, so on ASGI a login burst holds
+coroutines instead of worker threads.
+
+The hashers below are Django's with their cost read from settings; choose
+one with ``PASSWORD_HASHER``. Stored hashes made with another algorithm or
+cost are upgraded on the next successful login. ``ModelBackend`` is
+Django's, hashing in the pool; ``authenticate()`` goes through
+``AUTHENTICATION_BACKENDS`` and the login signals like any Django login.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import backends, get_user_model, hashers
+from django.contrib.auth.signals import user_logged_in
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    iterations = _setting("PASSWORD_PBKDF2_ITERATIONS", hashers.PBKDF2PasswordHasher.iterations)
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    work_factor = _setting("PASSWORD_SCRYPT_WORK_FACTOR", hashers.ScryptPasswordHasher.work_factor)
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    time_cost = _setting("PASSWORD_ARGON2_TIME_COST", hashers.Argon2PasswordHasher.time_cost)
+    memory_cost = _setting("PASSWORD_ARGON2_MEMORY_COST", hashers.Argon2PasswordHasher.memory_cost)
+    parallelism = _setting("PASSWORD_ARGON2_PARALLELISM", hashers.Argon2PasswordHasher.parallelism)
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=_setting("PASSWORD_HASHING_THREADS", None) or os.cpu_count() or 1,
+                    thread_name_prefix="password",
+                )
+    return _pool
+
+
+def run(func, *args, **kwargs):
+    """Call ``func`` in the hashing pool and wait for the result."""
+    return _get_pool().submit(func, *args, **kwargs).result()
+
+
+async def arun(func, *args, **kwargs):
+    """``run()`` for async views: await the result without blocking the event loop."""
+    return await asyncio.wrap_future(_get_pool().submit(func, *args, **kwargs))
+
+
+def make_password(password: str) -> str:
+    return run(hashers.make_password, password)
+
+
+async def amake_password(password: str) -> str:
+    return await arun(hashers.make_password, password)
+
+
+class ModelBackend(backends.ModelBackend):
+    """Django's model backend with the password checked in the pool."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so response time does not reveal unknown usernames.
+            run(hashers.make_password, password)
+            return None
+        if check_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await UserModel._default_manager.aget_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            await arun(hashers.make_password, password)
+            return None
+        if await acheck_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+
+def authenticate(request, username: str, password: str):
+    """
+    ``django.contrib.auth.authenticate``: the user, or ``None`` after
+    ``user_login_failed``. A token login opens no session, so
+    ``user_logged_in`` is sent here instead of by ``login()``.
+    """
+    user = auth.authenticate(request, username=username, password=password)
+    if user is not None:
+        user_logged_in.send(sender=user.__class__, request=request, user=user)
+    return user
+
+
+async def aauthenticate(request, username: str, password: str):
+    """``authenticate()`` for async views."""
+    user = await auth.aauthenticate(request, username=username, password=password)
+    if user is not None:
+        await user_logged_in.asend(sender=user.__class__, request=request, user=user)
+    return user
+
+
+def check_password(user, password: str) -> bool:
+    """``user.check_password()`` with the hashing done in the pool."""
+    is_correct, must_update = run(hashers.verify_password, password, user.password)
+    if is_correct and must_update:
+        user.password = make_password(password)
+        user.save(update_fields=["password"])
+    return is_correct
+
+
+async def acheck_password(user, password: str) -> bool:
+    """``check_password()`` for async views."""
+    is_correct, must_update = await arun(hashers.verify_password, password, user.password)
+    if is_correct and must_update:
+        user.password = await amake_password(password)
+        await user.asave(update_fields=["password"])
+    return is_correct
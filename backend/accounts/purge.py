@@ -0,0 +1,77 @@
+"""
+Background purge of deleted campaigns.
+
+``Campaign.mark_deleted()`` only hides a campaign. The rows are removed here
+child tables first, ``batch_size`` rows per statement and each batch in its
+own short transaction, so no lock is held for long and memory is bounded.
+
+Batches use ``_raw_delete``: Django's collector would load every row to
+send ``post_delete`` signals, and those handlers (search index, desk
+revision) only matter for live campaigns. The search documents are purged
+as a table of their own.
+"""
+import time
+
+from django.db import transaction
+
+from .models import (
+    Campaign,
+    CampaignJoinRequest,
+    CampaignNote,
+    ChatMessage,
+    DMNote,
+    SearchDocument,
+    Session,
+    Storyline,
+    StoryOutcome,
+)
+
+
+BATCH_SIZE = 2000
+
+
+def _tables(campaign_id: int):
+    """Querysets in safe deletion order: children before their parents."""
+    return (
+        SearchDocument.objects.filter(campaign_id=campaign_id),
+        ChatMessage.objects.filter(campaign_id=campaign_id),
+        DMNote.objects.filter(session__campaign_id=campaign_id),
+        StoryOutcome.objects.filter(storyline__campaign_id=campaign_id),
+        CampaignNote.objects.filter(campaign_id=campaign_id),
+        CampaignJoinRequest.objects.filter(campaign_id=campaign_id),
+        Campaign.characters.through.objects.filter(campaign_id=campaign_id),
+        Storyline.objects.filter(campaign_id=campaign_id),
+        Session.objects.filter(campaign_id=campaign_id),
+    )
+
+
+def _delete_batch(queryset, batch_size: int) -> int:
+    ids = list(queryset.order_by().values_list("pk", flat=True)[:batch_size])
+    if not ids:
+        return 0
+    with transaction.atomic():
+        return queryset.model.objects.filter(pk__in=ids)._raw_delete(queryset.db)
+
+
+def purge_campaign(campaign_id: int, batch_size: int = BATCH_SIZE, pause: float = 0.0) -> int:
+    """Delete a campaign marked as deleted together with all its rows."""
+    if not Campaign.all_objects.deleted().filter(pk=campaign_id).exists():
+        return 0
+    total = 0
+    for queryset in _tables(campaign_id):
+        while deleted := _delete_batch(queryset, batch_size):
+            total += deleted
+            if pause:
+                time.sleep(pause)
+    # Nothing refers to the campaign any more, so the collector has no work left.
+    deleted, _ = Campaign.all_objects.filter(pk=campaign_id).delete()
+    return total + deleted
+
+
+def purge_deleted(batch_size: int = BATCH_SIZE, pause: float = 0.0) -> int:
+    """Purge every campaign marked as deleted, oldest first; returns the row count."""
+    total = 0
+    campaign_ids = Campaign.all_objects.deleted().order_by("deleted_at").values_list("pk", flat=True)
+    for campaign_id in list(campaign_ids):
+        total += purge_campaign(campaign_id, batch_size=batch_size, pause=pause)
+    return total
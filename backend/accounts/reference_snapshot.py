@@ -0,0 +1,244 @@
+"""
+Read-only snapshot of static reference tables shared by all workers.
+
+Classes, subclasses, magic schools, damage types, areas of effect and spells
+are compiled into one file that every worker maps with ``mmap``. The pages
+live once in the OS page cache; a lookup is a binary search over the mapped
+id column plus decoding of a single row.
+
+File layout (little-endian)::
+
+    header     magic(8) generation(u64) table_count(u32) reserved(u32)
+    directory  table_count x [name(16) rows(u32) ids(u64) offsets(u64) blob(u64)]
+    per table  ids: i64[rows], offsets: u64[rows + 1], blob: JSON rows
+
+The file is replaced atomically on rebuild, once per transaction however
+many reference rows it saved. Workers notice the new inode with a cheap
+``stat`` and remap it, unmapping the old file shortly after; the header
+generation tells clients which build they are reading.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+
+
+MAGIC = b"DNDREF01"
+HEADER = struct.Struct("<8sQII")
+DIRECTORY_ENTRY = struct.Struct("<16sIQQQ")
+
+
+def _tables():
+    from .models import AreaOfEffect, Class, DamageType, MagicSchool, Spell, Subclass
+
+    return {
+        "class": Class,
+        "subclass": Subclass,
+        "magic_school": MagicSchool,
+        "damage_type": DamageType,
+        "area_of_effect": AreaOfEffect,
+        "spell": Spell,
+    }
+
+
+def snapshot_path() -> Path | None:
+    path = getattr(settings, "REFERENCE_SNAPSHOT_PATH", None)
+    return Path(path) if path else None
+
+
+def _read_generation(path: Path) -> int:
+    try:
+        with open(path, "rb") as handle:
+            magic, generation, _, _ = HEADER.unpack(handle.read(HEADER.size))
+    except (OSError, struct.error):
+        return 0
+    return generation if magic == MAGIC else 0
+
+
+def build_snapshot(path: Path | None = None) -> int:
+    """Compile the reference tables into ``path``; returns the new generation."""
+    path = path or snapshot_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    generation = _read_generation(path) + 1
+
+    sections = []
+    for name, model in _tables().items():
+        fields = [field.attname for field in model._meta.concrete_fields]
+        ids, offsets, blob = [], [0], bytearray()
+        for row in model.objects.order_by("pk").values(*fields).iterator():
+            ids.append(row["id"])
+            blob += json.dumps(row, ensure_ascii=False, separators=(",", ":")).encode()
+            offsets.append(len(blob))
+        sections.append((name, ids, offsets, bytes(blob)))
+
+    position = HEADER.size + DIRECTORY_ENTRY.size * len(sections)
+    directory, payload = [], []
+    for name, ids, offsets, blob in sections:
+        ids_bytes = struct.pack(f"<{len(ids)}q", *ids)
+        offsets_bytes = struct.pack(f"<{len(offsets)}Q", *offsets)
+        ids_at = position
+        offsets_at = ids_at + len(ids_bytes)
+        blob_at = offsets_at + len(offsets_bytes)
+        directory.append(
+            DIRECTORY_ENTRY.pack(name.encode(), len(ids), ids_at, offsets_at, blob_at)
+        )
+        payload += [ids_bytes, offsets_bytes, blob]
+        position = blob_at + len(blob)
+
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as handle:
+        handle.write(HEADER.pack(MAGIC, generation, len(sections), 0))
+        handle.writelines(directory)
+        handle.writelines(payload)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
+    return generation
+
+
+class ReferenceSnapshot:
+    """A mapped snapshot file. Instances are immutable once opened."""
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as handle:
+            self.inode = os.fstat(handle.fileno()).st_ino
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        view = self._view = memoryview(self._map)
+        magic, self.generation, table_count, _ = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a reference snapshot")
+        self._tables = {}
+        for number in range(table_count):
+            name, rows, ids_at, offsets_at, blob_at = DIRECTORY_ENTRY.unpack_from(
+                view, HEADER.size + number * DIRECTORY_ENTRY.size
+            )
+            self._tables[name.rstrip(b"\0").decode()] = (
+                view[ids_at:ids_at + rows * 8].cast("q"),
+                view[offsets_at:offsets_at + (rows + 1) * 8].cast("Q"),
+                view[blob_at:],
+            )
+
+    def __contains__(self, table: str) -> bool:
+        return table in self._tables
+
+    def close(self) -> None:
+        for views in self._tables.values():
+            for table_view in views:
+                table_view.release()
+        self._view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            # A row slice is still referenced; the map goes with it.
+            pass
+
+    def _row(self, table, position: int) -> dict:
+        _, offsets, blob = table
+        return json.loads(blob[offsets[position]:offsets[position + 1]].tobytes())
+
+    def get(self, table: str, pk) -> dict | None:
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            return None
+        entry = self._tables[table]
+        ids = entry[0]
+        position = bisect_left(ids, pk)
+        if position < len(ids) and ids[position] == pk:
+            return self._row(entry, position)
+        return None
+
+    def rows(self, table: str):
+        entry = self._tables[table]
+        for position in range(len(entry[0])):
+            yield self._row(entry, position)
+
+    def find(self, table: str, **lookup) -> dict | None:
+        for row in self.rows(table):
+            if all(row.get(key) == value for key, value in lookup.items()):
+                return row
+        return None
+
+
+_lock = threading.Lock()
+_current: ReferenceSnapshot | None = None
+_checked_at: float | None = None
+# Replaced snapshots and when they were replaced. They are unmapped once
+# lookups that started on them are long done.
+_retired: list[tuple[float, ReferenceSnapshot]] = []
+RETIRED_GRACE = 10.0
+
+
+def _replace(snapshot: ReferenceSnapshot | None, now: float) -> None:
+    global _current
+    if _current is not None and _current is not snapshot:
+        _retired.append((now, _current))
+    _current = snapshot
+    while _retired and now - _retired[0][0] >= RETIRED_GRACE:
+        _retired.pop(0)[1].close()
+
+
+def get_snapshot() -> ReferenceSnapshot | None:
+    """
+    The snapshot mapped by this process, or ``None`` when it is disabled or
+    has not been built. The file is re-checked at most every
+    ``REFERENCE_SNAPSHOT_CHECK_INTERVAL`` seconds.
+    """
+    global _current, _checked_at
+    path = snapshot_path()
+    if path is None:
+        return None
+    now = time.monotonic()
+    interval = getattr(settings, "REFERENCE_SNAPSHOT_CHECK_INTERVAL", 1.0)
+    if _checked_at is not None and now - _checked_at < interval:
+        return _current
+    with _lock:
+        _checked_at = now
+        try:
+            inode = os.stat(path).st_ino
+        except OSError:
+            _replace(None, now)
+            return None
+        if _current is None or _current.inode != inode:
+            try:
+                _replace(ReferenceSnapshot(path), now)
+            except (OSError, ValueError):
+                _replace(None, now)
+        else:
+            _replace(_current, now)
+        return _current
+
+
+def instance_from_row(model, row: dict):
+    """Model instance that Django treats as loaded from the database, built without a query."""
+    names = list(row)
+    return model.from_db(None, names, [row[name] for name in names])
+
+
+def reset() -> None:
+    """Force the next ``get_snapshot()`` call to re-stat the file."""
+    global _checked_at
+    _checked_at = None
+
+
+def _rebuild() -> None:
+    build_snapshot()
+    reset()
+
+
+def schedule_rebuild() -> None:
+    """Rebuild after the current transaction commits, once however often it is called."""
+    if snapshot_path() is None:
+        return
+    connection = transaction.get_connection()
+    # A rolled back savepoint drops its callbacks, so this asks again.
+    if any(func is _rebuild for _, func, _ in connection.run_on_commit):
+        return
+    transaction.on_commit(_rebuild)
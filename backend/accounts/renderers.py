@@ -0,0 +1,165 @@
+"""
+Renderers and parsers for the API: orjson-backed JSON (the default) and
+MessagePack (``application/msgpack``).
+
+The output matches DRF's ``JSONRenderer`` with the default settings
+(UTF-8, compact, ``Z`` for UTC, U+2028/U+2029 escaped), and values orjson
+does not know are converted the way DRF's ``JSONEncoder`` converts them.
+Indented output (the browsable API, ``Accept: ...; indent=4``) and
+non-default ``UNICODE_JSON``/``COMPACT_JSON`` fall back to the stock
+renderer, as does anything orjson refuses, such as integers beyond 64 bits.
+
+Either format can send lists in a columnar layout, asked for with a media
+type parameter (``Accept: application/msgpack; layout=columnar``): the
+field names once in ``columns`` and every row as an array in ``rows``,
+inside the usual pagination envelope.
+"""
+import datetime
+import decimal
+import uuid
+
+import msgpack
+import orjson
+from django.db.models.query import QuerySet
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from django.utils.http import parse_header_parameters
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+
+from .server_timing import timed_serialize
+
+OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    """The conversions of ``rest_framework.utils.encoders.JSONEncoder``."""
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, QuerySet):
+        return tuple(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if hasattr(obj, "__getitem__"):
+        try:
+            return dict(obj)
+        except (TypeError, ValueError):
+            pass
+    if hasattr(obj, "__iter__"):
+        return tuple(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def to_columns(data):
+    """
+    ``data`` with its lists of rows as ``{"columns": [...], "rows": [[...]]}``:
+    the page of a paginated list, a plain list, or each list in an object
+    such as the desk. Lists that are not dicts with the same keys stay as
+    they are.
+    """
+    if isinstance(data, dict):
+        if not isinstance(data.get("results"), list):
+            return {
+                key: to_columns(value) if isinstance(value, list) else value
+                for key, value in data.items()
+            }
+        envelope = {key: value for key, value in data.items() if key != "results"}
+        columns = to_columns(data["results"])
+        if isinstance(columns, dict):
+            return {**envelope, **columns}
+        return data
+    if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+        return data
+    columns = list(data[0]) if data else []
+    if any(list(row) != columns for row in data):
+        return data
+    return {"columns": columns, "rows": [list(row.values()) for row in data]}
+
+
+def _columnar(accepted_media_type) -> bool:
+    if not accepted_media_type:
+        return False
+    return parse_header_parameters(accepted_media_type)[1].get("layout") == "columnar"
+
+
+def dumps(data) -> bytes:
+    ret = orjson.dumps(data, default=_default, option=OPTIONS)
+    # Valid JSON but not valid JavaScript; DRF escapes them too.
+    if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+        ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+    return ret
+
+
+class ORJSONRenderer(JSONRenderer):
+    @timed_serialize
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if _columnar(accepted_media_type):
+            data = to_columns(data)
+        if (
+            self.get_indent(accepted_media_type, renderer_context or {})
+            or not api_settings.UNICODE_JSON
+            or not api_settings.COMPACT_JSON
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            return dumps(data)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class ORJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", "utf-8")
+        try:
+            body = stream.read()
+            if encoding.lower().replace("-", "") != "utf8":
+                body = body.decode(encoding)
+            return orjson.loads(body)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, datetime.datetime):
+        value = obj.isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    return _default(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    @timed_serialize
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if _columnar(accepted_media_type):
+            data = to_columns(data)
+        return msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    media_type = "application/msgpack"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, TypeError) as exc:
+            raise ParseError(f"MessagePack parse error - {str(exc) or type(exc).__name__}")
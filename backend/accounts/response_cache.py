@@ -0,0 +1,181 @@
+"""
+Cached GET responses for the DRF viewsets (``RESPONSE_CACHE`` in settings).
+
+A cached entry is the response data plus the versions of the scopes it was
+built from: a user (membership, own characters), one part of a campaign
+(``campaign:<id>:sessions`` ...), the public listing or the reference
+tables. A version is a random token kept in the cache; ``invalidate``
+deletes it after the writing transaction commits, so every entry built
+from the old token stops matching. An evicted token is treated the same
+way, which keeps locmem's culling safe.
+
+Entries are keyed by user and full URL. The signal handlers in
+``accounts.signals`` invalidate the scopes a saved or deleted row belongs
+to, and ``RESPONSE_CACHE_TIMEOUT`` bounds the life of anything a bulk
+``update()`` slips past them. The versions also go into the ETags of
+``accounts.conditional``, so they are kept even with ``RESPONSE_CACHE``
+off.
+"""
+import hashlib
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from rest_framework.response import Response
+
+from . import commit_batch
+from .models import Campaign, CampaignJoinRequest
+
+CAMPAIGN_KINDS = ("campaign", "sessions", "notes", "storylines", "chat")
+PUBLIC = "public"
+REFERENCE = "reference"
+
+
+def user_scope(user_id) -> str:
+    return f"user:{user_id}"
+
+
+def campaign_scope(campaign_id, kind: str = "campaign") -> str:
+    return f"campaign:{campaign_id}:{kind}"
+
+
+def _version_key(scope: str) -> str:
+    return f"response-cache:v:{scope}"
+
+
+def _versions(scopes) -> dict:
+    """Current token of every scope, creating the missing ones."""
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        # Without cached responses the versions only feed ETags; expiring
+        # them bounds how long a worker that missed an invalidation (locmem)
+        # keeps answering 304.
+        timeout = None if settings.RESPONSE_CACHE else settings.RESPONSE_CACHE_TIMEOUT
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, timeout)
+        versions.update(cache.get_many(missing))
+    return versions
+
+
+def scope_versions(scopes) -> dict:
+    """Current version of each of ``scopes``, by scope."""
+    versions = _versions(scopes)
+    return {scope: versions[_version_key(scope)] for scope in scopes}
+
+
+def _delete_versions(keys) -> None:
+    cache.delete_many(list(keys))
+
+
+def invalidate(*scopes) -> None:
+    """
+    Drop the versions of ``scopes`` once the current transaction commits,
+    in one cache call for everything the transaction invalidated.
+    """
+    keys = [_version_key(scope) for scope in scopes if scope]
+    if keys:
+        commit_batch.add(_delete_versions, *keys)
+
+
+def invalidate_campaign(campaign_id, *kinds) -> None:
+    """Invalidate ``kinds`` of a campaign (all of them if none are given)."""
+    invalidate(*(campaign_scope(campaign_id, kind) for kind in kinds or CAMPAIGN_KINDS))
+
+
+def member_campaign_ids(user) -> list[int]:
+    """Ids of the campaigns ``user`` owns or plays in, cached per user version."""
+    token = _versions([user_scope(user.pk)])[_version_key(user_scope(user.pk))]
+    key = f"response-cache:campaigns:{user.pk}:{token}"
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(
+            Campaign.objects.filter(
+                Q(owner=user)
+                | Q(
+                    join_requests__user=user,
+                    join_requests__status=CampaignJoinRequest.Status.ACCEPTED,
+                )
+            )
+            .values_list("id", flat=True)
+            .distinct()
+        )
+        cache.set(key, ids, settings.RESPONSE_CACHE_TIMEOUT)
+    return ids
+
+
+def respond(request, scopes, build) -> Response:
+    """
+    The cached response for ``request`` while ``scopes()`` are unchanged,
+    otherwise ``build()``, cached when it succeeds.
+    """
+    if not settings.RESPONSE_CACHE or request.method not in ("GET", "HEAD"):
+        return build()
+    raw = f"{request.user.pk or 0}:{request.build_absolute_uri()}"
+    key = f"response-cache:r:{hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()}"
+    entry = cache.get(key)
+    if entry is not None:
+        versions, data = entry
+        if cache.get_many(list(versions)) == versions:
+            return Response(data)
+
+    # Versions are read before building, so a write that lands meanwhile
+    # leaves this entry already stale.
+    versions = _versions(scopes())
+    response = build()
+    if response.status_code == 200 and isinstance(response, Response):
+        cache.set(key, (versions, response.data), settings.RESPONSE_CACHE_TIMEOUT)
+    return response
+
+
+def cached(scopes=None):
+    """
+    Cache a viewset method. ``scopes(view, request)`` returns the scopes the
+    response depends on; by default ``view.cache_scopes(request)``.
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            return respond(
+                request,
+                lambda: (scopes or type(self).cache_scopes)(self, request),
+                lambda: method(self, request, *args, **kwargs),
+            )
+
+        return wrapper
+
+    return decorator
+
+
+class CachedResponseMixin:
+    """
+    Serve ``list`` and ``retrieve`` from the response cache. They depend on
+    the user and on ``cache_kinds`` of the campaign given by ``?campaign=``,
+    or of every campaign the user takes part in.
+    """
+
+    cache_kinds: tuple[str, ...] = ("campaign",)
+
+    def cache_campaign_ids(self, request) -> list:
+        campaign_id = request.query_params.get("campaign", "")
+        if campaign_id.isdigit():
+            return [int(campaign_id)]
+        return member_campaign_ids(request.user)
+
+    def cache_scopes(self, request, kinds=None) -> list[str]:
+        scopes = [user_scope(request.user.pk)]
+        for campaign_id in self.cache_campaign_ids(request):
+            scopes += [campaign_scope(campaign_id, kind) for kind in kinds or self.cache_kinds]
+        return scopes
+
+    @cached()
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached()
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
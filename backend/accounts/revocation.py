@@ -0,0 +1,154 @@
+"""
+Revoked refresh tokens.
+
+Revoked JTIs are stored in ``RevokedToken`` until the token would have
+expired anyway. Each worker keeps a Bloom filter of them and pulls new rows
+every ``REVOKED_TOKEN_SYNC_INTERVAL`` seconds, so checking a token that was
+never revoked costs no query; only a filter hit (a revoked token or a rare
+false positive) is confirmed against the table.
+
+New rows are found by ``created_at``, not by id: ids are handed out when a
+row is inserted, not when it commits, so a lower id can become visible after
+a higher one. Each sync re-reads the rows created since the previous sync
+started minus ``REVOKED_TOKEN_SYNC_MARGIN`` seconds, which covers slow
+commits and clock skew between workers; rows already in the filter are not
+counted twice.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import RevokedToken
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for number in range(self.hashes):
+            yield (first + number * second) % self.size
+
+    def add(self, key: str) -> None:
+        if key in self:
+            return
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+class _RevocationCache:
+    """Per-process Bloom filter kept in step with ``RevokedToken``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._synced_at = None
+        self._built_at = None
+        # Wall-clock start of the last sync, compared with created_at.
+        self._synced_since = None
+
+    def _rebuild(self, now: float) -> None:
+        capacity = _setting("REVOKED_TOKEN_BLOOM_CAPACITY", 100_000)
+        started = timezone.now()
+        rows = RevokedToken.objects.filter(expires_at__gt=started).order_by("id")
+        bloom = BloomFilter(max(capacity, rows.count() * 2))
+        for jti in rows.values_list("jti", flat=True).iterator(chunk_size=5000):
+            bloom.add(jti)
+        self._filter = bloom
+        self._built_at = self._synced_at = now
+        self._synced_since = started
+
+    def _sync(self, now: float) -> None:
+        started = timezone.now()
+        margin = timedelta(seconds=_setting("REVOKED_TOKEN_SYNC_MARGIN", 60))
+        for jti in RevokedToken.objects.filter(
+            created_at__gte=self._synced_since - margin
+        ).values_list("jti", flat=True):
+            self._filter.add(jti)
+        self._synced_at = now
+        self._synced_since = started
+
+    def refresh(self) -> None:
+        now = time.monotonic()
+        interval = _setting("REVOKED_TOKEN_SYNC_INTERVAL", 2.0)
+        if self._synced_at is not None and now - self._synced_at < interval:
+            return
+        with self._lock:
+            if self._synced_at is not None and now - self._synced_at < interval:
+                return
+            # Expired entries never leave a Bloom filter; start over now and
+            # then, or once it is fuller than it was sized for.
+            if (
+                self._filter is None
+                or self._filter.count > self._filter.capacity
+                or now - self._built_at > _setting("REVOKED_TOKEN_REBUILD_INTERVAL", 3600)
+            ):
+                self._rebuild(now)
+            else:
+                self._sync(now)
+
+    def might_contain(self, jti: str) -> bool:
+        self.refresh()
+        return jti in self._filter
+
+    def add(self, jti: str) -> None:
+        if self._filter is not None:
+            self._filter.add(jti)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._filter = None
+            self._synced_at = self._built_at = self._synced_since = None
+
+
+_cache = _RevocationCache()
+
+
+def is_revoked(token) -> bool:
+    jti = token.payload.get("jti")
+    if not jti or not _cache.might_contain(jti):
+        return False
+    return RevokedToken.objects.filter(jti=jti).exists()
+
+
+def revoke(token) -> None:
+    """Reject ``token`` (a refresh token) from now on."""
+    jti = token.payload["jti"]
+    expires_at = datetime.fromtimestamp(token.payload["exp"], tz=dt_timezone.utc)
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+    except IntegrityError:
+        pass
+    _cache.add(jti)
+
+
+def prune() -> int:
+    """Drop entries for tokens that have expired on their own."""
+    deleted, _ = RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
+
+
+def reset() -> None:
+    _cache.reset()
@@ -0,0 +1,248 @@
+"""
+Per-campaign full-text search.
+
+Searchable rows (sessions, notes, storylines, outcomes, chat) are mirrored
+into ``SearchDocument``. The inverted index on top of that table is
+database-specific and maintained by the database itself:
+
+* PostgreSQL: a generated ``tsvector`` column with a GIN index;
+* SQLite: an external-content FTS5 table kept in sync by triggers.
+
+Both are created by migration ``0008_searchdocument``.
+"""
+import html
+import re
+
+from django.apps import apps as global_apps
+from django.db import connection
+from django.db.models.signals import post_delete, post_save
+
+
+FTS_TABLE = "accounts_searchdocument_fts"
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _session(row):
+    return row["campaign_id"], f"Сессия {row['number']}", row["description"], row["date"]
+
+
+def _dm_note(row):
+    return row["session__campaign_id"], "", row["text"], None
+
+
+def _campaign_note(row):
+    return row["campaign_id"], "", row["text"], row["created_at"]
+
+
+def _storyline(row):
+    return row["campaign_id"], row["title"], row["summary"], None
+
+
+def _story_outcome(row):
+    body = "\n".join(part for part in (row["condition"], row["description"]) if part)
+    return row["storyline__campaign_id"], row["title"], body, None
+
+
+def _chat_message(row):
+    return row["campaign_id"], row["user__username"], row["text"], row["created_at"]
+
+
+# kind -> (model name, values() fields, row -> (campaign, title, body, date), owner only)
+SOURCES = {
+    "session": ("Session", ("id", "campaign_id", "number", "description", "date"), _session, False),
+    "dm_note": ("DMNote", ("id", "session__campaign_id", "text"), _dm_note, True),
+    "campaign_note": ("CampaignNote", ("id", "campaign_id", "text", "created_at"), _campaign_note, True),
+    "storyline": ("Storyline", ("id", "campaign_id", "title", "summary"), _storyline, True),
+    "story_outcome": (
+        "StoryOutcome",
+        ("id", "storyline__campaign_id", "title", "condition", "description"),
+        _story_outcome,
+        True,
+    ),
+    "chat_message": (
+        "ChatMessage",
+        ("id", "campaign_id", "user__username", "text", "created_at"),
+        _chat_message,
+        False,
+    ),
+}
+
+
+def iter_documents(kind: str, queryset):
+    """Yield ``SearchDocument`` field dicts for rows of ``queryset``."""
+    _, fields, extract, owner_only = SOURCES[kind]
+    for row in queryset.values(*fields).iterator(chunk_size=2000):
+        campaign_id, title, body, created_at = extract(row)
+        yield {
+            "kind": kind,
+            "object_id": row["id"],
+            "campaign_id": campaign_id,
+            "owner_only": owner_only,
+            "title": (title or "")[:255],
+            "body": body or "",
+            "created_at": created_at,
+        }
+
+
+def rebuild(apps=global_apps, campaign_id=None, batch_size: int = 1000) -> int:
+    """(Re)create documents for every source row, optionally for one campaign."""
+    SearchDocument = apps.get_model("accounts", "SearchDocument")
+    documents = SearchDocument.objects.all()
+    if campaign_id is not None:
+        documents = documents.filter(campaign_id=campaign_id)
+    documents.delete()
+
+    total = 0
+    for kind, (model_name, fields, _, _) in SOURCES.items():
+        queryset = apps.get_model("accounts", model_name).objects.order_by("id")
+        if campaign_id is not None:
+            queryset = queryset.filter(**{fields[1]: campaign_id})
+        batch = []
+        for document in iter_documents(kind, queryset):
+            batch.append(SearchDocument(**document))
+            if len(batch) >= batch_size:
+                SearchDocument.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+        total += len(batch)
+    return total
+
+
+def _kind_for(model) -> str | None:
+    for kind, (model_name, *_rest) in SOURCES.items():
+        if model.__name__ == model_name:
+            return kind
+    return None
+
+
+def index_instance(sender, instance, **kwargs):
+    from .models import SearchDocument
+
+    kind = _kind_for(sender)
+    queryset = sender.objects.filter(pk=instance.pk)
+    for document in iter_documents(kind, queryset):
+        updated = SearchDocument.objects.filter(
+            kind=kind,
+            object_id=document["object_id"],
+        ).update(**document)
+        if not updated:
+            SearchDocument.objects.create(**document)
+
+
+def unindex_instance(sender, instance, **kwargs):
+    from .models import SearchDocument
+
+    SearchDocument.objects.filter(kind=_kind_for(sender), object_id=instance.pk).delete()
+
+
+def retitle_chat_messages(sender, instance, update_fields=None, **kwargs):
+    """Chat documents are titled with the author's username; follow a rename."""
+    from .models import ChatMessage, SearchDocument
+
+    if update_fields is not None and "username" not in update_fields:
+        return
+    title = instance.username[:255]
+    SearchDocument.objects.filter(
+        kind="chat_message",
+        object_id__in=ChatMessage.objects.filter(user_id=instance.pk).values("id"),
+    ).exclude(title=title).update(title=title)
+
+
+def connect_signals():
+    for model_name, *_rest in SOURCES.values():
+        model = global_apps.get_model("accounts", model_name)
+        post_save.connect(index_instance, sender=model, dispatch_uid=f"search-index-{model_name}")
+        post_delete.connect(unindex_instance, sender=model, dispatch_uid=f"search-unindex-{model_name}")
+    # request.user is the ClaimsUser proxy, which sends its own signals.
+    for model in (global_apps.get_model("auth", "User"), global_apps.get_model("accounts", "ClaimsUser")):
+        post_save.connect(
+            retitle_chat_messages, sender=model, dispatch_uid=f"search-retitle-{model.__name__}"
+        )
+
+
+def _highlight(snippet: str) -> str:
+    return (
+        html.escape(snippet or "")
+        .replace(HIGHLIGHT_START, "<mark>")
+        .replace(HIGHLIGHT_END, "</mark>")
+    )
+
+
+def _tokens(text: str) -> list[str]:
+    return TOKEN_RE.findall(text.casefold())[:16]
+
+
+def search(campaign_id: int, text: str, include_owner_only: bool, limit: int, offset: int):
+    """
+    Ranked matches within a campaign. Returns ``(count, results)``; every
+    query token is matched as a prefix and all tokens must be present.
+    """
+    tokens = _tokens(text)
+    if not tokens:
+        return 0, []
+    visibility = "" if include_owner_only else " AND d.owner_only = %s"
+    visibility_params = [] if include_owner_only else [False]
+
+    if connection.vendor == "postgresql":
+        query = " & ".join(f"{token}:*" for token in tokens)
+        where = (
+            "d.search_vector @@ to_tsquery('simple', %s) AND d.campaign_id = %s" + visibility
+        )
+        params = [query, campaign_id, *visibility_params]
+        count_sql = f"SELECT count(*) FROM accounts_searchdocument d WHERE {where}"
+        page_sql = f"""
+            SELECT p.kind, p.object_id, p.title, p.created_at, p.rank,
+                   ts_headline(
+                       'simple', p.body, to_tsquery('simple', %s),
+                       'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=24, MinWords=8, MaxFragments=2'
+                   )
+            FROM (
+                SELECT d.kind, d.object_id, d.title, d.body, d.created_at, d.id,
+                       ts_rank_cd(d.search_vector, to_tsquery('simple', %s)) AS rank
+                FROM accounts_searchdocument d
+                WHERE {where}
+                ORDER BY rank DESC, d.id DESC
+                LIMIT %s OFFSET %s
+            ) p
+            ORDER BY p.rank DESC, p.id DESC
+        """
+        page_params = [query, query, *params, limit, offset]
+    else:
+        query = " ".join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+        where = f"{FTS_TABLE} MATCH %s AND d.campaign_id = %s" + visibility
+        params = [query, campaign_id, *visibility_params]
+        from_sql = f"FROM {FTS_TABLE} JOIN accounts_searchdocument d ON d.id = {FTS_TABLE}.rowid"
+        count_sql = f"SELECT count(*) {from_sql} WHERE {where}"
+        page_sql = f"""
+            SELECT d.kind, d.object_id, d.title, d.created_at,
+                   -bm25({FTS_TABLE}, 4.0, 1.0) AS rank,
+                   snippet({FTS_TABLE}, -1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 24)
+            {from_sql}
+            WHERE {where}
+            ORDER BY rank DESC, d.id DESC
+            LIMIT %s OFFSET %s
+        """
+        page_params = [*params, limit, offset]
+
+    with connection.cursor() as cursor:
+        cursor.execute(count_sql, params)
+        count = cursor.fetchone()[0]
+        if not count or offset >= count:
+            return count, []
+        cursor.execute(page_sql, page_params)
+        rows = cursor.fetchall()
+
+    return count, [
+        {
+            "kind": kind,
+            "id": object_id,
+            "title": title,
+            "created_at": created_at,
+            "rank": round(float(rank), 4),
+            "snippet": _highlight(snippet),
+        }
+        for kind, object_id, title, created_at, rank, snippet in rows
+    ]
@@ -12,7 +12,31 @@ from .models import (
     Storyline,
     StoryOutcome,
     ChatMessage,
+    Job,
 )
+from . import passwords
+from .encounters import ABILITIES, parse_dice
+from .reference_snapshot import get_snapshot, instance_from_row
+from .spell_matcher import SPELL_TEXT_FIELDS, link_spells
+
+
+class ReferencePrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key field for reference tables that validates against the shared
+    reference snapshot instead of querying the database.
+    """
+
+    def __init__(self, table: str, **kwargs):
+        self.table = table
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        snapshot = get_snapshot()
+        if snapshot is not None and not isinstance(data, bool):
+            row = snapshot.get(self.table, data)
+            if row is not None:
+                return instance_from_row(self.get_queryset().model, row)
+        return super().to_internal_value(data)
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -44,11 +68,14 @@ class RegisterSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data.pop('password2')
-        user = User.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data['email'],
-            password=validated_data['password']
+        # The async register view hashes in the pool first: save(password_hash=...).
+        password_hash = validated_data.get('password_hash') or passwords.make_password(validated_data['password'])
+        user = User(
+            username=User.normalize_username(validated_data['username']),
+            email=User.objects.normalize_email(validated_data['email']),
+            password=password_hash,
         )
+        user.save()
         return user
 
 
@@ -192,7 +219,8 @@ class ClassSerializer(serializers.ModelSerializer):
 
 
 class CharacterSheetSerializer(serializers.ModelSerializer):
-    character_class = serializers.PrimaryKeyRelatedField(
+    character_class = ReferencePrimaryKeyRelatedField(
+        table="class",
         queryset=Class.objects.all(),
         required=False,
     )
@@ -202,6 +230,8 @@ class CharacterSheetSerializer(serializers.ModelSerializer):
         required=False,
         allow_blank=True,
     )
+    resolved_spells = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    resolved_spell_details = serializers.SerializerMethodField()
 
     class Meta:
         model = CharacterSheet
@@ -348,15 +378,27 @@ class CharacterSheetSerializer(serializers.ModelSerializer):
             'spell_slots_9_total',
             'spell_slots_9_used',
             'spells_level_9',
+            'resolved_spells',
+            'resolved_spell_details',
         )
         read_only_fields = ('owner',)
 
+    def get_resolved_spell_details(self, obj):
+        return [
+            {"id": spell.id, "name": spell.name, "index": spell.index, "level": spell.level}
+            for spell in obj.resolved_spells.all()
+        ]
+
     def _resolve_class(self, value: str | None) -> Class | None:
         if not value:
             return None
         name = value.strip()
         if not name:
             return None
+        snapshot = get_snapshot()
+        row = snapshot.find("class", name=name) if snapshot is not None else None
+        if row is not None:
+            return instance_from_row(Class, row)
         class_obj, _ = Class.objects.get_or_create(name=name)
         return class_obj
 
@@ -369,7 +411,9 @@ class CharacterSheetSerializer(serializers.ModelSerializer):
         text = validated_data.pop("character_class_text", None)
         if text:
             validated_data["character_class"] = self._resolve_class(text)
-        return super().create(validated_data)
+        instance = super().create(validated_data)
+        link_spells(instance)
+        return instance
 
     def update(self, instance, validated_data):
         text = validated_data.pop("character_class_text", None)
@@ -377,7 +421,10 @@ class CharacterSheetSerializer(serializers.ModelSerializer):
             resolved = self._resolve_class(text)
             if resolved:
                 validated_data["character_class"] = resolved
-        return super().update(instance, validated_data)
+        instance = super().update(instance, validated_data)
+        if any(field in validated_data for field in SPELL_TEXT_FIELDS):
+            link_spells(instance)
+        return instance
 
 
 class CampaignJoinRequestSerializer(serializers.ModelSerializer):
@@ -434,6 +481,48 @@ class StoryOutcomeSerializer(serializers.ModelSerializer):
         fields = ('id', 'title', 'condition', 'description', 'order', 'storyline')
 
 
+class StorylineTreeSerializer(StorylineSerializer):
+    outcomes = StoryOutcomeSerializer(many=True, read_only=True)
+
+    class Meta(StorylineSerializer.Meta):
+        fields = StorylineSerializer.Meta.fields + ('outcomes',)
+
+
+class ReorderSerializer(serializers.Serializer):
+    order = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000,
+    )
+
+    def validate_order(self, value):
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError("Идентификаторы не должны повторяться")
+        return value
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = (
+            "id",
+            "name",
+            "status",
+            "attempts",
+            "max_attempts",
+            "run_at",
+            "result",
+            "created_at",
+            "finished_at",
+        )
+        read_only_fields = fields
+
+
+class CampaignCloneSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=255, required=False)
+    include_dm_notes = serializers.BooleanField(default=False)
+
+
 class ChatMessageSerializer(serializers.ModelSerializer):
     user_name = serializers.CharField(source='user.username', read_only=True)
 
@@ -441,3 +530,44 @@ class ChatMessageSerializer(serializers.ModelSerializer):
         model = ChatMessage
         fields = ('id', 'text', 'campaign', 'user', 'user_name', 'created_at')
         read_only_fields = ('user', 'user_name', 'created_at')
+
+
+class EncounterOpponentSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=100, default="Противник")
+    count = serializers.IntegerField(min_value=1, max_value=50, default=1)
+    armor_class = serializers.IntegerField(min_value=1, max_value=40)
+    hit_points = serializers.IntegerField(min_value=1, max_value=5000)
+    attack_bonus = serializers.IntegerField(min_value=-10, max_value=30, default=0)
+    damage = serializers.CharField(max_length=30, default="1d6")
+    attacks = serializers.IntegerField(min_value=0, max_value=10, default=1)
+    initiative = serializers.IntegerField(min_value=-10, max_value=20, default=0)
+    save_dc = serializers.IntegerField(min_value=1, max_value=40, required=False)
+    save_ability = serializers.ChoiceField(choices=ABILITIES, default="dexterity")
+    save_damage = serializers.CharField(max_length=30, required=False)
+    save_chance = serializers.FloatField(min_value=0, max_value=1, default=1 / 3)
+    save_success = serializers.ChoiceField(choices=("half", "none"), default="half")
+
+    def _validate_dice(self, value):
+        try:
+            parse_dice(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+        return value
+
+    def validate_damage(self, value):
+        return self._validate_dice(value)
+
+    def validate_save_damage(self, value):
+        return self._validate_dice(value)
+
+    def validate(self, attrs):
+        if attrs.get("save_dc") and not attrs.get("save_damage"):
+            raise serializers.ValidationError({"save_damage": "Укажите урон для спасброска"})
+        return attrs
+
+
+class EncounterSimulationSerializer(serializers.Serializer):
+    opponents = EncounterOpponentSerializer(many=True, allow_empty=False)
+    iterations = serializers.IntegerField(min_value=100, max_value=200_000, default=20_000)
+    max_rounds = serializers.IntegerField(min_value=1, max_value=50, default=20)
+    seed = serializers.IntegerField(min_value=0, required=False)
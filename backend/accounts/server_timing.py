@@ -0,0 +1,199 @@
+"""
+Per-request timings: SQL queries, database time, rendering and the view.
+
+``ServerTimingMiddleware`` measures every request and keeps the last
+``SERVER_TIMING_SAMPLES`` of each endpoint (method and URL name) in memory;
+``stats()`` turns them into percentiles, served to staff at
+``/api/accounts/metrics/timings/``. Responses carry a ``Server-Timing``
+header, shown by the browser devtools, when ``SERVER_TIMING`` is on or the
+user is staff:
+
+    Server-Timing: db;desc="7 queries";dur=3.1, serialize;dur=0.8, view;dur=9.4, total;dur=10.2
+
+``serialize`` is the renderers turning response data into bytes; building
+that data (serializers) is part of ``view``, as is ``db``. Requests slower
+than ``SERVER_TIMING_SLOW_MS`` are logged as warnings with their timings,
+all others at debug level.
+
+The numbers live in a context variable, so they follow a request into the
+threads the async ORM runs queries in, and each worker process aggregates
+its own requests.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.functional import SimpleLazyObject, empty
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar["Timings | None"] = ContextVar("server_timing", default=None)
+
+
+class Timings:
+    __slots__ = ("queries", "db", "serialize")
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+
+
+def _record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.db += time.perf_counter() - started
+
+
+def _install(connection) -> None:
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    _install(connection)
+
+
+def timed_serialize(func):
+    """Count the time spent in ``func`` as rendering time of the current request."""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = _current.get()
+        if timings is None:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings.serialize += time.perf_counter() - started
+
+    return wrapper
+
+
+_samples: dict[str, deque] = {}
+_counts: dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def _is_staff(request) -> bool:
+    user = getattr(request, "user", None)
+    # A session user nobody asked for is not loaded just for this (nor can
+    # it be from async code).
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return False
+    return bool(getattr(user, "is_staff", False))
+
+
+def _endpoint(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    # Unmatched URLs share one entry so scanners cannot grow the table.
+    name = (match.view_name or match.route) if match else "<unresolved>"
+    return f"{request.method} {name}"
+
+
+def _add(endpoint: str, sample: tuple) -> None:
+    with _lock:
+        samples = _samples.get(endpoint)
+        if samples is None:
+            samples = _samples[endpoint] = deque(maxlen=settings.SERVER_TIMING_SAMPLES)
+        samples.append(sample)
+        _counts[endpoint] = _counts.get(endpoint, 0) + 1
+
+
+_QUANTILES = (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+
+
+def _percentile(values: list, fraction: float):
+    return values[max(0, int(len(values) * fraction + 0.5) - 1)]
+
+
+def stats() -> dict:
+    """Percentiles of the kept samples by endpoint, slowest p95 first."""
+    with _lock:
+        snapshot = {endpoint: list(samples) for endpoint, samples in _samples.items()}
+        counts = dict(_counts)
+    result = {}
+    for endpoint, samples in snapshot.items():
+        total, db, queries, serialize = (sorted(column) for column in zip(*samples))
+        result[endpoint] = {
+            "requests": counts[endpoint],
+            "samples": len(samples),
+            "total_ms": {q: round(_percentile(total, f) * 1000, 3) for q, f in _QUANTILES},
+            "db_ms": {q: round(_percentile(db, f) * 1000, 3) for q, f in _QUANTILES},
+            "serialize_ms": {q: round(_percentile(serialize, f) * 1000, 3) for q, f in _QUANTILES},
+            "queries": {"p50": _percentile(queries, 0.5), "max": queries[-1]},
+        }
+    return dict(sorted(result.items(), key=lambda item: -item[1]["total_ms"]["p95"]))
+
+
+def reset() -> None:
+    with _lock:
+        _samples.clear()
+        _counts.clear()
+
+
+class ServerTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        connection_created.connect(_on_connection_created, dispatch_uid=__name__)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Connections this thread opened before the signal was connected.
+        for connection in connections.all(initialized_only=True):
+            _install(connection)
+        timings = Timings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        timings = Timings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, time.perf_counter() - started)
+
+    def _finish(self, request, response, timings, total):
+        endpoint = _endpoint(request)
+        _add(endpoint, (total, timings.db, timings.queries, timings.serialize))
+
+        metrics = (
+            f'db;desc="{timings.queries} queries";dur={timings.db * 1000:.1f}, '
+            f"serialize;dur={timings.serialize * 1000:.1f}, "
+            f"view;dur={(total - timings.serialize) * 1000:.1f}, "
+            f"total;dur={total * 1000:.1f}"
+        )
+        if settings.SERVER_TIMING or _is_staff(request):
+            response.headers["Server-Timing"] = metrics
+        level = logging.WARNING if total * 1000 >= settings.SERVER_TIMING_SLOW_MS else logging.DEBUG
+        if logger.isEnabledFor(level):
+            logger.log(level, "%s %s %s: %s", endpoint, request.path, response.status_code, metrics)
+        return response
@@ -0,0 +1,248 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import commit_batch, reference_snapshot, response_cache, search, spell_matcher
+from .authentication import revoke_tokens
+from .models import (
+    AreaOfEffect,
+    Campaign,
+    CampaignJoinRequest,
+    CampaignNote,
+    CharacterSheet,
+    ChatMessage,
+    ClaimsUser,
+    Class,
+    DamageType,
+    DMNote,
+    MagicSchool,
+    Session,
+    Spell,
+    StoryOutcome,
+    Storyline,
+    Subclass,
+)
+
+
+@receiver(post_save, sender=Spell)
+@receiver(post_delete, sender=Spell)
+def invalidate_spell_matcher(sender, **kwargs):
+    spell_matcher.invalidate()
+
+
+@receiver(post_save, sender=Class)
+@receiver(post_delete, sender=Class)
+@receiver(post_save, sender=Subclass)
+@receiver(post_delete, sender=Subclass)
+@receiver(post_save, sender=MagicSchool)
+@receiver(post_delete, sender=MagicSchool)
+@receiver(post_save, sender=DamageType)
+@receiver(post_delete, sender=DamageType)
+@receiver(post_save, sender=AreaOfEffect)
+@receiver(post_delete, sender=AreaOfEffect)
+@receiver(post_save, sender=Spell)
+@receiver(post_delete, sender=Spell)
+def rebuild_reference_snapshot(sender, **kwargs):
+    reference_snapshot.schedule_rebuild()
+
+
+def _bump_revisions(campaign_ids):
+    Campaign.bump_revision(pk__in=campaign_ids)
+
+
+def bump_revision(campaign_id) -> None:
+    """Bump the desk revision once on commit, however many of its rows change."""
+    if campaign_id is not None:
+        commit_batch.add(_bump_revisions, campaign_id)
+
+
+def _session_campaign_id(session_id):
+    return Session.objects.filter(pk=session_id).values_list("campaign_id", flat=True).first()
+
+
+def _storyline_campaign_id(storyline_id):
+    return Storyline.objects.filter(pk=storyline_id).values_list("campaign_id", flat=True).first()
+
+
+@receiver(post_save, sender=Campaign)
+def bump_revision_on_campaign_change(sender, instance, created, **kwargs):
+    if not created:
+        bump_revision(instance.pk)
+
+
+@receiver(post_save, sender=Session)
+@receiver(post_delete, sender=Session)
+@receiver(post_save, sender=CampaignNote)
+@receiver(post_delete, sender=CampaignNote)
+@receiver(post_save, sender=Storyline)
+@receiver(post_delete, sender=Storyline)
+@receiver(post_save, sender=ChatMessage)
+@receiver(post_delete, sender=ChatMessage)
+@receiver(post_save, sender=CampaignJoinRequest)
+@receiver(post_delete, sender=CampaignJoinRequest)
+def bump_revision_on_child_change(sender, instance, **kwargs):
+    bump_revision(instance.campaign_id)
+
+
+@receiver(post_save, sender=DMNote)
+@receiver(post_delete, sender=DMNote)
+def bump_revision_on_dm_note_change(sender, instance, **kwargs):
+    bump_revision(_session_campaign_id(instance.session_id))
+
+
+@receiver(post_save, sender=StoryOutcome)
+@receiver(post_delete, sender=StoryOutcome)
+def bump_revision_on_outcome_change(sender, instance, **kwargs):
+    bump_revision(_storyline_campaign_id(instance.storyline_id))
+
+
+@receiver(post_save, sender=CharacterSheet)
+@receiver(post_delete, sender=CharacterSheet)
+def bump_revision_on_character_change(sender, instance, **kwargs):
+    # The desk shows the viewer's own sheets and the party, so every campaign
+    # the owner takes part in is affected.
+    if instance.owner_id is None:
+        return
+    campaign_ids = Campaign.objects.filter(
+        Q(owner_id=instance.owner_id)
+        | Q(
+            join_requests__user_id=instance.owner_id,
+            join_requests__status=CampaignJoinRequest.Status.ACCEPTED,
+        )
+    ).values_list("id", flat=True)
+    commit_batch.add(_bump_revisions, *campaign_ids)
+
+
+@receiver(post_save, sender=Campaign)
+@receiver(post_delete, sender=Campaign)
+def invalidate_campaign_responses(sender, instance, **kwargs):
+    if kwargs.get("created") is False:
+        response_cache.invalidate_campaign(instance.pk, "campaign")
+    else:
+        # Created or deleted: the owner's campaign list changes too.
+        response_cache.invalidate_campaign(instance.pk)
+        response_cache.invalidate(response_cache.user_scope(instance.owner_id))
+    response_cache.invalidate(response_cache.PUBLIC)
+
+
+@receiver(post_save, sender=CampaignJoinRequest)
+@receiver(post_delete, sender=CampaignJoinRequest)
+def invalidate_join_request_responses(sender, instance, **kwargs):
+    response_cache.invalidate_campaign(instance.campaign_id, "campaign")
+    response_cache.invalidate(response_cache.user_scope(instance.user_id), response_cache.PUBLIC)
+
+
+CAMPAIGN_CHILD_KINDS = {
+    Session: "sessions",
+    CampaignNote: "notes",
+    Storyline: "storylines",
+    ChatMessage: "chat",
+}
+
+
+@receiver(post_save, sender=Session)
+@receiver(post_delete, sender=Session)
+@receiver(post_save, sender=CampaignNote)
+@receiver(post_delete, sender=CampaignNote)
+@receiver(post_save, sender=Storyline)
+@receiver(post_delete, sender=Storyline)
+@receiver(post_save, sender=ChatMessage)
+@receiver(post_delete, sender=ChatMessage)
+def invalidate_child_responses(sender, instance, **kwargs):
+    response_cache.invalidate_campaign(instance.campaign_id, CAMPAIGN_CHILD_KINDS[sender])
+
+
+@receiver(post_save, sender=DMNote)
+@receiver(post_delete, sender=DMNote)
+def invalidate_dm_note_responses(sender, instance, **kwargs):
+    campaign_id = _session_campaign_id(instance.session_id)
+    if campaign_id is not None:
+        response_cache.invalidate_campaign(campaign_id, "sessions")
+
+
+@receiver(post_save, sender=StoryOutcome)
+@receiver(post_delete, sender=StoryOutcome)
+def invalidate_outcome_responses(sender, instance, **kwargs):
+    campaign_id = _storyline_campaign_id(instance.storyline_id)
+    if campaign_id is not None:
+        response_cache.invalidate_campaign(campaign_id, "storylines")
+
+
+@receiver(post_save, sender=CharacterSheet)
+@receiver(post_delete, sender=CharacterSheet)
+@receiver(m2m_changed, sender=CharacterSheet.resolved_spells.through)
+def invalidate_character_responses(sender, instance, **kwargs):
+    if kwargs.get("reverse") or kwargs.get("action", "post_").startswith("pre_"):
+        return
+    if instance.owner_id is not None:
+        response_cache.invalidate(response_cache.user_scope(instance.owner_id))
+    # Parties and join requests show the character.
+    for campaign_id in CampaignJoinRequest.objects.filter(character_id=instance.pk).values_list(
+        "campaign_id", flat=True
+    ):
+        response_cache.invalidate_campaign(campaign_id, "campaign")
+
+
+@receiver(m2m_changed, sender=CharacterSheet.resolved_spells.through)
+def touch_character_on_spells_change(sender, instance, action, reverse, **kwargs):
+    # Linked spells are part of the sheet, so they move its updated_at.
+    if not reverse and action.startswith("post_"):
+        CharacterSheet.objects.filter(pk=instance.pk).update(updated_at=timezone.now())
+
+
+ACCOUNT_STATE_FIELDS = ("is_active", "is_staff", "is_superuser")
+
+# request.user is a ClaimsUser (accounts.authentication); saving it sends the
+# signals with the proxy as sender, so the User receivers listen for both.
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=ClaimsUser)
+def note_account_state_change(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None or (
+        update_fields is not None and not set(update_fields) & set(ACCOUNT_STATE_FIELDS)
+    ):
+        return
+    stored = User.objects.filter(pk=instance.pk).values(*ACCOUNT_STATE_FIELDS).first()
+    instance._account_state_changed = stored is not None and any(
+        stored[name] != getattr(instance, name) for name in ACCOUNT_STATE_FIELDS
+    )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=ClaimsUser)
+def revoke_tokens_on_account_state_change(sender, instance, **kwargs):
+    # Access tokens carry these as claims; a new version makes them re-read.
+    if instance.__dict__.pop("_account_state_changed", False):
+        transaction.on_commit(lambda: revoke_tokens(instance))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=ClaimsUser)
+def invalidate_user_responses(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {"last_login", "password"}:
+        return
+    response_cache.invalidate(response_cache.user_scope(instance.pk), response_cache.PUBLIC)
+    for campaign_id in Campaign.objects.filter(owner_id=instance.pk).values_list("id", flat=True):
+        response_cache.invalidate_campaign(campaign_id, "campaign")
+    # Chat messages show their author's username.
+    for campaign_id in (
+        ChatMessage.objects.filter(user_id=instance.pk).values_list("campaign_id", flat=True).distinct()
+    ):
+        response_cache.invalidate_campaign(campaign_id, "chat")
+
+
+@receiver(post_save, sender=Class)
+@receiver(post_delete, sender=Class)
+@receiver(post_save, sender=Subclass)
+@receiver(post_delete, sender=Subclass)
+@receiver(post_save, sender=Spell)
+@receiver(post_delete, sender=Spell)
+def invalidate_reference_responses(sender, **kwargs):
+    response_cache.invalidate(response_cache.REFERENCE)
+
+
+search.connect_signals()
@@ -0,0 +1,195 @@
+"""
+Resolve free-text spell lists on character sheets to ``Spell`` records.
+
+All spell names, slugs and aliases are compiled into one Aho-Corasick
+automaton, so a sheet is scanned in time linear in its text length no matter
+how large the compendium is.
+"""
+import re
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+from .reference_snapshot import get_snapshot
+
+
+SPELL_TEXT_FIELDS = (
+    "spells",
+    "spells_cantrips",
+    "spells_level_1",
+    "spells_level_2",
+    "spells_level_3",
+    "spells_level_4",
+    "spells_level_5",
+    "spells_level_6",
+    "spells_level_7",
+    "spells_level_8",
+    "spells_level_9",
+)
+
+_SPACES_RE = re.compile(r"[\s_\-]+")
+
+
+def normalize(text: str) -> str:
+    """Case-fold and collapse separators so ``Magic-Missile`` matches ``magic missile``."""
+    text = text.casefold().replace("ё", "е").replace("’", "'")
+    return _SPACES_RE.sub(" ", text).strip()
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher over normalized strings.
+
+    ``patterns`` maps a normalized pattern to an opaque value (a spell id).
+    """
+
+    def __init__(self, patterns: dict[str, int]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        # (pattern length, value) for the pattern ending exactly at a state.
+        self._out: list[tuple[int, int] | None] = [None]
+        # Nearest state on the fail chain that has an output.
+        self._dict_link: list[int] = [0]
+
+        for pattern, value in patterns.items():
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(None)
+                    self._dict_link.append(0)
+                state = nxt
+            self._out[state] = (len(pattern), value)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[nxt] = fail if fail != nxt else 0
+                self._dict_link[nxt] = fail if self._out[fail] else self._dict_link[fail]
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def iter_matches(self, text: str):
+        """Yield ``(start, end, value)`` for every pattern occurrence in ``text``."""
+        goto, fail, out, dict_link = self._goto, self._fail, self._out, self._dict_link
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            found = state if out[state] else dict_link[state]
+            while found:
+                length, value = out[found]
+                yield position + 1 - length, position + 1, value
+                found = dict_link[found]
+
+    def find(self, text: str) -> list[int]:
+        """
+        Values of whole-word, leftmost-longest, non-overlapping matches in
+        order of appearance (``Shield of Faith`` wins over ``Shield``).
+        """
+        text = normalize(text)
+        size = len(text)
+        matches = [
+            (start, -end, value)
+            for start, end, value in self.iter_matches(text)
+            if (start == 0 or not text[start - 1].isalnum())
+            and (end == size or not text[end].isalnum())
+        ]
+        matches.sort()
+        result = []
+        covered = 0
+        for start, neg_end, value in matches:
+            if start < covered:
+                continue
+            covered = -neg_end
+            result.append(value)
+        return result
+
+
+def spell_patterns(rows) -> dict[str, int]:
+    """Build normalized patterns from ``(id, name, index, aliases)`` rows."""
+    patterns: dict[str, int] = {}
+    for spell_id, name, index, aliases in rows:
+        for candidate in (name, index, *(aliases or [])):
+            key = normalize(candidate or "")
+            if key:
+                patterns.setdefault(key, spell_id)
+    return patterns
+
+
+_lock = threading.Lock()
+_cached: tuple[float, int | None, AhoCorasick] | None = None
+
+
+def _load_patterns(snapshot) -> dict[str, int]:
+    from .models import Spell
+
+    if snapshot is not None:
+        rows = (
+            (row["id"], row["name"], row["index"], row["aliases"])
+            for row in snapshot.rows("spell")
+        )
+    else:
+        rows = Spell.objects.order_by("id").values_list("id", "name", "index", "aliases")
+    return spell_patterns(rows)
+
+
+def get_matcher() -> AhoCorasick:
+    """
+    Per-process matcher. It follows the reference snapshot generation when a
+    snapshot is available; otherwise it is rebuilt after ``invalidate()`` or
+    ``SPELL_MATCHER_TTL`` seconds.
+    """
+    global _cached
+    snapshot = get_snapshot()
+    generation = snapshot.generation if snapshot is not None else None
+    ttl = getattr(settings, "SPELL_MATCHER_TTL", 300)
+    cached = _cached
+    if (
+        cached is not None
+        and cached[1] == generation
+        and (generation is not None or time.monotonic() - cached[0] < ttl)
+    ):
+        return cached[2]
+    with _lock:
+        if _cached is cached:
+            _cached = (time.monotonic(), generation, AhoCorasick(_load_patterns(snapshot)))
+        return _cached[2]
+
+
+def invalidate() -> None:
+    global _cached
+    _cached = None
+
+
+def resolve_spell_ids(sheet, matcher: AhoCorasick | None = None) -> list[int]:
+    """Distinct spell ids mentioned in the sheet's spell fields, in order of appearance."""
+    matcher = matcher or get_matcher()
+    seen: dict[int, None] = {}
+    for field in SPELL_TEXT_FIELDS:
+        text = getattr(sheet, field, "")
+        if text:
+            seen.update(dict.fromkeys(matcher.find(text)))
+    return list(seen)
+
+
+def link_spells(sheet, matcher: AhoCorasick | None = None) -> list[int]:
+    spell_ids = resolve_spell_ids(sheet, matcher)
+    sheet.resolved_spells.set(spell_ids)
+    return spell_ids
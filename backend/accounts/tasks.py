@@ -0,0 +1,38 @@
+"""Background job handlers, run by ``manage.py run_worker``."""
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+
+from . import search
+from .campaign_archive import ArchiveError, import_archive
+from .jobs import JobFailed, task
+from .purge import purge_campaign
+
+
+@task("purge_campaign")
+def purge_campaign_task(payload):
+    return {"rows": purge_campaign(payload["campaign"])}
+
+
+@task("reindex_campaign")
+def reindex_campaign_task(payload):
+    return {"documents": search.rebuild(campaign_id=payload.get("campaign"))}
+
+
+@task("import_campaign")
+def import_campaign_task(payload):
+    owner = User.objects.get(pk=payload["owner"])
+    path = payload["path"]
+    try:
+        with default_storage.open(path, "rb") as archive:
+            campaign = import_archive(archive, owner)
+    except ArchiveError as exc:
+        raise JobFailed(str(exc)) from exc
+    except FileNotFoundError as exc:
+        # The web server saved it to storage this worker does not see.
+        raise JobFailed(
+            "Архив не найден: worker должен использовать то же хранилище файлов, что и backend"
+        ) from exc
+    finally:
+        # Import jobs are not retried, so the upload is never needed again.
+        default_storage.delete(path)
+    return {"campaign": campaign.pk}
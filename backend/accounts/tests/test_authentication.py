@@ -0,0 +1,131 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, TestCase
+
+from accounts import async_views
+from accounts.authentication import issue_tokens
+from accounts.models import Campaign, ChatMessage, ClaimsUser
+
+
+class ClaimsUserSignalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", password="owner-password", is_staff=True)
+        cls.player = User.objects.create_user("player", password="player-password")
+        cls.campaign = Campaign.objects.create(name="Curse of Strahd", owner=cls.owner)
+        ChatMessage.objects.create(campaign=cls.campaign, user=cls.player, text="Hello")
+
+    def setUp(self):
+        cache.clear()
+
+    def _auth(self, user):
+        return {"Authorization": f"Bearer {issue_tokens(user)['access']}"}
+
+    def test_rename_through_me_changes_chat_etag(self):
+        url = f"/api/accounts/chat-messages/?campaign={self.campaign.pk}"
+        owner = self._auth(self.owner)
+        response = self.client.get(url, headers=owner)
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(url, headers={**owner, "If-None-Match": etag}).status_code, 304)
+
+        # request.user is a ClaimsUser here, not a User.
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                "/api/accounts/me/",
+                {"username": "vampire-hunter"},
+                content_type="application/json",
+                headers=self._auth(self.player),
+            )
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(url, headers={**owner, "If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["results"][0]["user_name"], "vampire-hunter")
+
+    def test_demoting_a_claims_user_revokes_its_tokens(self):
+        headers = self._auth(self.owner)
+        self.assertEqual(self.client.get("/api/accounts/metrics/timings/", headers=headers).status_code, 200)
+
+        user = ClaimsUser.objects.get(pk=self.owner.pk)
+        user.is_staff = False
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+
+        self.assertEqual(self.client.get("/api/accounts/me/", headers=headers).status_code, 401)
+        self.assertEqual(self.client.get("/api/accounts/me/", headers=self._auth(user)).status_code, 200)
+
+    def test_version_is_read_from_the_database_on_a_cache_miss(self):
+        headers = self._auth(self.player)
+        user = User.objects.get(pk=self.player.pk)
+        user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        cache.clear()
+        self.assertEqual(self.client.get("/api/accounts/me/", headers=headers).status_code, 401)
+
+    def test_unrelated_saves_keep_tokens(self):
+        headers = self._auth(self.player)
+        user = User.objects.get(pk=self.player.pk)
+        user.first_name = "Ireena"
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertEqual(self.client.get("/api/accounts/me/", headers=headers).status_code, 200)
+
+
+class AsyncPasswordViewTests(TestCase):
+    """The ASGI login and register views, which await the hashing pool."""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = AsyncRequestFactory()
+
+    async def _post(self, view, data):
+        response = await view(self.factory.post("/", data, content_type="application/json"))
+        return response.render()
+
+    async def test_login(self):
+        await User.objects.acreate_user("strahd", password="ravenloft-1")
+        response = await self._post(async_views.login, {"username": "strahd", "password": "ravenloft-1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access", json.loads(response.content)["tokens"])
+        user = await User.objects.aget(username="strahd")
+        self.assertIsNotNone(user.last_login)
+
+    async def test_login_rejects_bad_credentials(self):
+        await User.objects.acreate_user("strahd", password="ravenloft-1")
+        failed = []
+
+        def on_failure(**kwargs):
+            failed.append(kwargs["credentials"]["username"])
+
+        user_login_failed.connect(on_failure)
+        try:
+            for password in ("wrong-password", None):
+                response = await self._post(async_views.login, {"username": "strahd", "password": password})
+                self.assertEqual(response.status_code, 401 if password else 400)
+            response = await self._post(async_views.login, {"username": "nobody", "password": "x"})
+            self.assertEqual(response.status_code, 401)
+        finally:
+            user_login_failed.disconnect(on_failure)
+        self.assertEqual(failed, ["strahd", "nobody"])
+
+    async def test_register(self):
+        data = {
+            "username": "ireena",
+            "email": "ireena@barovia.test",
+            "password": "Kolyana-1476",
+            "password2": "Kolyana-1476",
+        }
+        response = await self._post(async_views.register, data)
+        self.assertEqual(response.status_code, 201)
+        user = await User.objects.aget(username="ireena")
+        self.assertTrue(await sync_to_async(user.check_password)("Kolyana-1476"))
+
+        response = await self._post(async_views.register, data)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("username", json.loads(response.content))
@@ -0,0 +1,102 @@
+import io
+import json
+import zipfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.campaign_archive import ArchiveError, export_archive, import_archive
+from accounts.models import (
+    Campaign,
+    CampaignNote,
+    CharacterSheet,
+    ChatMessage,
+    Class,
+    DMNote,
+    Session,
+    StoryOutcome,
+    Storyline,
+)
+
+
+class CampaignArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", password="owner-password")
+        cls.importer = User.objects.create_user("importer", password="importer-password")
+        cls.campaign = Campaign.objects.create(
+            name="Princes of the Apocalypse", owner=cls.owner, world_story="Elemental Evil"
+        )
+        sheet = CharacterSheet.objects.create(
+            owner=cls.owner,
+            name="Bruenor",
+            character_class=Class.objects.create(name="Fighter", hit_die=10),
+            race="Dwarf",
+        )
+        cls.campaign.characters.add(sheet)
+        session = Session.objects.create(campaign=cls.campaign, number=1, date=timezone.now())
+        DMNote.objects.create(session=session, text="Feathergale Spire")
+        CampaignNote.objects.create(campaign=cls.campaign, text="Red Larch")
+        storyline = Storyline.objects.create(campaign=cls.campaign, title="Haunted Keeps")
+        StoryOutcome.objects.create(storyline=storyline, title="Sacred Stone")
+        ChatMessage.objects.create(campaign=cls.campaign, user=cls.owner, text="Ready?")
+
+    def _archive(self, **replace) -> io.BytesIO:
+        """The exported archive with the members in ``replace`` swapped for new rows."""
+        exported = zipfile.ZipFile(io.BytesIO(b"".join(export_archive(self.campaign))))
+        output = io.BytesIO()
+        with exported, zipfile.ZipFile(output, "w") as archive:
+            for name in exported.namelist():
+                key = name.removesuffix(".ndjson")
+                if key in replace:
+                    archive.writestr(name, "\n".join(json.dumps(row) for row in replace[key]))
+                else:
+                    archive.writestr(name, exported.read(name))
+        output.seek(0)
+        return output
+
+    def _rows(self, member: str) -> list[dict]:
+        with zipfile.ZipFile(self._archive()) as archive:
+            return [json.loads(line) for line in archive.read(f"{member}.ndjson").splitlines()]
+
+    def test_round_trip(self):
+        copy = import_archive(self._archive(), self.importer)
+
+        self.assertNotEqual(copy.pk, self.campaign.pk)
+        self.assertEqual(
+            (copy.name, copy.world_story, copy.owner),
+            (self.campaign.name, "Elemental Evil", self.importer),
+        )
+        self.assertEqual(list(copy.characters.values_list("name", "owner")), [("Bruenor", self.importer.pk)])
+        self.assertEqual(
+            list(DMNote.objects.filter(session__campaign=copy).values_list("text", flat=True)),
+            ["Feathergale Spire"],
+        )
+        self.assertEqual(list(copy.notes.values_list("text", flat=True)), ["Red Larch"])
+        self.assertEqual(
+            list(
+                StoryOutcome.objects.filter(storyline__campaign=copy).values_list("storyline__title", "title")
+            ),
+            [("Haunted Keeps", "Sacred Stone")],
+        )
+        self.assertEqual(list(copy.chat_messages.values_list("user", "text")), [(self.importer.pk, "Ready?")])
+
+    def test_dangling_references_are_archive_errors(self):
+        cases = {
+            "dm_notes": [{**self._rows("dm_notes")[0], "session_id": 999999}],
+            "story_outcomes": [{**row, "storyline_id": None} for row in self._rows("story_outcomes")],
+        }
+        for member, rows in cases.items():
+            with self.subTest(member=member):
+                with self.assertRaisesMessage(ArchiveError, "несуществующую"):
+                    import_archive(self._archive(**{member: rows}), self.importer)
+        self.assertEqual(Campaign.objects.filter(owner=self.importer).count(), 0)
+
+    def test_malformed_rows_are_archive_errors(self):
+        session = self._rows("sessions")[0]
+        for rows in ([{**session, "date": "not a date"}], [["not", "a", "row"]], [{**session, "date": None}]):
+            with self.subTest(rows=rows):
+                with self.assertRaises(ArchiveError):
+                    import_archive(self._archive(sessions=rows), self.importer)
+        self.assertEqual(Campaign.objects.filter(owner=self.importer).count(), 0)
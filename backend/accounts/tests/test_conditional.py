@@ -0,0 +1,75 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.authentication import issue_tokens
+from accounts.models import Campaign, CampaignJoinRequest, CharacterSheet, Class, Session
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", password="owner-password")
+        cls.player = User.objects.create_user("player", password="player-password")
+        cls.campaign = Campaign.objects.create(name="Waterdeep", owner=cls.owner)
+        CampaignJoinRequest.objects.create(
+            campaign=cls.campaign,
+            user=cls.player,
+            character=CharacterSheet.objects.create(
+                owner=cls.player,
+                name="Volo",
+                character_class=Class.objects.create(name="Bard", hit_die=8),
+                race="Human",
+            ),
+            status=CampaignJoinRequest.Status.ACCEPTED,
+        )
+        cls.session = Session.objects.create(campaign=cls.campaign, number=1, date=timezone.now())
+
+    def setUp(self):
+        cache.clear()
+
+    def _get(self, url, user, etag=None):
+        headers = {"Authorization": f"Bearer {issue_tokens(user)['access']}"}
+        if etag:
+            headers["If-None-Match"] = etag
+        return self.client.get(url, headers=headers)
+
+    def test_list_answers_304_until_a_row_changes(self):
+        url = f"/api/accounts/sessions/?campaign={self.campaign.pk}"
+        response = self._get(url, self.player)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        response = self._get(url, self.player, etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.session.description = "Trollskull Alley"
+            self.session.save()
+        response = self._get(url, self.player, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["results"][0]["description"], "Trollskull Alley")
+
+    def test_etags_are_per_user(self):
+        url = f"/api/accounts/sessions/?campaign={self.campaign.pk}"
+        etag = self._get(url, self.player)["ETag"]
+        self.assertEqual(self._get(url, self.owner, etag).status_code, 200)
+
+    def test_desk_follows_the_revision(self):
+        url = f"/api/accounts/campaigns/{self.campaign.pk}/desk/"
+        response = self._get(url, self.owner)
+        self.assertEqual(response.status_code, 200)
+        etag, version = response["ETag"], response.json()["version"]
+        self.assertEqual(self._get(url, self.owner, etag).status_code, 304)
+        self.assertEqual(self._get(f"{url}?since={version}", self.owner).json()["changed"], False)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Session.objects.create(campaign=self.campaign, number=2, date=timezone.now())
+        response = self._get(url, self.owner, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(response.json()["version"], version)
+        self.assertEqual(len(response.json()["sessions"]), 2)
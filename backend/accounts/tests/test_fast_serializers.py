@@ -0,0 +1,129 @@
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.request import Request
+
+from accounts.fast_serializers import (
+    CampaignFastSerializer,
+    CharacterSheetFastSerializer,
+    ChatMessageFastSerializer,
+)
+from accounts.models import (
+    Campaign,
+    CampaignJoinRequest,
+    CharacterSheet,
+    ChatMessage,
+    Class,
+    MagicSchool,
+    Spell,
+)
+from accounts.renderers import dumps
+from accounts.views import chat_messages, member_campaigns, public_campaigns
+
+
+def _sheets(user):
+    # CharacterSheetViewSet.get_queryset()
+    return (
+        CharacterSheet.objects.select_related("character_class")
+        .prefetch_related("resolved_spells")
+        .filter(owner=user)
+        .order_by("id")
+    )
+
+
+# Reference rows are saved here; keep the signals off the shared snapshot file.
+@override_settings(REFERENCE_SNAPSHOT_PATH="")
+class FastSerializerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", password="owner-password")
+        cls.player = User.objects.create_user("player", password="player-password")
+        cls.pending = User.objects.create_user("pending", password="pending-password")
+        # No character sheet and in no campaign but their own.
+        cls.outsider = User.objects.create_user("outsider", password="outsider-password")
+
+        wizard = Class.objects.create(name="Wizard", hit_die=6)
+        fighter = Class.objects.create(name="Fighter", hit_die=10)
+        school = MagicSchool.objects.create(name="Evocation")
+        spells = [
+            Spell.objects.create(
+                name=name,
+                index=index,
+                level=level,
+                casting_time="1 action",
+                duration="Instantaneous",
+                range="120 feet",
+                school=school,
+            )
+            for name, index, level in (
+                ("Magic Missile", "magic-missile", 1),
+                ("Fire Bolt", "fire-bolt", 0),
+                ("Fireball", "fireball", 3),
+            )
+        ]
+
+        cls.player_sheet = CharacterSheet.objects.create(
+            owner=cls.player,
+            name="Elminster",
+            character_class=wizard,
+            race="Human",
+            level=5,
+            appearance_image="character_sheets/appearance/elminster.png",
+        )
+        cls.player_sheet.resolved_spells.set(spells)
+        # No spells and no images.
+        CharacterSheet.objects.create(owner=cls.player, name="Spare", character_class=fighter, race="Elf")
+        pending_sheet = CharacterSheet.objects.create(
+            owner=cls.pending,
+            name="Conan",
+            character_class=fighter,
+            race="Human",
+            symbol_image="character_sheets/symbols/conan.png",
+        )
+
+        campaign = Campaign.objects.create(name="Tomb of Horrors", owner=cls.owner, world_story="Acererak")
+        CampaignJoinRequest.objects.create(
+            campaign=campaign,
+            user=cls.player,
+            character=cls.player_sheet,
+            status=CampaignJoinRequest.Status.ACCEPTED,
+        )
+        CampaignJoinRequest.objects.create(campaign=campaign, user=cls.pending, character=pending_sheet)
+        # Nobody has joined this one.
+        Campaign.objects.create(name="Empty table", owner=cls.owner, is_public=True)
+        Campaign.objects.create(name="Private", owner=cls.outsider, is_public=False)
+
+        ChatMessage.objects.create(campaign=campaign, user=cls.owner, text="Welcome")
+        ChatMessage.objects.create(campaign=campaign, user=cls.player, text="line\u2028separator\u2029paragraph")
+
+    def _context(self, user):
+        request = Request(RequestFactory().get("/"))
+        request.user = user
+        return {"request": request, "view": None, "format": None}
+
+    def _assert_same(self, fast_class, queryset, user):
+        context = self._context(user)
+        fast = fast_class(context)
+        expected = fast_class.serializer_class(queryset, many=True, context=context).data
+        self.assertEqual(dumps(fast.serialize(fast.values(queryset))), dumps(expected))
+        return expected
+
+    def test_campaigns(self):
+        for user in (AnonymousUser(), self.owner, self.player, self.pending, self.outsider):
+            with self.subTest(user=str(user)):
+                self.assertTrue(self._assert_same(CampaignFastSerializer, public_campaigns(), user))
+                if user.is_authenticated:
+                    self._assert_same(CampaignFastSerializer, member_campaigns(user), user)
+
+    def test_character_sheets(self):
+        for user in (self.player, self.pending, self.outsider):
+            with self.subTest(user=str(user)):
+                self._assert_same(CharacterSheetFastSerializer, _sheets(user), user)
+        data = self._assert_same(CharacterSheetFastSerializer, _sheets(self.player), self.player)
+        self.assertEqual(len(data[0]["resolved_spell_details"]), 3)
+
+    def test_chat_messages(self):
+        for user in (self.owner, self.player, self.outsider):
+            with self.subTest(user=str(user)):
+                self._assert_same(ChatMessageFastSerializer, chat_messages(user, {}), user)
+        data = self._assert_same(ChatMessageFastSerializer, chat_messages(self.player, {}), self.player)
+        self.assertIn(b"\\u2028", dumps(data))
@@ -0,0 +1,96 @@
+import threading
+from datetime import timedelta
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from accounts import jobs
+from accounts.models import Job
+
+_release = threading.Event()
+
+
+@jobs.task("tests.wait")
+def _wait(payload):
+    _release.wait(5)
+    return {"ok": True}
+
+
+def _running(attempts, max_attempts=5, age=3600):
+    return Job.objects.create(
+        name="tests.wait",
+        status=Job.Status.RUNNING,
+        attempts=attempts,
+        max_attempts=max_attempts,
+        locked_by="dead-worker",
+        locked_at=timezone.now() - timedelta(seconds=age),
+    )
+
+
+@override_settings(JOB_LOCK_TIMEOUT=600)
+class RequeueStaleTests(TestCase):
+    def test_requeues_stale_jobs_with_attempts_left(self):
+        job = _running(attempts=1)
+        fresh = _running(attempts=1, age=10)
+
+        self.assertEqual(jobs.requeue_stale(), (1, 0))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertEqual(job.locked_by, "")
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.status, Job.Status.RUNNING)
+
+    def test_fails_stale_jobs_out_of_attempts(self):
+        job = _running(attempts=1, max_attempts=1)
+
+        self.assertEqual(jobs.requeue_stale(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertIsNotNone(job.finished_at)
+        self.assertTrue(job.last_error)
+        self.assertEqual(jobs.claim(10), [])
+
+
+class ClaimTests(TestCase):
+    def test_skips_jobs_out_of_attempts(self):
+        spent = jobs.enqueue("tests.wait", max_attempts=2)
+        Job.objects.filter(pk=spent.pk).update(attempts=2)
+        due = jobs.enqueue("tests.wait", max_attempts=2)
+
+        claimed = jobs.claim(10)
+        self.assertEqual([job.pk for job in claimed], [due.pk])
+        self.assertEqual(claimed[0].attempts, 1)
+        spent.refresh_from_db()
+        self.assertEqual(spent.status, Job.Status.QUEUED)
+
+
+# The heartbeat writes from its own thread and connection.
+@override_settings(JOB_LOCK_TIMEOUT=1, JOB_HEARTBEAT_INTERVAL=0.05)
+class HeartbeatTests(TransactionTestCase):
+    def setUp(self):
+        _release.clear()
+
+    def tearDown(self):
+        _release.set()
+
+    def test_long_running_job_is_not_requeued(self):
+        jobs.enqueue("tests.wait", max_attempts=1)
+        [job] = jobs.claim(1)
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        worker = threading.Thread(target=jobs.run, args=(job,))
+        worker.start()
+        try:
+            for _ in range(100):
+                job.refresh_from_db()
+                if job.locked_at > timezone.now() - timedelta(seconds=1):
+                    break
+                _release.wait(0.05)
+            self.assertEqual(jobs.requeue_stale(), (0, 0))
+        finally:
+            _release.set()
+            worker.join()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.DONE)
+        self.assertEqual(job.result, {"ok": True})
+        self.assertEqual(job.attempts, 1)
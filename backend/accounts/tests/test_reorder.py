@@ -0,0 +1,66 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from accounts.authentication import issue_tokens
+from accounts.models import Campaign, StoryOutcome, Storyline
+
+
+class ReorderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", password="owner-password")
+        cls.campaign = Campaign.objects.create(name="Storm King's Thunder", owner=cls.owner)
+        cls.storylines = [
+            Storyline.objects.create(campaign=cls.campaign, title=title, order=order)
+            for order, title in enumerate(("Nightstone", "Triboar", "Eye of the All-Father"), start=1)
+        ]
+        cls.other = Storyline.objects.create(
+            campaign=Campaign.objects.create(name="Other", owner=cls.owner),
+            title="Elsewhere",
+        )
+        cls.outcomes = [
+            StoryOutcome.objects.create(storyline=cls.storylines[0], title=title, order=order)
+            for order, title in enumerate(("Raid", "Rescue"), start=1)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.headers = {"Authorization": f"Bearer {issue_tokens(self.owner)['access']}"}
+
+    def _reorder(self, url, data):
+        return self.client.post(url, data, content_type="application/json", headers=self.headers)
+
+    def _order(self, queryset):
+        return list(queryset.order_by("order", "id").values_list("pk", flat=True))
+
+    def test_storylines(self):
+        ids = [storyline.pk for storyline in reversed(self.storylines)]
+        response = self._reorder(
+            "/api/accounts/storylines/reorder/", {"campaign": self.campaign.pk, "order": ids}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._order(self.campaign.storylines.all()), ids)
+
+    def test_partial_or_foreign_lists_are_rejected(self):
+        before = self._order(Storyline.objects.all())
+        first, second, third = (storyline.pk for storyline in self.storylines)
+        for ids in ([third, first], [third, second, first, self.other.pk], [third, second, self.other.pk]):
+            with self.subTest(ids=ids):
+                response = self._reorder(
+                    "/api/accounts/storylines/reorder/", {"campaign": self.campaign.pk, "order": ids}
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("order", response.json())
+        self.assertEqual(self._order(Storyline.objects.all()), before)
+
+    def test_outcomes_of_a_deleted_campaign(self):
+        ids = [outcome.pk for outcome in reversed(self.outcomes)]
+        data = {"storyline": self.storylines[0].pk, "order": ids}
+        self.assertEqual(self._reorder("/api/accounts/story-outcomes/reorder/", data).status_code, 200)
+        self.assertEqual(self._order(StoryOutcome.objects.all()), ids)
+
+        self.campaign.mark_deleted()
+        response = self._reorder("/api/accounts/story-outcomes/reorder/", {**data, "order": ids[::-1]})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self._order(StoryOutcome.objects.all()), ids)
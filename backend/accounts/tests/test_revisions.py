@@ -0,0 +1,72 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts import response_cache
+from accounts.authentication import issue_tokens
+from accounts.models import Campaign, ChatMessage, DMNote, Session
+
+
+def _campaign_updates(queries):
+    return [query for query in queries if query["sql"].startswith('UPDATE "accounts_campaign"')]
+
+
+class RevisionBumpTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", password="owner-password")
+        cls.player = User.objects.create_user("player", password="player-password")
+        cls.campaign = Campaign.objects.create(name="Out of the Abyss", owner=cls.owner)
+
+    def setUp(self):
+        cache.clear()
+
+    def _revision(self):
+        return Campaign.objects.values_list("revision", flat=True).get(pk=self.campaign.pk)
+
+    def test_bulk_delete_bumps_and_invalidates_once(self):
+        ChatMessage.objects.bulk_create(
+            ChatMessage(campaign=self.campaign, user=self.player, text=f"Message {n}") for n in range(20)
+        )
+        session = Session.objects.create(campaign=self.campaign, number=1, date=timezone.now())
+        for n in range(5):
+            DMNote.objects.create(session=session, text=f"Note {n}")
+        revision = self._revision()
+
+        with mock.patch.object(response_cache.cache, "delete_many", wraps=cache.delete_many) as delete_many:
+            with CaptureQueriesContext(connection) as queries:
+                with self.captureOnCommitCallbacks(execute=True):
+                    ChatMessage.objects.filter(campaign=self.campaign).delete()
+                    session.delete()
+
+        self.assertEqual(len(_campaign_updates(queries.captured_queries)), 1)
+        self.assertEqual(self._revision(), revision + 1)
+        delete_many.assert_called_once()
+        self.assertIn(
+            f"response-cache:v:{response_cache.campaign_scope(self.campaign.pk, 'chat')}",
+            delete_many.call_args.args[0],
+        )
+
+    def test_chat_post_bumps_after_commit(self):
+        revision = self._revision()
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.client.post(
+                    "/api/accounts/chat-messages/",
+                    {"campaign": self.campaign.pk, "text": "Demogorgon!"},
+                    content_type="application/json",
+                    headers={"Authorization": f"Bearer {issue_tokens(self.owner)['access']}"},
+                )
+        self.assertEqual(response.status_code, 201)
+        # The campaign row is not locked while the message is written.
+        self.assertEqual(_campaign_updates(queries.captured_queries), [])
+        self.assertEqual(self._revision(), revision)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self._revision(), revision + 1)
@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts import revocation
+from accounts.authentication import issue_tokens
+from accounts.models import RevokedToken
+
+
+@override_settings(REVOKED_TOKEN_SYNC_INTERVAL=0)
+class RevocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("player", password="player-password")
+
+    def setUp(self):
+        cache.clear()
+        revocation.reset()
+
+    def _refresh(self, refresh):
+        return self.client.post(
+            "/api/accounts/token/refresh/", {"refresh": refresh}, content_type="application/json"
+        )
+
+    def _post(self, url, data, access):
+        return self.client.post(
+            url, data, content_type="application/json", headers={"Authorization": f"Bearer {access}"}
+        )
+
+    def test_logout_revokes_only_that_refresh_token(self):
+        tokens, other = issue_tokens(self.user), issue_tokens(self.user)
+        response = self._post("/api/accounts/logout/", {"refresh_token": tokens["refresh"]}, tokens["access"])
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self._refresh(tokens["refresh"]).status_code, 401)
+        self.assertEqual(self._refresh(other["refresh"]).status_code, 200)
+
+    def test_rotated_refresh_token_cannot_be_reused(self):
+        refresh = issue_tokens(self.user)["refresh"]
+        response = self._refresh(refresh)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._refresh(refresh).status_code, 401)
+        self.assertEqual(self._refresh(response.json()["refresh"]).status_code, 200)
+
+    def test_password_change_revokes_other_sessions(self):
+        tokens, other = issue_tokens(self.user), issue_tokens(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                "/api/accounts/me/change-password/",
+                {"old_password": "player-password", "new_password": "Barovia-Castle-7"},
+                content_type="application/json",
+                headers={"Authorization": f"Bearer {tokens['access']}"},
+            )
+        self.assertEqual(response.status_code, 200)
+
+        for old in (tokens, other):
+            self.assertEqual(self._refresh(old["refresh"]).status_code, 401)
+            headers = {"Authorization": f"Bearer {old['access']}"}
+            self.assertEqual(self.client.get("/api/accounts/me/", headers=headers).status_code, 401)
+        new = response.json()["tokens"]
+        self.assertEqual(self._refresh(new["refresh"]).status_code, 200)
+
+    def test_revocations_by_other_workers_are_picked_up(self):
+        refresh = RefreshToken(issue_tokens(self.user)["refresh"])
+        self.assertFalse(revocation.is_revoked(refresh))
+
+        # Written by another process: only the table knows about it.
+        RevokedToken.objects.create(jti=refresh["jti"], expires_at=timezone.now() + timedelta(days=1))
+        self.assertTrue(revocation.is_revoked(refresh))
+
+    def test_prune_keeps_live_entries(self):
+        RevokedToken.objects.create(jti="expired", expires_at=timezone.now() - timedelta(seconds=1))
+        RevokedToken.objects.create(jti="live", expires_at=timezone.now() + timedelta(days=1))
+        self.assertEqual(revocation.prune(), 1)
+        self.assertEqual(list(RevokedToken.objects.values_list("jti", flat=True)), ["live"])
+
+
+class BloomFilterTests(TestCase):
+    def test_no_false_negatives(self):
+        bloom = revocation.BloomFilter(1000)
+        keys = [f"jti-{n}" for n in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+        false_positives = sum(f"other-{n}" in bloom for n in range(10_000))
+        self.assertLess(false_positives, 50)
@@ -0,0 +1,66 @@
+import importlib
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts import search
+from accounts.models import (
+    Campaign,
+    CampaignNote,
+    ChatMessage,
+    ClaimsUser,
+    DMNote,
+    SearchDocument,
+    Session,
+    StoryOutcome,
+    Storyline,
+)
+
+searchdocument_migration = importlib.import_module("accounts.migrations.0008_searchdocument")
+
+
+def _documents():
+    return sorted(
+        SearchDocument.objects.values_list(
+            "kind", "object_id", "campaign_id", "owner_only", "title", "body", "created_at"
+        )
+    )
+
+
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", password="owner-password")
+        cls.player = User.objects.create_user("player", password="player-password")
+        cls.campaign = Campaign.objects.create(name="Tyranny of Dragons", owner=cls.owner)
+        session = Session.objects.create(
+            campaign=cls.campaign, number=1, date=timezone.now(), description="Greenest in flames"
+        )
+        DMNote.objects.create(session=session, text="Cultists hold the keep")
+        CampaignNote.objects.create(campaign=cls.campaign, text="Buy healing potions")
+        storyline = Storyline.objects.create(campaign=cls.campaign, title="Hoard", summary="Follow the cult")
+        StoryOutcome.objects.create(
+            storyline=storyline, title="Ambush", condition="Night", description="Kobolds"
+        )
+        ChatMessage.objects.create(campaign=cls.campaign, user=cls.player, text="Where is Leosin?")
+
+    def test_migration_backfill_matches_rebuild(self):
+        search.rebuild()
+        expected = _documents()
+        self.assertEqual(len(expected), 6)
+
+        SearchDocument.objects.all().delete()
+        searchdocument_migration.backfill(apps, None, batch_size=2)
+        self.assertEqual(_documents(), expected)
+
+    def test_rename_retitles_chat_messages(self):
+        user = ClaimsUser.objects.get(pk=self.player.pk)
+        user.username = "dragonslayer"
+        user.save()
+
+        count, results = search.search(self.campaign.pk, "dragonslayer", False, 10, 0)
+        self.assertEqual(count, 1)
+        self.assertEqual(results[0]["title"], "dragonslayer")
+        self.assertEqual(search.search(self.campaign.pk, "player", False, 10, 0)[0], 0)
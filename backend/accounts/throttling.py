@@ -0,0 +1,152 @@
+"""
+Sliding-window throttles for the unauthenticated auth endpoints.
+
+DRF checks throttles before the view runs, so a rejected login costs a
+counter lookup instead of a password hash. Each key keeps the request
+counts of the current and the previous fixed window; the previous one is
+weighted by how much of it still overlaps the sliding window.
+
+Counters live in process memory by default. With ``THROTTLE_BACKEND =
+"database"`` they are shared by all workers through ``ThrottleCounter``.
+"""
+import threading
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.throttling import SimpleRateThrottle
+
+from .models import ThrottleCounter
+
+
+def _wait(previous: int, current: int, limit: int, duration: int, elapsed: float) -> float | None:
+    """
+    ``None`` if one more request fits, otherwise the seconds until it will,
+    assuming no further requests arrive meanwhile.
+    """
+    if previous * (1 - elapsed / duration) + current < limit:
+        return None
+    if current < limit:
+        # The previous window's weight decays until the estimate drops.
+        return duration * (1 - (limit - current) / previous) - elapsed
+    # Only once this window has become the previous one.
+    return duration - elapsed + duration * (1 - limit / current)
+
+
+class MemoryBackend:
+    SWEEP_EVERY = 1024
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._hits = 0
+
+    def attempt(self, key: str, limit: int, duration: int, now: float) -> float | None:
+        window, elapsed = divmod(now, duration)
+        window = int(window)
+        with self._lock:
+            stored_window, _, current, previous = self._counters.get(key, (window, duration, 0, 0))
+            if stored_window != window:
+                previous = current if stored_window == window - 1 else 0
+                current = 0
+            wait = _wait(previous, current, limit, duration, elapsed)
+            if wait is None:
+                self._counters[key] = (window, duration, current + 1, previous)
+                self._hits += 1
+                if self._hits % self.SWEEP_EVERY == 0:
+                    self._sweep(now)
+            return wait
+
+    def _sweep(self, now: float) -> None:
+        self._counters = {
+            key: value
+            for key, value in self._counters.items()
+            if now // value[1] <= value[0] + 1
+        }
+
+    def prune(self) -> int:
+        return 0
+
+
+class DatabaseBackend:
+    def attempt(self, key: str, limit: int, duration: int, now: float) -> float | None:
+        window, elapsed = divmod(now, duration)
+        window = int(window)
+        counts = dict(
+            ThrottleCounter.objects.filter(key=key, window__in=(window - 1, window)).values_list(
+                "window", "count"
+            )
+        )
+        wait = _wait(counts.get(window - 1, 0), counts.get(window, 0), limit, duration, elapsed)
+        if wait is not None:
+            return wait
+        counter = ThrottleCounter.objects.filter(key=key, window=window)
+        if not counter.update(count=F("count") + 1):
+            expires_at = datetime.fromtimestamp((window + 2) * duration, tz=dt_timezone.utc)
+            try:
+                with transaction.atomic():
+                    ThrottleCounter.objects.create(key=key, window=window, count=1, expires_at=expires_at)
+            except IntegrityError:
+                counter.update(count=F("count") + 1)
+        return None
+
+    def prune(self) -> int:
+        deleted, _ = ThrottleCounter.objects.filter(expires_at__lte=timezone.now()).delete()
+        return deleted
+
+
+_BACKENDS = {"memory": MemoryBackend, "database": DatabaseBackend}
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _BACKENDS[getattr(settings, "THROTTLE_BACKEND", "memory")]()
+    return _backend
+
+
+def prune() -> int:
+    """Delete shared counters whose windows are over."""
+    return get_backend().prune()
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        ident = self.get_ident_key(request)
+        if ident is None:
+            return True
+        key = self.cache_format % {"scope": self.scope, "ident": ident}
+        self.remaining = get_backend().attempt(key, self.num_requests, self.duration, self.timer())
+        return self.remaining is None
+
+    def wait(self):
+        return self.remaining
+
+    def get_ident_key(self, request):
+        return self.get_ident(request)
+
+
+class LoginIPThrottle(SlidingWindowThrottle):
+    scope = "login_ip"
+
+
+class LoginUsernameThrottle(SlidingWindowThrottle):
+    scope = "login_username"
+
+    def get_ident_key(self, request):
+        username = request.data.get("username")
+        if not isinstance(username, str) or not username.strip():
+            return None
+        return username.strip().lower()[:150]
+
+
+class RegisterIPThrottle(SlidingWindowThrottle):
+    scope = "register"
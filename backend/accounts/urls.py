@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
@@ -7,6 +8,8 @@ from .views import (
     UserDetailView,
     ChangePasswordView,
     UserListView,
+    DatabasePoolView,
+    TimingStatsView,
     CampaignViewSet,
     CampaignJoinRequestViewSet,
     SessionViewSet,
@@ -17,7 +20,9 @@ from .views import (
     StorylineViewSet,
     StoryOutcomeViewSet,
     ChatMessageViewSet,
+    JobViewSet,
 )
+from .async_views import campaign_desk, chat_message_list, login, public_campaign_list, register
 from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
@@ -33,6 +38,7 @@ router.register(r'campaign-notes', CampaignNoteViewSet, basename='campaign-note'
 router.register(r'storylines', StorylineViewSet, basename='storyline')
 router.register(r'story-outcomes', StoryOutcomeViewSet, basename='story-outcome')
 router.register(r'chat-messages', ChatMessageViewSet, basename='chat-message')
+router.register(r'jobs', JobViewSet, basename='job')
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
@@ -42,5 +48,22 @@ urlpatterns = [
     path('me/', UserDetailView.as_view(), name='user_detail'),
     path('me/change-password/', ChangePasswordView.as_view(), name='change_password'),
     path('users/', UserListView.as_view(), name='user_list'),
+    path('metrics/db-pool/', DatabasePoolView.as_view(), name='db_pool_metrics'),
+    path('metrics/timings/', TimingStatsView.as_view(), name='timing_metrics'),
+]
+
+if settings.ASYNC_VIEWS:
+    # Same URLs and responses as the views they shadow; see accounts.async_views.
+    urlpatterns = [
+        path('register/', register, name='register-async'),
+        path('login/', login, name='login-async'),
+    ] + urlpatterns
+    urlpatterns += [
+        path('campaigns/public/', public_campaign_list, name='campaign-public-async'),
+        path('campaigns/<int:pk>/desk/', campaign_desk, name='campaign-desk-async'),
+        path('chat-messages/', chat_message_list, name='chat-message-list-async'),
+    ]
+
+urlpatterns += [
     path('', include(router.urls)),
 ]
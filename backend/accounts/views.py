@@ -1,13 +1,20 @@
-from rest_framework import status, generics, permissions, viewsets
-from rest_framework.parsers import FormParser, MultiPartParser, JSONParser
+import uuid
+
+from rest_framework import generics, permissions, serializers, status, viewsets
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.decorators import api_view, permission_classes, action
-from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.contrib.auth import authenticate
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db.models import Q
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Max, Prefetch, Q, Sum, Value, When
+from django.http import StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from .serializers import (
     RegisterSerializer,
     UserSerializer,
@@ -19,8 +26,13 @@ from .serializers import (
     CampaignNoteSerializer,
     StorylineSerializer,
     StoryOutcomeSerializer,
+    StorylineTreeSerializer,
+    ReorderSerializer,
     ChatMessageSerializer,
     CampaignJoinRequestSerializer,
+    EncounterSimulationSerializer,
+    CampaignCloneSerializer,
+    JobSerializer,
 )
 from .models import (
     Campaign,
@@ -33,24 +45,131 @@ from .models import (
     StoryOutcome,
     ChatMessage,
     CampaignJoinRequest,
+    Job,
+)
+from . import passwords, response_cache, revocation, server_timing
+from .authentication import issue_tokens, revoke_tokens
+from .campaign_archive import ArchiveError, check_archive, export_archive
+from .cloning import clone_campaign
+from .conditional import ConditionalGetMixin, conditional_response, make_etag
+from .dbpool import pool_stats
+from .desk import build_desk
+from .encounters import simulate_encounter
+from .fast_serializers import (
+    CampaignFastSerializer,
+    CharacterSheetFastSerializer,
+    ChatMessageFastSerializer,
+    FastListMixin,
 )
+from .jobs import enqueue
+from .reference_snapshot import get_snapshot
+from .renderers import MessagePackParser, ORJSONParser
+from .response_cache import CAMPAIGN_KINDS, PUBLIC, REFERENCE, CachedResponseMixin, cached, scope_versions
+from .search import search as search_campaign
+from .throttling import LoginIPThrottle, LoginUsernameThrottle, RegisterIPThrottle
+
+
+def campaign_join_requests_prefetch() -> Prefetch:
+    return Prefetch(
+        "join_requests",
+        queryset=CampaignJoinRequest.objects.select_related("user", "character__character_class"),
+    )
 
 
 def owner_or_player_q(user, prefix: str = "campaign") -> Q:
     if not user or not user.is_authenticated:
         return Q(pk__in=[])
-    return Q(**{f"{prefix}__owner": user}) | Q(
-        **{
-            f"{prefix}__join_requests__user": user,
-            f"{prefix}__join_requests__status": CampaignJoinRequest.Status.ACCEPTED,
-        }
+    return Q(**{f"{prefix}__deleted_at__isnull": True}) & (
+        Q(**{f"{prefix}__owner": user})
+        | Q(
+            **{
+                f"{prefix}__join_requests__user": user,
+                f"{prefix}__join_requests__status": CampaignJoinRequest.Status.ACCEPTED,
+            }
+        )
+    )
+
+
+def member_campaigns(user):
+    """Campaigns ``user`` owns or plays in, with join requests prefetched."""
+    qs = (
+        Campaign.objects.select_related("owner")
+        .prefetch_related(campaign_join_requests_prefetch())
+        .order_by("id")
+    )
+    if not user.is_authenticated:
+        return qs.none()
+    return (
+        qs.filter(
+            Q(owner=user)
+            | Q(
+                join_requests__user=user,
+                join_requests__status=CampaignJoinRequest.Status.ACCEPTED,
+            )
+        )
+        .distinct()
+    )
+
+
+def public_campaigns(query: str | None = None):
+    qs = (
+        Campaign.objects.select_related("owner")
+        .prefetch_related(campaign_join_requests_prefetch())
+        .filter(is_public=True, is_archived=False)
+        .order_by("name", "id")
     )
+    if query:
+        qs = qs.filter(
+            Q(name__icontains=query)
+            | Q(description__icontains=query)
+            | Q(world_story__icontains=query)
+        )
+    return qs
+
+
+def chat_messages(user, params):
+    """
+    Chat visible to ``user``, optionally for one ``campaign`` and only
+    after the message id ``after``.
+    """
+    queryset = (
+        ChatMessage.objects.select_related("user", "campaign")
+        .filter(owner_or_player_q(user, "campaign"))
+        .distinct()
+    )
+    campaign_id = params.get("campaign")
+    if campaign_id:
+        queryset = queryset.filter(campaign_id=campaign_id)
+    after = params.get("after")
+    if after:
+        try:
+            queryset = queryset.filter(id__gt=int(after))
+        except ValueError:
+            raise ValidationError({"after": "Ожидается id сообщения"})
+    return queryset.order_by("created_at", "id")
 
 
 def owner_only_q(user, prefix: str = "campaign") -> Q:
     if not user or not user.is_authenticated:
         return Q(pk__in=[])
-    return Q(**{f"{prefix}__owner": user})
+    return Q(**{f"{prefix}__owner": user, f"{prefix}__deleted_at__isnull": True})
+
+
+def apply_order(queryset, ids: list[int]) -> None:
+    """
+    Set ``order`` to 1..n following ``ids`` with a single ``UPDATE ... CASE``.
+    ``ids`` must list every row of ``queryset``, otherwise nothing is changed.
+    """
+    with transaction.atomic():
+        if set(ids) != set(queryset.select_for_update().values_list("pk", flat=True)):
+            raise ValidationError({"order": "Список должен содержать все записи, и только их"})
+        queryset.filter(pk__in=ids).update(
+            order=Case(
+                *(When(pk=pk, then=Value(position)) for position, pk in enumerate(ids, start=1)),
+                output_field=IntegerField(),
+            ),
+            updated_at=timezone.now(),
+        )
 
 
 class RegisterView(generics.CreateAPIView):
@@ -59,22 +178,18 @@ class RegisterView(generics.CreateAPIView):
     """
     queryset = User.objects.all()
     permission_classes = (permissions.AllowAny,)
+    throttle_classes = (RegisterIPThrottle,)
     serializer_class = RegisterSerializer
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user = serializer.save()
-        
-        # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
-        
+        return self.registered(serializer.save())
+
+    def registered(self, user):
         return Response({
             'user': UserSerializer(user).data,
-            'tokens': {
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-            },
+            'tokens': issue_tokens(user),
             'message': 'User registered successfully'
         }, status=status.HTTP_201_CREATED)
 
@@ -84,40 +199,39 @@ class LoginView(generics.GenericAPIView):
     Login and get JWT tokens.
     """
     permission_classes = (permissions.AllowAny,)
+    throttle_classes = (LoginIPThrottle, LoginUsernameThrottle)
 
     def post(self, request):
         username = request.data.get('username')
         password = request.data.get('password')
 
         if not username or not password:
-            return Response(
-                {'error': 'Username and password are required'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+            return self.credentials_required()
+        return self.logged_in(passwords.authenticate(request, username, password))
+
+    def credentials_required(self):
+        return Response(
+            {'error': 'Username and password are required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
-        user = authenticate(username=username, password=password)
-        
+    def logged_in(self, user):
         if user is None:
             return Response(
                 {'error': 'Invalid credentials'},
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-        refresh = RefreshToken.for_user(user)
-        
         return Response({
             'user': UserSerializer(user).data,
-            'tokens': {
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-            },
+            'tokens': issue_tokens(user),
             'message': 'Login successful'
         }, status=status.HTTP_200_OK)
 
 
 class LogoutView(generics.GenericAPIView):
     """
-    Logout and optionally blacklist refresh token.
+    Logout and revoke the refresh token.
     """
     permission_classes = (permissions.IsAuthenticated,)
 
@@ -125,13 +239,7 @@ class LogoutView(generics.GenericAPIView):
         try:
             refresh_token = request.data.get('refresh_token')
             if refresh_token:
-                try:
-                    token = RefreshToken(refresh_token)
-                    # Try to blacklist if blacklist app is configured
-                    token.blacklist()
-                except AttributeError:
-                    # Blacklist not configured, just return success
-                    pass
+                revocation.revoke(RefreshToken(refresh_token))
             return Response(
                 {'message': 'Logout successful'},
                 status=status.HTTP_200_OK
@@ -171,17 +279,22 @@ class ChangePasswordView(generics.UpdateAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if not user.check_password(old_password):
+        if not passwords.check_password(user, old_password):
             return Response(
                 {'error': 'Invalid old password'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        user.set_password(new_password)
+        user.password = passwords.make_password(new_password)
         user.save()
+        # Sign out every other session; this client continues with new tokens.
+        revoke_tokens(user)
 
         return Response(
-            {'message': 'Password changed successfully'},
+            {
+                'message': 'Password changed successfully',
+                'tokens': issue_tokens(user),
+            },
             status=status.HTTP_200_OK
         )
 
@@ -195,29 +308,56 @@ class UserListView(generics.ListAPIView):
     permission_classes = (permissions.IsAuthenticated,)
 
 
-class CampaignViewSet(viewsets.ModelViewSet):
+class DatabasePoolView(generics.GenericAPIView):
+    """
+    Database connection pool gauges of the worker that answers (staff only).
+    """
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        return Response(pool_stats())
+
+
+class TimingStatsView(generics.GenericAPIView):
+    """
+    Per-endpoint timing percentiles of the worker that answers (staff only).
+    """
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        return Response(server_timing.stats())
+
+
+class CampaignViewSet(ConditionalGetMixin, CachedResponseMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Campaign.objects.select_related("owner").all()
     serializer_class = CampaignSerializer
+    fast_serializer_class = CampaignFastSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_queryset(self):
-        qs = (
-            Campaign.objects.select_related("owner")
-            .prefetch_related("join_requests__user", "join_requests__character__character_class")
-            .order_by("id")
-        )
-        if not self.request.user.is_authenticated:
-            return qs.none()
-        return (
-            qs.filter(
-                Q(owner=self.request.user)
-                | Q(
-                    join_requests__user=self.request.user,
-                    join_requests__status=CampaignJoinRequest.Status.ACCEPTED,
-                )
-            )
-            .distinct()
-        )
+        return member_campaigns(self.request.user)
+
+    def get_validator_aggregates(self):
+        # revision moves with everything else the serializer shows.
+        return {"updated_at": Max("updated_at"), "count": Count("pk"), "revision": Sum("revision")}
+
+    def get_validator_scopes(self, request):
+        if self.action == "public":
+            return [PUBLIC]
+        return self.cache_scopes(request)
+
+    def desk_scopes(self, request):
+        return self.cache_scopes(request, CAMPAIGN_KINDS) + [REFERENCE]
+
+    def desk_etag(self, request, revision) -> str:
+        """The desk's validator: the campaign revision and the cache scopes of what it shows."""
+        return make_etag(request, {"revision": revision, **scope_versions(self.desk_scopes(request))})
+
+    def cache_campaign_ids(self, request):
+        pk = self.kwargs.get("pk", "")
+        if pk.isdigit():
+            return [int(pk)]
+        return super().cache_campaign_ids(request)
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
@@ -239,23 +379,191 @@ class CampaignViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         campaign = self.get_object()
         self._assert_owner(campaign)
-        return super().destroy(request, *args, **kwargs)
+        with transaction.atomic():
+            campaign.mark_deleted()
+            response_cache.invalidate_campaign(campaign.pk)
+            response_cache.invalidate(PUBLIC)
+            enqueue("purge_campaign", {"campaign": campaign.pk}, owner=request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=["get"])
+    def desk(self, request, pk=None):
+        """
+        Whole role-filtered desk state in one response. With ``?since=<version>``
+        an unchanged campaign answers with just the version.
+        """
+        try:
+            revision = self.get_queryset().filter(pk=pk).values_list("revision", flat=True).first()
+        except (TypeError, ValueError):
+            revision = None
+        if revision is None:
+            if request.query_params.get("since") is not None:
+                raise NotFound()
+            raise NotFound("No Campaign matches the given query.")
+        return conditional_response(
+            request, self.desk_etag(request, revision), lambda: self._desk(request, revision)
+        )
+
+    @cached(lambda view, request: view.desk_scopes(request))
+    def _desk(self, request, revision):
+        if request.query_params.get("since") == str(revision):
+            return Response({"version": revision, "changed": False})
+        campaign = self.get_object()
+        return Response(build_desk(campaign, self.get_serializer_context()))
+
+    @action(detail=True, methods=["post"])
+    def simulate(self, request, pk=None):
+        """
+        Monte Carlo estimate of an encounter between the accepted party and
+        the given opponents.
+        """
+        campaign = self.get_object()
+        self._assert_owner(campaign)
+        serializer = EncounterSimulationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        characters = [
+            req.character
+            for req in campaign.join_requests.all()
+            if req.status == CampaignJoinRequest.Status.ACCEPTED
+        ]
+        if not characters:
+            raise ValidationError({"campaign": "В кампании нет принятых персонажей"})
+
+        data = serializer.validated_data
+        result = simulate_encounter(
+            characters,
+            data["opponents"],
+            iterations=data["iterations"],
+            max_rounds=data["max_rounds"],
+            seed=data.get("seed"),
+        )
+        return Response(result)
+
+    @action(detail=True, methods=["get"])
+    def search(self, request, pk=None):
+        """
+        Ranked full-text search over the campaign. Players only see sessions
+        and chat; the owner also gets notes and storylines.
+        """
+        try:
+            owner_id = (
+                self.get_queryset()
+                .filter(pk=pk)
+                .values_list("owner_id", flat=True)
+                .first()
+            )
+        except (TypeError, ValueError):
+            owner_id = None
+        if owner_id is None:
+            raise NotFound()
+
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            raise ValidationError({"q": "Укажите строку поиска"})
+        paginator = self.paginator
+        page_size = paginator.get_page_size(request)
+        try:
+            page_number = int(request.query_params.get(paginator.page_query_param, 1))
+        except ValueError:
+            page_number = 0
+        if page_number < 1:
+            raise NotFound("Неверная страница.")
+
+        count, results = search_campaign(
+            int(pk),
+            query,
+            include_owner_only=owner_id == request.user.id,
+            limit=page_size,
+            offset=(page_number - 1) * page_size,
+        )
+        date_field = serializers.DateTimeField()
+        for result in results:
+            if result["created_at"] is not None:
+                result["created_at"] = date_field.to_representation(
+                    parse_datetime(str(result["created_at"])) or result["created_at"]
+                )
+
+        url = request.build_absolute_uri()
+        next_url = previous_url = None
+        if page_number * page_size < count:
+            next_url = replace_query_param(url, paginator.page_query_param, page_number + 1)
+        if page_number > 1:
+            previous_url = (
+                remove_query_param(url, paginator.page_query_param)
+                if page_number == 2
+                else replace_query_param(url, paginator.page_query_param, page_number - 1)
+            )
+        return Response(
+            {"count": count, "next": next_url, "previous": previous_url, "results": results}
+        )
+
+    @action(detail=True, methods=["post"])
+    def clone(self, request, pk=None):
+        """Copy the campaign's sessions, storylines and notes into a new campaign."""
+        campaign = self.get_object()
+        self._assert_owner(campaign)
+        serializer = CampaignCloneSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        copy = clone_campaign(
+            campaign,
+            request.user,
+            name=serializer.validated_data.get("name"),
+            include_dm_notes=serializer.validated_data["include_dm_notes"],
+        )
+        copy = self.get_queryset().get(pk=copy.pk)
+        return Response(self.get_serializer(copy).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=["get"])
+    def export(self, request, pk=None):
+        """Stream the campaign as a zip of NDJSON files (see ``campaign_archive``)."""
+        campaign = self.get_object()
+        self._assert_owner(campaign)
+        response = StreamingHttpResponse(
+            export_archive(campaign),
+            content_type="application/zip",
+        )
+        response["Content-Disposition"] = f'attachment; filename="campaign-{campaign.pk}.zip"'
+        return response
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        parser_classes=(MultiPartParser, FormParser),
+    )
+    def import_campaign(self, request):
+        """
+        Queue an archive for import. The response is the background job;
+        its ``result.campaign`` is the new campaign id once it is done.
+        """
+        archive = request.FILES.get("archive")
+        if archive is None:
+            raise ValidationError({"archive": "Загрузите архив кампании"})
+        try:
+            check_archive(archive)
+        except ArchiveError as exc:
+            raise ValidationError({"archive": str(exc)})
+        path = default_storage.save(f"imports/{uuid.uuid4().hex}.zip", archive)
+        job = enqueue(
+            "import_campaign",
+            {"path": path, "owner": request.user.id},
+            owner=request.user,
+            max_attempts=1,
+        )
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
 
     @action(detail=False, methods=["get"], permission_classes=[permissions.AllowAny])
     def public(self, request):
-        qs = (
-            Campaign.objects.select_related("owner")
-            .prefetch_related("join_requests__user", "join_requests__character__character_class")
-            .filter(is_public=True, is_archived=False)
-            .order_by("name", "id")
+        return self._conditional(
+            request, public_campaigns(request.query_params.get("q")), lambda: self._public(request)
         )
-        query = request.query_params.get("q")
-        if query:
-            qs = qs.filter(
-                Q(name__icontains=query)
-                | Q(description__icontains=query)
-                | Q(world_story__icontains=query)
-            )
+
+    @cached(lambda view, request: [PUBLIC])
+    def _public(self, request):
+        qs = public_campaigns(request.query_params.get("q"))
+        if settings.FAST_SERIALIZERS:
+            return self.fast_list(qs)
         page = self.paginate_queryset(qs)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -264,7 +572,7 @@ class CampaignViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class CampaignJoinRequestViewSet(viewsets.ModelViewSet):
+class CampaignJoinRequestViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = CampaignJoinRequestSerializer
     permission_classes = (permissions.IsAuthenticated,)
     http_method_names = ["get", "post", "head", "options"]
@@ -278,7 +586,7 @@ class CampaignJoinRequestViewSet(viewsets.ModelViewSet):
                 "character",
                 "character__character_class",
             )
-            .all()
+            .filter(campaign__deleted_at__isnull=True)
             .order_by("-created_at")
         )
         if self.action in {"approve", "reject"}:
@@ -372,13 +680,17 @@ class CampaignJoinRequestViewSet(viewsets.ModelViewSet):
 
         accepted_count += 1
         if accepted_count >= campaign.max_players:
-            CampaignJoinRequest.objects.filter(
+            pending = CampaignJoinRequest.objects.filter(
                 campaign=campaign,
                 status=CampaignJoinRequest.Status.PENDING,
-            ).exclude(id=join_request.id).update(
+            ).exclude(id=join_request.id)
+            for user_id in pending.values_list("user_id", flat=True):
+                response_cache.invalidate(response_cache.user_scope(user_id))
+            pending.update(
                 status=CampaignJoinRequest.Status.REJECTED,
                 decided_at=timezone.now(),
             )
+            Campaign.bump_revision(pk=campaign.pk)
 
         serializer = self.get_serializer(join_request)
         return Response(serializer.data)
@@ -400,7 +712,8 @@ class CampaignJoinRequestViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class SessionViewSet(viewsets.ModelViewSet):
+class SessionViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
+    cache_kinds = ("sessions",)
     serializer_class = SessionSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
@@ -433,7 +746,8 @@ class SessionViewSet(viewsets.ModelViewSet):
         serializer.save()
 
 
-class DMNoteViewSet(viewsets.ModelViewSet):
+class DMNoteViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
+    cache_kinds = ("sessions",)
     serializer_class = DMNoteSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
@@ -473,16 +787,49 @@ class ClassViewSet(viewsets.ModelViewSet):
     serializer_class = ClassSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
+    def list(self, request, *args, **kwargs):
+        snapshot = get_snapshot()
+        if snapshot is None:
+            return super().list(request, *args, **kwargs)
+        fields = self.get_serializer_class().Meta.fields
+        rows = [
+            {field: row[field] for field in fields}
+            for row in snapshot.rows("class")
+        ]
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(rows)
+
+    def retrieve(self, request, *args, **kwargs):
+        snapshot = get_snapshot()
+        if snapshot is None:
+            return super().retrieve(request, *args, **kwargs)
+        row = snapshot.get("class", kwargs[self.lookup_field])
+        if row is None:
+            raise NotFound()
+        fields = self.get_serializer_class().Meta.fields
+        return Response({field: row[field] for field in fields})
+
 
-class CharacterSheetViewSet(viewsets.ModelViewSet):
+class CharacterSheetViewSet(ConditionalGetMixin, CachedResponseMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = CharacterSheet.objects.select_related("character_class").all().order_by("id")
     serializer_class = CharacterSheetSerializer
+    fast_serializer_class = CharacterSheetFastSerializer
     permission_classes = (permissions.IsAuthenticated,)
-    parser_classes = (JSONParser, FormParser, MultiPartParser)
+    parser_classes = (ORJSONParser, MessagePackParser, FormParser, MultiPartParser)
+
+    def cache_scopes(self, request, kinds=None):
+        return [response_cache.user_scope(request.user.pk), REFERENCE]
+
+    def get_validator_scopes(self, request):
+        # character_class_name and resolved_spell_details.
+        return [REFERENCE]
 
     def get_queryset(self):
         return (
             CharacterSheet.objects.select_related("character_class")
+            .prefetch_related("resolved_spells")
             .filter(owner=self.request.user)
             .order_by("id")
         )
@@ -491,7 +838,8 @@ class CharacterSheetViewSet(viewsets.ModelViewSet):
         serializer.save(owner=self.request.user)
 
 
-class CampaignNoteViewSet(viewsets.ModelViewSet):
+class CampaignNoteViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
+    cache_kinds = ("notes",)
     serializer_class = CampaignNoteSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
@@ -524,7 +872,8 @@ class CampaignNoteViewSet(viewsets.ModelViewSet):
         serializer.save()
 
 
-class StorylineViewSet(viewsets.ModelViewSet):
+class StorylineViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
+    cache_kinds = ("storylines",)
     serializer_class = StorylineSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
@@ -555,8 +904,48 @@ class StorylineViewSet(viewsets.ModelViewSet):
             raise ValidationError("Кампания в архиве.")
         serializer.save()
 
+    def _get_owned_campaign(self, campaign_id) -> Campaign:
+        if not campaign_id:
+            raise ValidationError({"campaign": "Укажите кампанию"})
+        try:
+            return Campaign.objects.get(pk=campaign_id, owner=self.request.user)
+        except (Campaign.DoesNotExist, TypeError, ValueError):
+            raise NotFound("Кампания не найдена.")
+
+    @action(detail=False, methods=["get"])
+    @cached()
+    def tree(self, request):
+        """Storylines of a campaign with their outcomes nested, in two queries."""
+        campaign_id = request.query_params.get("campaign", "")
+        if not campaign_id.isdigit():
+            raise ValidationError({"campaign": "Укажите кампанию"})
+        storylines = (
+            Storyline.objects.filter(owner_only_q(request.user, "campaign"))
+            .filter(campaign_id=campaign_id)
+            .prefetch_related(
+                Prefetch("outcomes", queryset=StoryOutcome.objects.order_by("order", "id"))
+            )
+            .order_by("order", "id")
+        )
+        return Response(StorylineTreeSerializer(storylines, many=True).data)
+
+    @action(detail=False, methods=["post"])
+    def reorder(self, request):
+        """Apply a whole new storyline order: ``{"campaign": id, "order": [ids]}``."""
+        campaign = self._get_owned_campaign(request.data.get("campaign"))
+        if campaign.is_archived:
+            raise ValidationError("Кампания в архиве.")
+        serializer = ReorderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data["order"]
+        apply_order(Storyline.objects.filter(campaign=campaign), ids)
+        Campaign.bump_revision(pk=campaign.pk)
+        response_cache.invalidate_campaign(campaign.pk, "storylines")
+        return Response({"updated": len(ids)})
+
 
-class StoryOutcomeViewSet(viewsets.ModelViewSet):
+class StoryOutcomeViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
+    cache_kinds = ("storylines",)
     serializer_class = StoryOutcomeSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
@@ -589,21 +978,44 @@ class StoryOutcomeViewSet(viewsets.ModelViewSet):
             raise ValidationError("Кампания в архиве.")
         serializer.save()
 
+    @action(detail=False, methods=["post"])
+    def reorder(self, request):
+        """Apply a whole new outcome order: ``{"storyline": id, "order": [ids]}``."""
+        storyline_id = request.data.get("storyline")
+        if not storyline_id:
+            raise ValidationError({"storyline": "Укажите линию сюжета"})
+        try:
+            storyline = Storyline.objects.select_related("campaign").get(
+                pk=storyline_id,
+                campaign__owner=request.user,
+                campaign__deleted_at__isnull=True,
+            )
+        except (Storyline.DoesNotExist, TypeError, ValueError):
+            raise NotFound("Линия сюжета не найдена.")
+        if storyline.campaign.is_archived:
+            raise ValidationError("Кампания в архиве.")
+        serializer = ReorderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data["order"]
+        apply_order(StoryOutcome.objects.filter(storyline=storyline), ids)
+        Campaign.bump_revision(pk=storyline.campaign_id)
+        response_cache.invalidate_campaign(storyline.campaign_id, "storylines")
+        return Response({"updated": len(ids)})
 
-class ChatMessageViewSet(viewsets.ModelViewSet):
+
+class ChatMessageViewSet(ConditionalGetMixin, CachedResponseMixin, FastListMixin, viewsets.ModelViewSet):
+    cache_kinds = ("chat",)
     serializer_class = ChatMessageSerializer
+    fast_serializer_class = ChatMessageFastSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_queryset(self):
-        queryset = (
-            ChatMessage.objects.select_related("user", "campaign")
-            .filter(owner_or_player_q(self.request.user, "campaign"))
-            .distinct()
-        )
-        campaign_id = self.request.query_params.get("campaign")
-        if campaign_id:
-            queryset = queryset.filter(campaign_id=campaign_id)
-        return queryset.order_by("created_at", "id")
+        return chat_messages(self.request.user, self.request.query_params)
+
+    def get_validator_scopes(self, request):
+        # user_name: a renamed author invalidates the chat of the campaigns
+        # they wrote in.
+        return self.cache_scopes(request)
 
     def perform_create(self, serializer):
         campaign = serializer.validated_data["campaign"]
@@ -618,3 +1030,13 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
         if campaign.is_archived:
             raise ValidationError("Кампания в архиве.")
         serializer.save(user=self.request.user)
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Background jobs started by the current user."""
+
+    serializer_class = JobSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_queryset(self):
+        return Job.objects.filter(owner=self.request.user).order_by("-created_at", "-id")
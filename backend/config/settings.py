@@ -50,12 +50,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'accounts.server_timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'accounts.compression.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.db_router.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -82,19 +85,42 @@ WSGI_APPLICATION = 'config.wsgi.application'
 USE_SQLITE = env_bool("USE_SQLITE", False)
 DATABASE_URL = os.getenv("DATABASE_URL")
 DB_HOST = os.getenv("DB_HOST")
+# PostgreSQL connections come from a per-process psycopg pool (accounts.dbpool
+# reports its gauges). With DB_POOL=false they are kept for DB_CONN_MAX_AGE
+# seconds instead. Both check a connection before handing it out: the pool
+# with its ``check`` callback, persistent connections with CONN_HEALTH_CHECKS.
+DB_POOL = env_bool("DB_POOL", True)
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", "600"))
+
+# SQLite profile, used when no PostgreSQL is configured: WAL so readers never
+# block the writer, write transactions that take the lock up front (no
+# "database is locked" when a read transaction tries to upgrade) and a busy
+# timeout so concurrent writers queue instead of failing.
+SQLITE_OPTIONS = {
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': float(os.getenv("SQLITE_BUSY_TIMEOUT", "20")),
+    'init_command': (
+        "PRAGMA journal_mode=WAL;"
+        "PRAGMA synchronous=NORMAL;"
+        f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))};"
+        f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_KB', '65536'))};"
+        "PRAGMA temp_store=MEMORY;"
+    ),
+}
 
 if USE_SQLITE or (not DATABASE_URL and not DB_HOST):
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': BASE_DIR / 'db.sqlite3',
+            'NAME': os.getenv("SQLITE_PATH") or BASE_DIR / 'db.sqlite3',
+            'OPTIONS': SQLITE_OPTIONS,
         }
     }
 elif DATABASE_URL:
     import dj_database_url
 
     DATABASES = {
-        'default': dj_database_url.parse(DATABASE_URL, conn_max_age=600),
+        'default': dj_database_url.parse(DATABASE_URL, conn_max_age=DB_CONN_MAX_AGE),
     }
 else:
     DATABASES = {
@@ -105,9 +131,51 @@ else:
             'PASSWORD': os.getenv("DB_PASSWORD", ""),
             'HOST': DB_HOST or "localhost",
             'PORT': os.getenv("DB_PORT", "5432"),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
         }
     }
 
+# Read replicas: comma-separated database URLs (postgres://... or
+# sqlite:////path/to/copy.sqlite3). Reads of safe requests go to them through
+# accounts.db_router; a user who just wrote reads from the primary for
+# REPLICA_STICKY_SECONDS. The pin lives in the cache, so with several workers
+# it needs a cache they share.
+DATABASE_REPLICA_URLS = env_list("DATABASE_REPLICA_URLS", [])
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+if DATABASE_REPLICA_URLS:
+    import dj_database_url
+
+    for number, url in enumerate(DATABASE_REPLICA_URLS):
+        DATABASES[f'replica_{number}'] = {
+            **dj_database_url.parse(url, conn_max_age=DB_CONN_MAX_AGE),
+            'TEST': {'MIRROR': 'default'},
+        }
+    DATABASE_ROUTERS = ['accounts.db_router.PrimaryReplicaRouter']
+
+for database in DATABASES.values():
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        database['OPTIONS'] = {**SQLITE_OPTIONS, **database.get('OPTIONS', {})}
+    if database['ENGINE'] != 'django.db.backends.postgresql':
+        continue
+    if DB_POOL:
+        from psycopg_pool import ConnectionPool
+
+        # Pooled connections go back to the pool after each request. Django's
+        # CONN_HEALTH_CHECKS never fires then (every request connects anew),
+        # so the pool pings a connection before lending it and replaces one
+        # the server has dropped.
+        database['CONN_MAX_AGE'] = 0
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'check': ConnectionPool.check_connection,
+            'min_size': int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+            'max_size': int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            'timeout': float(os.getenv("DB_POOL_TIMEOUT", "10")),
+            'max_idle': float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+            'max_lifetime': float(os.getenv("DB_POOL_MAX_LIFETIME", "3600")),
+        }
+    else:
+        database['CONN_HEALTH_CHECKS'] = True
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -123,6 +191,31 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing (accounts.passwords). PASSWORD_HASHER picks the algorithm
+# for new hashes: pbkdf2, scrypt or argon2 (needs argon2-cffi). Hashes made
+# with the others still verify and are upgraded on the next login.
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "pbkdf2")
+_PASSWORD_HASHERS = {
+    "pbkdf2": 'accounts.passwords.PBKDF2PasswordHasher',
+    "scrypt": 'accounts.passwords.ScryptPasswordHasher',
+    "argon2": 'accounts.passwords.Argon2PasswordHasher',
+}
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS[PASSWORD_HASHER],
+    *(path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER),
+]
+PASSWORD_HASHING_THREADS = int(os.getenv("PASSWORD_HASHING_THREADS", "0")) or None
+if os.getenv("PASSWORD_PBKDF2_ITERATIONS"):
+    PASSWORD_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS"))
+if os.getenv("PASSWORD_SCRYPT_WORK_FACTOR"):
+    PASSWORD_SCRYPT_WORK_FACTOR = int(os.getenv("PASSWORD_SCRYPT_WORK_FACTOR"))
+if os.getenv("PASSWORD_ARGON2_TIME_COST"):
+    PASSWORD_ARGON2_TIME_COST = int(os.getenv("PASSWORD_ARGON2_TIME_COST"))
+if os.getenv("PASSWORD_ARGON2_MEMORY_COST"):
+    PASSWORD_ARGON2_MEMORY_COST = int(os.getenv("PASSWORD_ARGON2_MEMORY_COST"))
+# Django's model backend, verifying passwords in the hashing threads.
+AUTHENTICATION_BACKENDS = ['accounts.passwords.ModelBackend']
+
 LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'
@@ -137,19 +230,137 @@ STATICFILES_DIRS = [BASE_DIR / "static"] if (BASE_DIR / "static").exists() else
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Reference tables compiled into a file shared by all workers via mmap.
+# Off unless set: the file must be built from this deployment's database, or
+# ids it accepts may not exist. The compose files point it at /app/var.
+REFERENCE_SNAPSHOT_PATH = os.getenv("REFERENCE_SNAPSHOT_PATH", "")
+
+# "wsgi" (gunicorn sync/threaded workers) or "asgi" (uvicorn workers); read by
+# entrypoint.sh. ASGI mode serves the async read views in accounts.async_views.
+SERVER_MODE = os.getenv("SERVER_MODE", "wsgi")
+ASYNC_VIEWS = env_bool("ASYNC_VIEWS", SERVER_MODE == "asgi")
+CHAT_LONG_POLL_TIMEOUT = float(os.getenv("CHAT_LONG_POLL_TIMEOUT", "25"))
+CHAT_LONG_POLL_INTERVAL = float(os.getenv("CHAT_LONG_POLL_INTERVAL", "1"))
+
+# Background jobs (accounts.jobs, run by `manage.py run_worker`).
+# A running job refreshes its lock every JOB_HEARTBEAT_INTERVAL seconds; one
+# not refreshed for JOB_LOCK_TIMEOUT is taken to have lost its worker.
+JOB_LOCK_TIMEOUT = int(os.getenv("JOB_LOCK_TIMEOUT", "600"))
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "60"))
+JOB_RETRY_BASE_DELAY = int(os.getenv("JOB_RETRY_BASE_DELAY", "10"))
+JOB_RETRY_MAX_DELAY = int(os.getenv("JOB_RETRY_MAX_DELAY", "3600"))
+
+# Revoked refresh tokens (accounts.revocation).
+REVOKED_TOKEN_SYNC_INTERVAL = float(os.getenv("REVOKED_TOKEN_SYNC_INTERVAL", "2"))
+REVOKED_TOKEN_REBUILD_INTERVAL = int(os.getenv("REVOKED_TOKEN_REBUILD_INTERVAL", "3600"))
+REVOKED_TOKEN_BLOOM_CAPACITY = int(os.getenv("REVOKED_TOKEN_BLOOM_CAPACITY", "100000"))
+# Each sync re-reads revocations created this many seconds before the previous
+# one, so rows committed late or stamped by a worker with a slow clock are
+# not missed.
+REVOKED_TOKEN_SYNC_MARGIN = int(os.getenv("REVOKED_TOKEN_SYNC_MARGIN", "60"))
+
+# Cache: "locmem" (per worker process), "file" (CACHE_LOCATION, shared by the
+# workers of one host) or "redis" (CACHE_URL, anything speaking the Redis
+# protocol, shared by every host). Token versions and replica pins live here
+# too, so they only reach every worker with a shared backend.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "locmem")
+CACHE_BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "redis": "django.core.cache.backends.redis.RedisCache",
+}
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': {
+            "locmem": "dnd-desk",
+            "file": os.getenv("CACHE_LOCATION", str(BASE_DIR / "var" / "cache")),
+            "redis": os.getenv("CACHE_URL", "redis://localhost:6379/0"),
+        }[CACHE_BACKEND],
+        'KEY_PREFIX': os.getenv("CACHE_KEY_PREFIX", "dnd"),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv("CACHE_MAX_ENTRIES", "10000"))}
+        if CACHE_BACKEND != "redis" else {},
+    }
+}
+# How long a token version read from the database is reused. A revocation
+# reaches every worker at once through a shared cache; with locmem the other
+# workers notice it after at most this many seconds.
+TOKEN_VERSION_CACHE_TIMEOUT = int(
+    os.getenv("TOKEN_VERSION_CACHE_TIMEOUT", "30" if CACHE_BACKEND == "locmem" else "3600")
+)
+# Cached API responses (accounts.response_cache). Writes invalidate them
+# through signals, which only reaches other processes with a shared cache, so
+# it is off by default with locmem.
+RESPONSE_CACHE = env_bool("RESPONSE_CACHE", CACHE_BACKEND != "locmem")
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", "300"))
+
+# Response compression (accounts.compression): brotli or gzip by the client's
+# Accept-Encoding for bodies of COMPRESSION_TYPES from COMPRESSION_MIN_SIZE
+# bytes. Responses carrying one of COMPRESSION_SECRET_FIELDS go out as they
+# are (BREACH). Turn it off when a proxy in front compresses already.
+COMPRESSION = env_bool("COMPRESSION", True)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_TYPES = env_list(
+    "COMPRESSION_TYPES",
+    ["application/json", "application/msgpack", "application/javascript", "text/*"],
+)
+COMPRESSION_SECRET_FIELDS = env_list("COMPRESSION_SECRET_FIELDS", ["join_code", "access", "refresh"])
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+
+# Read-only lists of campaigns, chat messages and character sheets (and those
+# sections of the desk) are serialized from values() rows by
+# accounts.fast_serializers; false goes back to the DRF serializers.
+FAST_SERIALIZERS = env_bool("FAST_SERIALIZERS", True)
+
+# Per-request timings (accounts.server_timing). The Server-Timing header goes
+# to staff users, or to everyone with SERVER_TIMING; each worker keeps the
+# last SERVER_TIMING_SAMPLES requests per endpoint for the percentiles at
+# /api/accounts/metrics/timings/ and logs requests slower than
+# SERVER_TIMING_SLOW_MS as warnings.
+SERVER_TIMING = env_bool("SERVER_TIMING", DEBUG)
+SERVER_TIMING_SAMPLES = int(os.getenv("SERVER_TIMING_SAMPLES", "500"))
+SERVER_TIMING_SLOW_MS = float(os.getenv("SERVER_TIMING_SLOW_MS", "500"))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson with DRF's output format, and MessagePack for clients that ask
+    # for application/msgpack (accounts.renderers).
+    'DEFAULT_RENDERER_CLASSES': (
+        'accounts.renderers.ORJSONRenderer',
+        'accounts.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'accounts.renderers.ORJSONParser',
+        'accounts.renderers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # Login/registration limits (accounts.throttling), checked before hashing.
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.getenv("THROTTLE_LOGIN_IP", "30/min"),
+        'login_username': os.getenv("THROTTLE_LOGIN_USERNAME", "10/min"),
+        'register': os.getenv("THROTTLE_REGISTER", "10/hour"),
+    },
+    # Proxies in front of Django that append to X-Forwarded-For (e.g. the
+    # frontend's /api proxy); the client address is taken from the entry they
+    # added. Only set it when the backend is reachable through them alone:
+    # a client talking to Django directly can write that entry itself.
+    'NUM_PROXIES': int(os.getenv("NUM_PROXIES", "0")),
 }
+# "memory" (per worker) or "database" (shared by all workers).
+THROTTLE_BACKEND = os.getenv("THROTTLE_BACKEND", "memory")
 
 # CORS settings
 CORS_ALLOWED_ORIGINS = env_list(
@@ -172,6 +383,8 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
+    'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.authentication.ClaimsTokenRefreshSerializer',
 }
 
 # S3/MinIO storage (optional)
@@ -3,6 +3,9 @@ set -e
 
 python manage.py migrate --noinput
 python manage.py collectstatic --noinput
+if [ -n "${REFERENCE_SNAPSHOT_PATH}" ]; then
+  python manage.py build_reference_snapshot
+fi
 
 if [ "${CREATE_SUPERUSER}" = "true" ]; then
   python manage.py ensure_superuser
@@ -12,7 +15,16 @@ if [ "${SEED_DEMO_DATA}" = "true" ]; then
   python manage.py seed_demo
 fi
 
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+  exec gunicorn config.asgi:application \
+    --worker-class uvicorn_worker.UvicornWorker \
+    --bind "0.0.0.0:${PORT:-8000}" \
+    --workers "${GUNICORN_WORKERS:-3}" \
+    --timeout "${GUNICORN_TIMEOUT:-120}"
+fi
+
 exec gunicorn config.wsgi:application \
   --bind "0.0.0.0:${PORT:-8000}" \
   --workers "${GUNICORN_WORKERS:-3}" \
+  --threads "${GUNICORN_THREADS:-4}" \
   --timeout "${GUNICORN_TIMEOUT:-120}"
@@ -1,15 +1,22 @@
-import { serve } from "bun";
+import { serve, type Server } from "bun";
 import index from "./index.html";
 
 const port = Number(process.env.PORT || 3000);
 const hostname = process.env.HOST || "0.0.0.0";
 const backendUrl = process.env.BACKEND_URL || "http://localhost:8000";
 
-const proxyRequest = async (req: Request) => {
+const proxyRequest = async (req: Request, server: Server<unknown>) => {
   const url = new URL(req.url);
   const targetUrl = new URL(url.pathname + url.search, backendUrl);
   const headers = new Headers(req.headers);
   headers.delete("host");
+  // The backend throttles logins per client address (NUM_PROXIES counts this
+  // hop and any proxy in front of this server).
+  const clientIp = server.requestIP(req)?.address;
+  if (clientIp) {
+    const forwardedFor = headers.get("x-forwarded-for");
+    headers.set("x-forwarded-for", forwardedFor ? `${forwardedFor}, ${clientIp}` : clientIp);
+  }
 
   const method = req.method.toUpperCase();
   const body = method === "GET" || method === "HEAD" ? undefined : await req.arrayBuffer();
@@ -18,6 +25,9 @@ const proxyRequest = async (req: Request) => {
     headers,
     body,
     redirect: "manual",
+    // Pass brotli/gzip bodies through as the backend encoded them (the
+    // browser's Accept-Encoding is forwarded with the other headers).
+    decompress: false,
   });
 
   return new Response(response.body, {
@@ -30,7 +40,10 @@ const server = serve({
   port,
   hostname,
   routes: {
-    "/api/*": async req => proxyRequest(req),
+    "/api/*": async (req, server) => proxyRequest(req, server),
+    // Django admin; the backend port is not published in production.
+    "/admin": async (req, server) => proxyRequest(req, server),
+    "/admin/*": async (req, server) => proxyRequest(req, server),
     // Serve index.html for all unmatched routes.
     "/*": index,
 
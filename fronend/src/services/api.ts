@@ -317,6 +317,41 @@ export interface ChatMessage {
   created_at: string
 }
 
+export interface CampaignDesk {
+  version: number
+  changed: boolean
+  role?: 'owner' | 'player'
+  campaign?: Campaign
+  sessions?: SessionItem[]
+  chat_messages?: ChatMessage[]
+  characters?: CharacterSheet[]
+  dm_notes?: DMNote[]
+  campaign_notes?: CampaignNote[]
+  storylines?: Storyline[]
+  story_outcomes?: StoryOutcome[]
+}
+
+export interface Job {
+  id: number
+  name: string
+  status: 'queued' | 'running' | 'done' | 'failed'
+  attempts: number
+  max_attempts: number
+  run_at: string
+  result: Record<string, unknown> | null
+  created_at: string
+  finished_at: string | null
+}
+
+export interface CampaignSearchResult {
+  kind: 'session' | 'dm_note' | 'campaign_note' | 'storyline' | 'story_outcome' | 'chat_message'
+  id: number
+  title: string
+  created_at: string | null
+  rank: number
+  snippet: string
+}
+
 export interface Paginated<T> {
   count: number
   next: string | null
@@ -467,6 +502,50 @@ class ApiService {
     return this.request<Campaign>(`/accounts/campaigns/${id}/`)
   }
 
+  async getCampaignDesk(id: number, since?: number): Promise<CampaignDesk> {
+    const query = since !== undefined ? `?since=${since}` : ''
+    return this.request<CampaignDesk>(`/accounts/campaigns/${id}/desk/${query}`)
+  }
+
+  async cloneCampaign(
+    id: number,
+    data: { name?: string; include_dm_notes?: boolean } = {},
+  ): Promise<Campaign> {
+    return this.request<Campaign>(`/accounts/campaigns/${id}/clone/`, {
+      method: 'POST',
+      body: JSON.stringify(data),
+    })
+  }
+
+  async exportCampaign(id: number): Promise<Blob> {
+    const token = this.getAuthToken()
+    const response = await fetch(`${API_BASE_URL}/accounts/campaigns/${id}/export/`, {
+      headers: token ? { Authorization: `Bearer ${token}` } : {},
+    })
+    if (!response.ok) {
+      throw new Error('Не удалось выгрузить кампанию')
+    }
+    return response.blob()
+  }
+
+  async importCampaign(archive: File): Promise<Job> {
+    const body = new FormData()
+    body.append('archive', archive)
+    return this.request<Job>('/accounts/campaigns/import/', {
+      method: 'POST',
+      body,
+    })
+  }
+
+  async getJob(id: number): Promise<Job> {
+    return this.request<Job>(`/accounts/jobs/${id}/`)
+  }
+
+  async searchCampaign(id: number, query: string, page = 1): Promise<Paginated<CampaignSearchResult>> {
+    const params = new URLSearchParams({ q: query, page: String(page) })
+    return this.request<Paginated<CampaignSearchResult>>(`/accounts/campaigns/${id}/search/?${params}`)
+  }
+
   async listSessions(campaignId?: number): Promise<SessionItem[]> {
     const query = campaignId ? `?campaign=${campaignId}` : ''
     const response = await this.request<Paginated<SessionItem>>(`/accounts/sessions/${query}`)
@@ -644,9 +723,17 @@ class ApiService {
     })
   }
 
-  async listChatMessages(campaignId: number): Promise<ChatMessage[]> {
+  // With `after`, only newer messages; `wait` (seconds) long-polls for them
+  // when the backend runs in ASGI mode and is ignored otherwise.
+  async listChatMessages(
+    campaignId: number,
+    options: { after?: number; wait?: number } = {},
+  ): Promise<ChatMessage[]> {
+    const params = new URLSearchParams({ campaign: String(campaignId) })
+    if (options.after !== undefined) params.set('after', String(options.after))
+    if (options.wait !== undefined) params.set('wait', String(options.wait))
     const response = await this.request<Paginated<ChatMessage>>(
-      `/accounts/chat-messages/?campaign=${campaignId}`,
+      `/accounts/chat-messages/?${params}`,
     )
     return response?.results ?? []
   }